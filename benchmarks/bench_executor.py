@@ -0,0 +1,65 @@
+"""
+Compares thread and process execution of a CPU bound event on all cores.
+
+Run from the repository root with: python -m benchmarks.bench_executor
+"""
+import hashlib
+import os
+import time
+
+from orchestration import dispatch
+from orchestration import plugin
+from orchestration import reporter
+from orchestration import transport
+
+ROUNDS = 20000
+
+
+def hash_payload(result_reporter, kill_switch, rounds):
+    digest = b'orchestration'
+    for i in range(rounds):
+        digest = hashlib.sha256(digest * 16).digest()
+
+
+def make_event(executor, cores, result_reporter, kill_event):
+
+    def factory_func():
+        hash_payload(result_reporter, kill_event, ROUNDS)
+
+    factory_func.func = hash_payload
+    factory_func.args = (result_reporter, kill_event, ROUNDS)
+    factory_func.kwargs = dict()
+    return plugin.Event('hash_payload', factory_func, None, True, False, dispatch.ALLOW_OVERLAP, cores, executor)
+
+
+def bench(executor, cores, executions):
+    kill_event = transport.CONTEXT.Event()
+    result_reporter = reporter.ResultReporter(transport.create_report_queue('process'))
+    event = make_event(executor, cores, result_reporter, kill_event)
+    dispatcher = dispatch.Dispatcher(cores, cores, {'kill_switch': kill_event, 'result_reporter': result_reporter})
+    dispatcher.prepare([event])
+    if executor == dispatch.PROCESS:
+        # Start the worker processes up front so their startup is not measured
+        dispatcher.process_pool.submit(os.getpid).result()
+    start = time.perf_counter()
+    done = 0
+    while done < executions:
+        futures = [dispatcher.submit(event) for i in range(cores)]
+        for future in futures:
+            future.result()
+        done += cores
+    elapsed_sec = time.perf_counter() - start
+    dispatcher.shutdown()
+    return done / elapsed_sec
+
+
+def main():
+    cores = os.cpu_count()
+    executions = cores * 4
+    print('{} cores, {} executions of {} sha256 rounds'.format(cores, executions, ROUNDS))
+    for executor in dispatch.EXECUTORS:
+        print('{:<8} {:>10.2f} executions/sec'.format(executor, bench(executor, cores, executions)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""
+Measures fixture registration time for large descriptions.
+
+Run from the repository root with: python -m benchmarks.bench_registration
+"""
+import time
+
+from orchestration import plugin
+
+SOURCES = ['tests/events.py']
+PARAMS = {'str_value': 'value', 'int_value': 5, 'list_value': [1, 2, 3], 'dict_value': {'key': 'value'}}
+
+
+def make_description(events):
+    return {
+        'test_name': 'bench_{}'.format(events),
+        'total_hours': 1,
+        'events': [{'name': 'fixture_and_param_func', 'interval_sec': 10, 'params': dict(PARAMS)}
+                   for i in range(events)],
+    }
+
+
+def main():
+    plugin.get_symbol_table(SOURCES)
+    print('{:>8} {:>10} {:>14} {:>16}'.format('events', 'fixtures', 'total_ms', 'per_event_us'))
+    for events in [10, 100, 1000, 10000]:
+        description = make_description(events)
+        start = time.perf_counter()
+        plugin._setup_fixtures(SOURCES, description)
+        elapsed_sec = time.perf_counter() - start
+        print('{:>8} {:>10} {:>14.2f} {:>16.1f}'.format(
+            events, events * (len(PARAMS) + 1), elapsed_sec * 1000, elapsed_sec / events * 1e6))
+
+
+if __name__ == '__main__':
+    main()
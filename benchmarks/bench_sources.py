@@ -0,0 +1,71 @@
+"""
+Measures event source resolution for a description with 1000 events spread over 20 source modules,
+comparing the symbol table with the previous per event scan of every module.
+
+Run from the repository root with: python -m benchmarks.bench_sources
+"""
+import importlib
+import os
+import sys
+import tempfile
+import time
+
+from orchestration import plugin
+
+MODULES = 20
+EVENTS = 1000
+
+
+def write_sources(folder):
+    sources = list()
+    for m in range(MODULES):
+        lines = ['def event_{}_{}(kill_switch):\n    pass\n\n'.format(m, e) for e in range(EVENTS // MODULES)]
+        source = os.path.join(folder, 'bench_source_{}.py'.format(m))
+        with open(source, 'w') as f:
+            f.writelines(lines)
+        sources.append(source)
+    return sources
+
+
+def scan_modules(sources, event_names):
+    """
+    The resolution setup_factory_fixtures used to do, every module is tried for every event
+    """
+    found = dict()
+    for event_name in event_names:
+        for source in sources:
+            module = importlib.import_module(plugin.filepath_to_modulepath(source))
+            try:
+                found[event_name] = getattr(module, event_name)
+                break
+            except Exception:
+                pass
+    return found
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        sys.path.insert(0, folder)
+        sources = [os.path.basename(source) for source in write_sources(folder)]
+        event_names = ['event_{}_{}'.format(e % MODULES, e // MODULES) for e in range(EVENTS)]
+        for source in sources:
+            importlib.import_module(plugin.filepath_to_modulepath(source))
+
+        start = time.perf_counter()
+        scan_modules(sources, event_names)
+        scan_sec = time.perf_counter() - start
+
+        start = time.perf_counter()
+        symbol_table = plugin.get_symbol_table(sources)
+        for event_name in event_names:
+            symbol_table.resolve(event_name)
+        table_sec = time.perf_counter() - start
+
+    print('{} events in {} modules'.format(EVENTS, MODULES))
+    print('{:<14} {:>10.2f} ms'.format('module scan', scan_sec * 1000))
+    print('{:<14} {:>10.2f} ms'.format('symbol table', table_sec * 1000))
+
+
+if __name__ == '__main__':
+    main()
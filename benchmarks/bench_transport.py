@@ -0,0 +1,54 @@
+"""
+Compares startup cost and results per second of the report transports.
+
+Run from the repository root with: python -m benchmarks.bench_transport
+"""
+import multiprocessing
+import threading
+import time
+
+from orchestration import reporter
+from orchestration import transport
+
+RESULTS = 20000
+PRODUCERS = 2
+
+
+def produce(report_queue, count):
+    result_reporter = reporter.ResultReporter(report_queue)
+    for i in range(count):
+        result_reporter.add_result((float(i), 0.5))
+
+
+def bench(transport_name):
+    options = {'record_format': 'dd'} if transport_name == 'shm_ring' else dict()
+    start = time.perf_counter()
+    report_queue = transport.create_report_queue(transport_name, **options)
+    startup_sec = time.perf_counter() - start
+
+    worker_type = threading.Thread if transport_name == 'thread' else multiprocessing.Process
+    producers = [worker_type(target=produce, args=(report_queue, RESULTS // PRODUCERS)) for _ in range(PRODUCERS)]
+    result_reporter = reporter.ResultReporter(report_queue)
+    start = time.perf_counter()
+    for producer in producers:
+        producer.start()
+    received = 0
+    while received < RESULTS:
+        received += len(result_reporter.next_batch(5))
+    elapsed_sec = time.perf_counter() - start
+    for producer in producers:
+        producer.join()
+    if hasattr(report_queue, 'close'):
+        report_queue.close()
+    return {'transport': transport_name, 'startup_ms': startup_sec * 1000, 'results_per_sec': RESULTS / elapsed_sec}
+
+
+def main():
+    print('{:<10} {:>12} {:>16}'.format('transport', 'startup_ms', 'results/sec'))
+    for transport_name in transport.TRANSPORTS:
+        result = bench(transport_name)
+        print('{transport:<10} {startup_ms:>12.2f} {results_per_sec:>16.0f}'.format(**result))
+
+
+if __name__ == '__main__':
+    main()
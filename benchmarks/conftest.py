@@ -0,0 +1,14 @@
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'benchmark: harness overhead benchmarks, run with -m benchmark')
+
+
+def pytest_collection_modifyitems(config, items):
+    if 'benchmark' in (config.getoption('markexpr') or ''):
+        return
+    skip = pytest.mark.skip(reason='benchmarks only run with -m benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
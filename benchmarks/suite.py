@@ -0,0 +1,202 @@
+"""
+Measures what the orchestration harness itself costs, for synthetic descriptions of 10 to 10000 events:
+configure time, scheduling jitter of next_event, reporter throughput and latency and dispatch overhead.
+
+Run from the repository root with: python -m benchmarks.suite
+Results are compared to benchmarks/baseline.json, --save-baseline replaces it with the results of this run.
+The same suite runs with: pytest benchmarks -m benchmark
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+
+from orchestration import phases
+from orchestration import plugin
+from orchestration import reporter
+from orchestration import stats
+
+SOURCES = ['tests/events.py']
+PARAMS = {'str_value': 'value', 'int_value': 5, 'list_value': [1, 2, 3], 'dict_value': {'key': 'value'}}
+SIZES = [10, 100, 1000, 10000]
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+REPEATS = 3
+DEFAULT_TOLERANCE = 1.0
+# Differences below this are noise whatever the relative change
+MIN_CHANGE = 0.5
+HIGHER_IS_BETTER = ['reporter_results_per_sec']
+JITTER_RUN_SEC = 1.0
+REPORTER_RESULTS = 50000
+
+
+def key(metric, size):
+    return '{}[{}]'.format(metric, size)
+
+
+def make_description(events):
+    return {
+        'test_name': 'bench_{}'.format(events),
+        'total_hours': 1,
+        'events': [{'name': 'fixture_and_param_func', 'interval_sec': 10, 'params': dict(PARAMS)}
+                   for i in range(events)],
+    }
+
+
+def make_orchestrator(events, total_time_sec):
+    return plugin.Orchestrator(
+        total_time_sec, events, multiprocessing.Event(), reporter.ResultReporter(queue.Queue()), name='benchmark')
+
+
+def stub():
+    pass
+
+
+def bench_configure(size):
+    description = make_description(size)
+    start = time.perf_counter()
+    plugin._setup_fixtures(SOURCES, description)
+    phases.validate(description['events'])
+    return {key('configure_ms', size): (time.perf_counter() - start) * 1000}
+
+
+def bench_jitter(size):
+    """
+    Every event has its own interval from 0.1 sec up, so the heap holds size events while the
+    firing rate only grows with the log of size
+    """
+    events = [plugin.Event('event_{}'.format(i), stub, 0.1 + i * 0.01, False, False) for i in range(size)]
+    orchestrator = make_orchestrator(events, JITTER_RUN_SEC)
+    orchestrator.run()
+    jitter = list()
+    for event_stats in orchestrator.stats.events.values():
+        jitter.extend(submitted - scheduled for submitted, scheduled in zip(
+            event_stats.log.column('submitted'), event_stats.log.column('scheduled')))
+    summary = stats.distribution(jitter)
+    return {key('jitter_p50_ms', size): summary['p50'] * 1000, key('jitter_p99_ms', size): summary['p99'] * 1000}
+
+
+def bench_dispatch(size):
+    events = [plugin.Event('event_{}'.format(i), stub, None, False, False) for i in range(size)]
+    orchestrator = make_orchestrator(events, 0)
+    start = time.perf_counter()
+    for event in events:
+        orchestrator.execute(event)
+    elapsed_sec = time.perf_counter() - start
+    orchestrator.dispatcher.wait_idle()
+    queue_wait = list()
+    for event_stats in orchestrator.stats.events.values():
+        queue_wait.extend(started - submitted for started, submitted in zip(
+            event_stats.log.column('started'), event_stats.log.column('submitted')))
+    orchestrator.kill_all_events()
+    return {key('dispatch_us', size): elapsed_sec / size * 1e6,
+            key('dispatch_start_p99_ms', size): stats.distribution(queue_wait)['p99'] * 1000}
+
+
+class LatencyReporter(reporter.ResultReporter):
+
+    def __init__(self, results):
+        super().__init__(results)
+        self.latencies = list()
+
+    def on_result(self, results):
+        now = time.perf_counter()
+        self.latencies.extend(now - result['sent'] for result in results)
+
+
+def bench_reporter():
+    result_reporter = LatencyReporter(queue.Queue())
+    kill_event = threading.Event()
+    monitor = threading.Thread(target=result_reporter.monitor, args=(kill_event,))
+    monitor.start()
+    start = time.perf_counter()
+    for i in range(REPORTER_RESULTS):
+        result_reporter.add_result({'sent': time.perf_counter(), 'value': i})
+    while result_reporter.processed < REPORTER_RESULTS:
+        time.sleep(0.001)
+    elapsed_sec = time.perf_counter() - start
+    kill_event.set()
+    result_reporter.stop()
+    monitor.join()
+    summary = stats.distribution(result_reporter.latencies)
+    return {'reporter_results_per_sec': REPORTER_RESULTS / elapsed_sec,
+            'reporter_latency_p50_ms': summary['p50'] * 1000,
+            'reporter_latency_p99_ms': summary['p99'] * 1000}
+
+
+def run(sizes=SIZES, repeats=REPEATS):
+    """
+    Runs every benchmark repeats times, the result is the median of the runs
+    """
+    plugin.get_symbol_table(SOURCES)
+    runs = dict()
+    for i in range(repeats):
+        for bench in (bench_configure, bench_jitter, bench_dispatch):
+            for size in sizes:
+                for name, value in bench(size).items():
+                    runs.setdefault(name, list()).append(value)
+        for name, value in bench_reporter().items():
+            runs.setdefault(name, list()).append(value)
+    return {name: statistics.median(values) for name, values in runs.items()}
+
+
+def load_baseline(baseline_path):
+    try:
+        with open(baseline_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Returns a line for every result more than tolerance worse than the baseline
+    """
+    regressions = list()
+    for name, value in sorted(results.items()):
+        expected = baseline.get(name)
+        if expected is None or math.isnan(value):
+            continue
+        worse, better = value, expected
+        if name.split('[')[0] in HIGHER_IS_BETTER:
+            worse, better = expected, value
+        change = worse - better
+        if change > MIN_CHANGE and change > abs(better) * tolerance:
+            regressions.append('{}: {:.3f}, baseline {:.3f}'.format(name, value, expected))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of the orchestration harness overhead')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='number of events per description')
+    parser.add_argument('--repeats', type=int, default=REPEATS, help='runs of every benchmark, the median is kept')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='baseline JSON to compare with')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='relative change counted as a regression')
+    parser.add_argument('--save-baseline', action='store_true', help='write the results as the new baseline')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.repeats)
+    baseline = load_baseline(args.baseline) or dict()
+    print('{:<32} {:>14} {:>14}'.format('benchmark', 'result', 'baseline'))
+    for name, value in results.items():
+        print('{:<32} {:>14.3f} {:>14}'.format(
+            name, value, '{:.3f}'.format(baseline[name]) if name in baseline else '-'))
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print('Saved baseline to: {}'.format(args.baseline))
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for line in regressions:
+        print('Regression: {}'.format(line))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
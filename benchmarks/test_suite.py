@@ -0,0 +1,20 @@
+import pytest
+
+from benchmarks import suite
+
+
+@pytest.mark.benchmark
+def test_no_regression():
+    baseline = suite.load_baseline(suite.BASELINE_PATH)
+    if baseline is None:
+        pytest.skip('No baseline, create one with: python -m benchmarks.suite --save-baseline')
+    regressions = suite.compare(suite.run(), baseline)
+    assert not regressions, '\n'.join(regressions)
+
+
+def test_compare():
+    baseline = {'dispatch_us[10]': 100.0, 'jitter_p99_ms[10]': 0.05, 'reporter_results_per_sec': 1000.0}
+    assert suite.compare({'dispatch_us[10]': 190.0, 'jitter_p99_ms[10]': 0.5, 'reporter_results_per_sec': 600.0},
+                         baseline) == []
+    assert suite.compare({'dispatch_us[10]': 210.0, 'reporter_results_per_sec': 400.0}, baseline) == [
+        'dispatch_us[10]: 210.000, baseline 100.000', 'reporter_results_per_sec: 400.000, baseline 1000.000']
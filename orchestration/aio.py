@@ -0,0 +1,48 @@
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopThread:
+    """
+    A single asyncio event loop running in a background thread that all
+    coroutine events are scheduled on, so thousands of concurrent I/O bound
+    events cost one thread instead of one thread each.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='orchestration-asyncio', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coroutine_func):
+        """
+        Schedules coroutine_func() on the loop, returns a concurrent.futures.Future
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine_func(), self.loop)
+
+    def stop(self, timeout=None):
+        """
+        Cancels every task still running on the loop and stops it
+        """
+        if not self.loop.is_running():
+            return
+        asyncio.run_coroutine_threadsafe(self._cancel_all(), self.loop).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.loop.close()
+
+    async def _cancel_all(self):
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            logger.info('Cancelled {} running coroutine events'.format(len(tasks)))
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+import threading
+import time
+from os import path
+
+logger = logging.getLogger(__name__)
+
+VERSION = 2
+DEFAULT_INTERVAL_SEC = 60
+COUNTERS = ('executions', 'errors', 'skipped')
+
+
+def checkpoint_path(folder, test_name):
+    return path.join(folder, 'orchestration_checkpoint_{}.json'.format(test_name))
+
+
+def write(checkpoint_file, state):
+    """
+    Writes state atomically, a reader or a crash mid write never sees a partial checkpoint
+    """
+    temporary_file = '{}.{}.tmp'.format(checkpoint_file, os.getpid())
+    with open(temporary_file, 'w') as f:
+        json.dump(state, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary_file, checkpoint_file)
+
+
+def load(checkpoint_file):
+    """
+    Returns the checkpoint state in checkpoint_file, or None if there is no checkpoint
+    """
+    try:
+        with open(checkpoint_file) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    if state.get('version') != VERSION:
+        raise Exception('Checkpoint "{}" has version {}, expected {}'.format(
+            checkpoint_file, state.get('version'), VERSION))
+    return state
+
+
+def merge_counters(previous, current):
+    counters = {name: dict(values) for name, values in previous.items()}
+    for name, summary in current.items():
+        values = counters.setdefault(name, {counter: 0 for counter in COUNTERS})
+        for counter in COUNTERS:
+            values[counter] = values.get(counter, 0) + summary[counter]
+    return counters
+
+
+class Checkpointer:
+    """
+    Periodically writes the schedule state of a running orchestrator to a file.
+
+    Deadlines are stored relative to the time of the checkpoint, the monotonic
+    clock of a resumed run has nothing to do with the one of the run that died.
+    Execution counters include the counters of the run that was resumed. Only the
+    startup events that are done are recorded, a resumed run starts the others again.
+    """
+
+    def __init__(self, orchestrator, checkpoint_file, interval_sec=DEFAULT_INTERVAL_SEC):
+        self.orchestrator = orchestrator
+        self.checkpoint_file = checkpoint_file
+        self.interval_sec = interval_sec
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='orchestration-checkpoint', daemon=True)
+
+    def state(self):
+        orchestrator = self.orchestrator
+        now = orchestrator.clock()
+        resumed = orchestrator.resumed or dict()
+        return {
+            'version': VERSION,
+            'name': orchestrator.name,
+            'written_at': time.time(),
+            'elapsed_sec': orchestrator.elapsed_offset + now - orchestrator.start_time,
+            'startup_succeeded': orchestrator.startup_phase.succeeded(),
+            'deadlines': {name: deadline - now for deadline, name in orchestrator.scheduler.pending()},
+            'counters': merge_counters(resumed.get('counters', dict()), orchestrator.stats.live_summary()),
+        }
+
+    def write(self):
+        try:
+            write(self.checkpoint_file, self.state())
+        except OSError as e:
+            logger.error('Failed to write checkpoint "{}": {}'.format(self.checkpoint_file, e))
+
+    def _run(self):
+        while not self._stopped.wait(self.interval_sec):
+            self.write()
+
+    def start(self):
+        self._thread.start()
+        logger.info('Checkpointing to "{}" every {} sec'.format(self.checkpoint_file, self.interval_sec))
+
+    def stop(self, keep):
+        """
+        Stops checkpointing, writes a last checkpoint if keep is set otherwise removes it
+        """
+        self._stopped.set()
+        self._thread.join()
+        if keep:
+            self.write()
+            return
+        try:
+            os.remove(self.checkpoint_file)
+        except FileNotFoundError:
+            pass
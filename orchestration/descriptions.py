@@ -0,0 +1,134 @@
+import json
+import logging
+import os
+from collections.abc import MutableMapping
+from os import path
+
+logger = logging.getLogger(__name__)
+INDEX_CACHE_KEY = 'orchestration/description_index'
+
+
+def load_description(description_path):
+    with open(description_path) as f:
+        try:
+            description_config = json.load(f, strict=False)
+        except Exception as e:
+            logger.error('Failed to load config file: "{}", error: {}'.format(description_path, e))
+            return None
+    return description_config
+
+
+class DescriptionIndex:
+    """
+    Maps test_name to description file for every description in a folder.
+
+    The index is kept in the pytest cache keyed by file mtime, so only new or
+    changed descriptions are parsed and a single description can be found
+    without reading any of the others.
+    """
+
+    def __init__(self, folder, cache=None):
+        self.folder = path.abspath(folder)
+        self.cache = cache
+        self.entries = dict()
+        if cache is not None:
+            self.entries = cache.get(INDEX_CACHE_KEY, dict()).get(self.folder, dict())
+
+    def save(self):
+        if self.cache is None:
+            return
+        cached = self.cache.get(INDEX_CACHE_KEY, dict())
+        cached[self.folder] = self.entries
+        self.cache.set(INDEX_CACHE_KEY, cached)
+
+    def refresh(self):
+        """
+        Stats every description and parses the ones that are new or changed since last indexed
+        """
+        entries = dict()
+        for root, dirs, files in os.walk(self.folder):
+            for name in sorted(files):
+                if not name.endswith('.json'):
+                    continue
+                description_path = path.join(root, name)
+                mtime = os.stat(description_path).st_mtime
+                cached = self.entries.get(description_path)
+                if cached is not None and cached[0] == mtime:
+                    entries[description_path] = cached
+                    continue
+                description = load_description(description_path)
+                if description is None or 'test_name' not in description:
+                    continue
+                entries[description_path] = [mtime, description['test_name']]
+        self.entries = entries
+        self.save()
+
+    def _lookup(self, test_name):
+        for description_path, (mtime, name) in self.entries.items():
+            if name != test_name:
+                continue
+            try:
+                if os.stat(description_path).st_mtime == mtime:
+                    return description_path
+            except OSError:
+                pass
+            return None
+        return None
+
+    def find(self, test_name):
+        """
+        Returns the path of the description with test_name, or None if there is none
+        """
+        description_path = self._lookup(test_name)
+        if description_path is None:
+            self.refresh()
+            description_path = self._lookup(test_name)
+        return description_path
+
+    def load(self, test_name):
+        description_path = self.find(test_name)
+        if description_path is None:
+            return None
+        return load_description(description_path)
+
+    def names(self):
+        return sorted(name for mtime, name in self.entries.values())
+
+
+class LazyDescriptions(MutableMapping):
+    """
+    Loaded descriptions by test_name. Descriptions that are only known by name are
+    loaded by the loader callback the first time they are looked up.
+    """
+
+    def __init__(self):
+        self._loaded = dict()
+        self._deferred = set()
+        self._loader = None
+
+    def defer(self, names, loader):
+        self._deferred.update(names)
+        self._loader = loader
+
+    def __getitem__(self, name):
+        if name not in self._loaded and name in self._deferred:
+            self._deferred.discard(name)
+            self._loader(name)
+        return self._loaded[name]
+
+    def __setitem__(self, name, description):
+        self._deferred.discard(name)
+        self._loaded[name] = description
+
+    def __delitem__(self, name):
+        self._deferred.discard(name)
+        del self._loaded[name]
+
+    def __contains__(self, name):
+        return name in self._loaded or name in self._deferred
+
+    def __iter__(self):
+        return iter(sorted(set(self._loaded) | self._deferred))
+
+    def __len__(self):
+        return len(set(self._loaded) | self._deferred)
@@ -0,0 +1,360 @@
+import asyncio
+import collections
+import functools
+import importlib
+import inspect
+import logging
+import os
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+
+from orchestration import aio
+from orchestration import stats
+from orchestration import transport
+
+logger = logging.getLogger(__name__)
+
+QUEUE = 'queue'
+SKIP_IF_RUNNING = 'skip_if_running'
+ALLOW_OVERLAP = 'allow_overlap'
+CANCEL_PREVIOUS = 'cancel_previous'
+POLICIES = (QUEUE, SKIP_IF_RUNNING, ALLOW_OVERLAP, CANCEL_PREVIOUS)
+
+THREAD = 'thread'
+PROCESS = 'process'
+EXECUTORS = (THREAD, PROCESS)
+
+_worker_shared = dict()
+
+
+def _init_process_worker(shared):
+    _worker_shared.update(shared)
+
+
+class SharedFixture:
+    """
+    Placeholder for a fixture that is handed to the process workers when they are
+    started, like the kill_switch, since it can not be pickled with every call
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def resolve(self):
+        return _worker_shared[self.name]
+
+
+class ProcessCall:
+    """
+    Picklable call of an event function, the function is looked up by module and name in the worker.
+    Returns the monotonic start time and duration of the call.
+    """
+
+    def __init__(self, module, name, args, kwargs):
+        self.module = module
+        self.name = name
+        self.args = args
+        self.kwargs = kwargs
+
+    def __call__(self):
+        func = getattr(importlib.import_module(self.module), self.name)
+        args = [resolve_shared(arg) for arg in self.args]
+        kwargs = {key: resolve_shared(value) for key, value in self.kwargs.items()}
+        started = time.monotonic()
+        if inspect.iscoroutinefunction(func):
+            asyncio.run(func(*args, **kwargs))
+        else:
+            func(*args, **kwargs)
+        return started, time.monotonic() - started
+
+
+def resolve_shared(value):
+    if isinstance(value, SharedFixture):
+        return value.resolve()
+    return value
+
+
+def create_process_call(event, shared):
+    """
+    Builds a ProcessCall from the factory fixture of an event. Arguments that are one
+    of the shared objects are replaced with placeholders, every other argument must be picklable.
+    """
+    factory = event.func
+    try:
+        func = factory.func
+    except AttributeError:
+        raise Exception('Event "{}" can not run in a process, it is not a generated event fixture'.format(event.name))
+    module = importlib.import_module(func.__module__)
+    if getattr(module, func.__name__, None) is None:
+        raise Exception('Event "{}" can not run in a process, "{}" is not a module level function of "{}"'.format(
+            event.name, func.__name__, func.__module__))
+
+    shared_ids = {id(value): name for name, value in shared.items()}
+
+    def prepare(param_name, value):
+        if id(value) in shared_ids:
+            return SharedFixture(shared_ids[id(value)])
+        try:
+            pickle.dumps(value)
+        except Exception as e:
+            raise Exception('Event "{}" can not run in a process, fixture "{}" can not cross a process boundary: {}'
+                            .format(event.name, param_name, e))
+        return value
+
+    param_names = list(inspect.signature(func).parameters)
+    args = tuple(prepare(param_names[i], value) for i, value in enumerate(factory.args))
+    kwargs = {key: prepare(key, value) for key, value in factory.kwargs.items()}
+    return ProcessCall(func.__module__, func.__name__, args, kwargs)
+
+
+class Dispatcher:
+    """
+    Runs events on a shared, bounded thread pool according to each event's concurrency policy:
+
+    * queue - If the event is already running the execution is queued and submitted when the previous one
+      finishes. At most one execution is queued per event, further executions are skipped.
+    * skip_if_running - If the event is already running the execution is skipped
+    * allow_overlap - Up to event.max_parallel executions may run at once, further executions are skipped
+    * cancel_previous - Executions that have not started yet, and running coroutine executions, are
+      cancelled. A running thread execution can not be interrupted, the execution is skipped if
+      event.max_parallel of them are still running.
+
+    submit() never waits for an event to finish, so the scheduler thread is never blocked.
+
+    backlog() is the number of executions of an event waiting for a free worker, open loop
+    rate events use it to bound their backlog. At shutdown executions that have not started are cancelled.
+
+    Events with executor "process" run on a ProcessPoolExecutor instead, started with
+    transport.START_METHOD. The objects in shared (the kill_switch and result_reporter) are
+    handed to the worker processes when they are started, so they have to be created with
+    transport.CONTEXT, every other argument of the event has to be picklable.
+
+    Coroutine events run on a single asyncio event loop in a background thread,
+    cancel_async() cancels them, which the Orchestrator does when the kill switch is set.
+
+    Every execution is timed and its outcome recorded in stats, exceptions raised by events are logged.
+    """
+
+    def __init__(self, max_workers, max_processes=None, shared=None, clock=time.monotonic, run_stats=None):
+        # Same default as ThreadPoolExecutor
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='orchestration')
+        self.max_processes = max_processes or os.cpu_count()
+        self.shared = shared or dict()
+        self.clock = clock
+        self.stats = run_stats if run_stats is not None else stats.RunStats()
+        self._process_pool = None
+        self._process_calls = dict()
+        self._event_loop = None
+        self._async_futures = set()
+        self._async_events = set()
+        self._idle = threading.Condition(threading.RLock())
+        self._running = collections.defaultdict(set)
+        self._queued = dict()
+        self._closed = False
+
+    @property
+    def process_pool(self):
+        if self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self.max_processes,
+                mp_context=transport.CONTEXT,
+                initializer=_init_process_worker,
+                initargs=(self.shared,))
+        return self._process_pool
+
+    @property
+    def event_loop(self):
+        if self._event_loop is None:
+            self._event_loop = aio.EventLoopThread()
+        return self._event_loop
+
+    def prepare(self, events):
+        """
+        Validates that every process event can cross a process boundary, raises an exception if not
+        """
+        for event in events:
+            if event.executor != PROCESS:
+                continue
+            reporter = self.shared.get('result_reporter')
+            if reporter is not None and isinstance(reporter.results, queue.Queue):
+                raise Exception('Event "{}" can not run in a process, the "thread" report transport '
+                                'is not shared with other processes'.format(event.name))
+            self._process_calls[event.name] = create_process_call(event, self.shared)
+
+    def submit(self, event, scheduled=None):
+        """
+        Submits the event according to its policy, returns the future or None if it was not submitted.
+        scheduled is the time the execution was due, it defaults to now.
+        """
+        if scheduled is None:
+            scheduled = self.clock()
+        with self._idle:
+            if self._closed:
+                logger.warning('Dispatcher is shut down, dropping event: {}'.format(event.name))
+                return None
+            running = self._running[event.name]
+            if running:
+                if event.concurrency == QUEUE:
+                    if event.name in self._queued:
+                        logger.info('Event "{}" is running and already queued, skipping execution'.format(
+                            event.name))
+                        self.stats.skipped(event.name)
+                        return None
+                    self._queued[event.name] = (scheduled, self.clock())
+                    logger.info('Event "{}" is running, queueing execution'.format(event.name))
+                    return None
+                if event.concurrency == SKIP_IF_RUNNING:
+                    logger.info('Event "{}" is running, skipping execution'.format(event.name))
+                    self.stats.skipped(event.name)
+                    return None
+                if event.concurrency == ALLOW_OVERLAP and len(running) >= event.max_parallel:
+                    logger.info('Event "{}" has {} executions running, skipping execution'.format(
+                        event.name, len(running)))
+                    self.stats.skipped(event.name)
+                    return None
+                if event.concurrency == CANCEL_PREVIOUS:
+                    still_running = [future for future in list(running) if not future.cancel()]
+                    if len(still_running) >= event.max_parallel:
+                        logger.info('Event "{}" can not be cancelled while running, skipping execution'.format(
+                            event.name))
+                        self.stats.skipped(event.name)
+                        return None
+            return self._submit(event, scheduled, self.clock())
+
+    def _submit(self, event, scheduled, submitted):
+        record = stats.ExecutionRecord(event.name, scheduled, submitted)
+        if event.executor == PROCESS:
+            if event.name not in self._process_calls:
+                self.prepare([event])
+            future = self.process_pool.submit(self._process_calls[event.name])
+        elif event.is_async:
+            future = self.event_loop.submit(functools.partial(self._timed_async, event.func, record))
+            self._async_futures.add(future)
+            self._async_events.add(event.name)
+        else:
+            future = self.pool.submit(self._timed, event.func, record)
+        self._running[event.name].add(future)
+        future.add_done_callback(functools.partial(self._on_done, event, record))
+        return future
+
+    def _timed(self, func, record):
+        record.started = self.clock()
+        try:
+            func()
+        finally:
+            record.duration = self.clock() - record.started
+
+    async def _timed_async(self, func, record):
+        record.started = self.clock()
+        try:
+            await func()
+        finally:
+            record.duration = self.clock() - record.started
+
+    def _record_outcome(self, event, record, future):
+        if future.cancelled():
+            record.outcome = stats.CANCELLED
+        elif future.exception() is not None:
+            exception = future.exception()
+            record.outcome = stats.ERROR
+            record.exception = repr(exception)
+            logger.error('Event "{}" raised an exception: {}'.format(event.name, exception), exc_info=exception)
+        else:
+            record.outcome = stats.OK
+            if event.executor == PROCESS:
+                record.started, record.duration = future.result()
+        self.stats.add(record)
+
+    def _on_done(self, event, record, future):
+        self._record_outcome(event, record, future)
+        with self._idle:
+            self._running[event.name].discard(future)
+            self._async_futures.discard(future)
+            queued = self._queued.pop(event.name, None)
+            if queued is not None:
+                self._submit(event, *queued)
+            if not self.in_flight():
+                self._idle.notify_all()
+
+    def pool_size(self, event):
+        if event.executor == PROCESS:
+            return self.max_processes
+        return self.max_workers
+
+    def backlog(self, event_name):
+        """
+        Number of executions of the event submitted but not started yet
+        """
+        with self._idle:
+            return sum(1 for future in self._running[event_name] if not future.running() and not future.done())
+
+    def in_flight_counts(self):
+        """
+        Number of running executions per event, read without the lock for monitoring
+        """
+        return {name: len(futures) for name, futures in dict(self._running).items() if futures}
+
+    def in_flight(self):
+        with self._idle:
+            return sum(len(futures) for futures in self._running.values())
+
+    def wait_idle(self, timeout=None):
+        """
+        Waits until no execution is running or queued, returns False on timeout
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: not self.in_flight(), timeout)
+
+    def cancel_async(self, keep=()):
+        """
+        Cancels running coroutine events, except the futures in keep
+        """
+        with self._idle:
+            futures = [future for future in self._async_futures if future not in keep]
+            for event_name in self._async_events:
+                self._queued.pop(event_name, None)
+        for future in futures:
+            future.cancel()
+
+    def drop_queued(self):
+        """
+        Drops the executions waiting for a previous one to finish, they are counted as skipped
+        """
+        with self._idle:
+            for event_name in self._queued:
+                self.stats.skipped(event_name)
+            self._queued.clear()
+
+    def cancel_pending(self):
+        """
+        Cancels the thread and process executions that have not started yet, they are counted as cancelled
+        """
+        with self._idle:
+            pending = [future for futures in self._running.values() for future in futures
+                       if future not in self._async_futures]
+        for future in pending:
+            future.cancel()
+
+    def shutdown(self, timeout=None):
+        """
+        Drops queued executions and cancels those that have not started, waits for running ones to finish,
+        then stops accepting new ones
+        """
+        self.drop_queued()
+        self.cancel_pending()
+        if not self.wait_idle(timeout):
+            logger.warning('{} event executions still running at shutdown'.format(self.in_flight()))
+        with self._idle:
+            self._closed = True
+        self.pool.shutdown(wait=False)
+        if self._process_pool is not None:
+            # The workers have to be joined or the interpreter hangs at exit waiting for them
+            self.cancel_pending()
+            self._process_pool.shutdown(wait=True)
+        if self._event_loop is not None:
+            self._event_loop.stop(timeout)
@@ -0,0 +1,329 @@
+import asyncio
+import functools
+import inspect
+import itertools
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from orchestration import reporter as reporter_module
+
+logger = logging.getLogger(__name__)
+
+HELLO = 'hello'
+PREPARE = 'prepare'
+READY = 'ready'
+GO = 'go'
+ABORT = 'abort'
+DONE = 'done'
+RESULT = 'result'
+KILL = 'kill'
+STOP = 'stop'
+DEFAULT_DONE_TIMEOUT_SEC = 300
+
+
+def parse_address(address):
+    host, port = address.rsplit(':', 1)
+    return host, int(port)
+
+
+class Connection:
+    """
+    Newline delimited JSON messages over a socket, safe to send from several threads
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+        self._reader = sock.makefile('r', encoding='utf-8')
+        self._write_lock = threading.Lock()
+
+    def send(self, **message):
+        data = (json.dumps(message, default=repr) + '\n').encode('utf-8')
+        with self._write_lock:
+            self.sock.sendall(data)
+
+    def receive(self):
+        try:
+            line = self._reader.readline()
+        except (OSError, ValueError):
+            return None
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class Firing:
+
+    def __init__(self, event_name, workers):
+        self.event_name = event_name
+        self.workers = set(workers)
+        self.ready = dict()
+        self.done = dict()
+
+
+class Coordinator:
+    """
+    Owns the schedule in distributed mode and dispatches every firing of an event to all workers.
+
+    A firing is a two phase barrier: every worker is asked to prepare the event and
+    answers when it is ready, then all workers get a go message with a common wall
+    clock start time a few milliseconds ahead. Results reported on the workers are
+    streamed back and added to the coordinator's reporter.
+
+    The start time is only common if the clocks of the hosts are synchronized, a
+    warning is logged for a worker whose clock is more than start_delay off when it
+    connects. The estimate includes the network latency of the hello message.
+
+    A firing fails if a worker is not done done_timeout plus barrier_timeout sec after
+    the go message, so a hung worker never blocks the schedule for good.
+    """
+
+    def __init__(self, address, workers, reporter, barrier_timeout=30, start_delay=0.05,
+                 done_timeout=DEFAULT_DONE_TIMEOUT_SEC):
+        self.expected_workers = workers
+        self.reporter = reporter
+        self.barrier_timeout = barrier_timeout
+        self.start_delay = start_delay
+        self.done_timeout = done_timeout
+        self.workers = dict()
+        self._server = socket.create_server(address)
+        self.address = self._server.getsockname()[:2]
+        self._changed = threading.Condition()
+        self._firings = dict()
+        self._sequence = itertools.count()
+        self._readers = list()
+        self._accept_thread = threading.Thread(target=self._accept, name='orchestration-coordinator', daemon=True)
+        self._accept_thread.start()
+        logger.info('Coordinator listening on {}:{}'.format(*self.address))
+
+    def _accept(self):
+        while True:
+            try:
+                sock, peer = self._server.accept()
+            except OSError:
+                return
+            reader = threading.Thread(target=self._serve, args=(Connection(sock),), daemon=True)
+            reader.start()
+            self._readers.append(reader)
+
+    def _serve(self, connection):
+        worker = None
+        while True:
+            message = connection.receive()
+            if message is None:
+                break
+            if message['type'] == HELLO:
+                worker = message['worker']
+                logger.info('Worker "{}" connected with events: {}'.format(worker, ', '.join(message['events'])))
+                self.check_clock(worker, message['time'])
+                with self._changed:
+                    self.workers[worker] = connection
+                    self._changed.notify_all()
+            elif message['type'] == RESULT:
+                self.reporter.add_result(message['result'])
+            elif message['type'] in (READY, DONE):
+                with self._changed:
+                    firing = self._firings.get(message['seq'])
+                    if firing is not None:
+                        getattr(firing, message['type'])[worker] = message
+                        self._changed.notify_all()
+        if worker is not None:
+            logger.info('Worker "{}" disconnected'.format(worker))
+            with self._changed:
+                self.workers.pop(worker, None)
+                self._changed.notify_all()
+        connection.close()
+
+    def check_clock(self, worker, worker_time):
+        """
+        Returns how far the clock of worker is off, logs a warning if it is too far off to start firings together
+        """
+        skew = worker_time - time.time()
+        if abs(skew) > self.start_delay:
+            logger.warning('Clock of worker "{}" is {:.3f} sec off, its firings will not start together '
+                           'with the other workers'.format(worker, skew))
+        return skew
+
+    def wait_for_workers(self, timeout=None):
+        with self._changed:
+            if not self._changed.wait_for(lambda: len(self.workers) >= self.expected_workers, timeout):
+                raise Exception('Only {} of {} orchestration workers connected'.format(
+                    len(self.workers), self.expected_workers))
+
+    def _broadcast(self, workers, **message):
+        for connection in workers.values():
+            try:
+                connection.send(**message)
+            except OSError as e:
+                logger.warning('Failed to send {} to worker: {}'.format(message['type'], e))
+
+    def _wait(self, firing, phase, timeout=None):
+        def complete():
+            lost = firing.workers - set(self.workers)
+            return lost or set(getattr(firing, phase)) >= firing.workers
+
+        with self._changed:
+            self._changed.wait_for(complete, timeout)
+            lost = firing.workers - set(self.workers)
+            if lost:
+                raise Exception('Event "{}" lost workers: {}'.format(firing.event_name, ', '.join(sorted(lost))))
+            missing = firing.workers - set(getattr(firing, phase))
+            if missing:
+                raise Exception('Event "{}" timed out waiting for workers to be {}: {}'.format(
+                    firing.event_name, phase, ', '.join(sorted(missing))))
+
+    def fire(self, event_name, done_timeout=None):
+        """
+        Executes event_name on all workers, returns when every worker is done.
+        done_timeout is how long the event is expected to run at most, defaults to the coordinator's.
+        """
+        if done_timeout is None:
+            done_timeout = self.done_timeout
+        seq = next(self._sequence)
+        with self._changed:
+            workers = dict(self.workers)
+            firing = Firing(event_name, workers)
+            self._firings[seq] = firing
+        try:
+            self._broadcast(workers, type=PREPARE, seq=seq, event=event_name)
+            try:
+                self._wait(firing, READY, self.barrier_timeout)
+                errors = ['{}: {}'.format(worker, message['error'])
+                          for worker, message in firing.ready.items() if message.get('error')]
+                if errors:
+                    raise Exception('Event "{}" could not be prepared: {}'.format(event_name, '; '.join(errors)))
+            except Exception:
+                self._broadcast(workers, type=ABORT, seq=seq)
+                raise
+            self._broadcast(workers, type=GO, seq=seq, start_at=time.time() + self.start_delay)
+            self._wait(firing, DONE, done_timeout + self.barrier_timeout)
+        finally:
+            with self._changed:
+                self._firings.pop(seq, None)
+        errors = ['{}: {}'.format(worker, message['error'])
+                  for worker, message in firing.done.items() if message.get('error')]
+        if errors:
+            raise Exception('Event "{}" failed on workers: {}'.format(event_name, '; '.join(errors)))
+        return firing.done
+
+    def remote_call(self, event_name, done_timeout=None):
+        return functools.partial(self.fire, event_name, done_timeout)
+
+    def kill(self):
+        """
+        Sets the kill switch on every worker
+        """
+        with self._changed:
+            workers = dict(self.workers)
+        self._broadcast(workers, type=KILL)
+
+    def stop(self, timeout=10):
+        """
+        Stops all workers and waits for them to send their last results and disconnect
+        """
+        with self._changed:
+            workers = dict(self.workers)
+        self._broadcast(workers, type=STOP)
+        with self._changed:
+            self._changed.wait_for(lambda: not self.workers, timeout)
+        self._server.close()
+        for reader in self._readers:
+            reader.join(timeout)
+
+
+class WorkerAgent:
+    """
+    Connects to a coordinator and executes events when told to.
+    events is a dict of event name to the no argument callable executing it, results
+    reported to reporter are forwarded to the coordinator.
+    """
+
+    def __init__(self, address, events, kill_switch, reporter, name=None, max_workers=None):
+        self.address = address
+        self.events = events
+        self.kill_switch = kill_switch
+        self.reporter = reporter
+        self.name = name or '{}:{}'.format(socket.gethostname(), os.getpid())
+        self.pool = ThreadPoolExecutor(max_workers=max_workers or max(32, len(events) + 4))
+        self._prepared = dict()
+        self._stopped = threading.Event()
+
+    def run(self):
+        connection = Connection(socket.create_connection(self.address))
+        connection.send(type=HELLO, worker=self.name, events=sorted(self.events), time=time.time())
+        forwarder = threading.Thread(target=self._forward_results, args=(connection,), daemon=True)
+        forwarder.start()
+        try:
+            self._serve(connection)
+        finally:
+            self.kill_switch.set()
+            self.pool.shutdown(wait=True)
+            # Firings still running reported until here, the forwarder drains the queue and stops
+            self._stopped.set()
+            self.reporter.stop()
+            forwarder.join()
+            connection.close()
+
+    def _serve(self, connection):
+        while True:
+            message = connection.receive()
+            if message is None or message['type'] == STOP:
+                return
+            if message['type'] == PREPARE:
+                func = self.events.get(message['event'])
+                if func is None:
+                    connection.send(type=READY, seq=message['seq'], error='unknown event: {}'.format(message['event']))
+                    continue
+                self._prepared[message['seq']] = func
+                connection.send(type=READY, seq=message['seq'])
+            elif message['type'] == GO:
+                func = self._prepared.pop(message['seq'])
+                self.pool.submit(self._execute, connection, message['seq'], func, message['start_at'])
+            elif message['type'] == ABORT:
+                self._prepared.pop(message['seq'], None)
+            elif message['type'] == KILL:
+                self.kill_switch.set()
+
+    def _execute(self, connection, seq, func, start_at):
+        delay = start_at - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        started = time.time()
+        error = None
+        try:
+            if inspect.iscoroutinefunction(func):
+                asyncio.run(func())
+            else:
+                func()
+        except Exception as e:
+            logger.exception('Event failed')
+            error = repr(e)
+        connection.send(type=DONE, seq=seq, started=started, duration=time.time() - started, error=error)
+
+    def _forward_results(self, connection):
+        """
+        Forwards results until every firing is done, also after the kill switch is set
+        """
+        while not self._stopped.is_set():
+            self._send_results(connection, self.reporter.next_batch(self.reporter.WAIT_TIMEOUT))
+        batch = self.reporter.next_batch(None)
+        while batch:
+            self._send_results(connection, batch)
+            batch = self.reporter.next_batch(None)
+
+    def _send_results(self, connection, batch):
+        for result in batch:
+            if isinstance(result, reporter_module.StopMonitor):
+                continue
+            connection.send(type=RESULT, result=result)
@@ -0,0 +1,88 @@
+import math
+import mmap
+import tempfile
+from array import array
+
+OUTCOME_CODES = {'ok': 0, 'error': 1, 'cancelled': 2}
+OUTCOMES = {code: outcome for outcome, code in OUTCOME_CODES.items()}
+COLUMNS = (('scheduled', 'd'), ('submitted', 'd'), ('started', 'd'), ('duration', 'd'), ('outcome', 'b'))
+DEFAULT_MEMORY_RECORDS = 1000000
+
+
+class ExecutionLog:
+    """
+    Columnar log of the executions of one event.
+
+    Every column is an array, times are time.monotonic() values with NaN for
+    executions that never started. Once memory_records executions are held in
+    memory, the columns are appended to one temporary file each and cleared, so
+    memory use is bounded no matter how long the run is. Spilled columns are
+    read back through mmap without loading them.
+    """
+
+    def __init__(self, memory_records=DEFAULT_MEMORY_RECORDS, spill_dir=None):
+        self.memory_records = memory_records
+        self.spill_dir = spill_dir
+        self.columns = {name: array(code) for name, code in COLUMNS}
+        self._appenders = [self.columns[name].append for name, code in COLUMNS]
+        self._files = None
+        self._spilled = 0
+
+    def __len__(self):
+        return self._spilled + len(self.columns['outcome'])
+
+    def append(self, scheduled, submitted, started, duration, outcome):
+        append_scheduled, append_submitted, append_started, append_duration, append_outcome = self._appenders
+        append_scheduled(scheduled)
+        append_submitted(submitted)
+        append_started(started)
+        append_duration(duration)
+        append_outcome(outcome)
+        if len(self.columns['outcome']) >= self.memory_records:
+            self.spill()
+
+    def add(self, record):
+        self.append(
+            record.scheduled,
+            record.submitted,
+            math.nan if record.started is None else record.started,
+            math.nan if record.duration is None else record.duration,
+            OUTCOME_CODES[record.outcome])
+
+    def spill(self):
+        if self._files is None:
+            self._files = {name: tempfile.TemporaryFile(dir=self.spill_dir, prefix='orchestration-')
+                           for name, code in COLUMNS}
+        self._spilled += len(self.columns['outcome'])
+        for name, column in self.columns.items():
+            column.tofile(self._files[name])
+            self._files[name].flush()
+            del column[:]
+
+    def memory_bytes(self):
+        return sum(column.buffer_info()[1] * column.itemsize for column in self.columns.values())
+
+    def column(self, name):
+        """
+        Iterates over every value of a column, spilled values first
+        """
+        column = self.columns[name]
+        if self._spilled:
+            spill_file = self._files[name]
+            mapped = mmap.mmap(spill_file.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped).cast(column.typecode)
+            try:
+                yield from view
+            finally:
+                view.release()
+                mapped.close()
+        yield from column
+
+    def outcomes(self):
+        return (OUTCOMES[code] for code in self.column('outcome'))
+
+    def close(self):
+        if self._files is not None:
+            for spill_file in self._files.values():
+                spill_file.close()
+            self._files = None
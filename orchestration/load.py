@@ -0,0 +1,211 @@
+import collections
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+POISSON = 'poisson'
+UNIFORM = 'uniform'
+ARRIVALS = [POISSON, UNIFORM]
+CONSTANT = 'constant'
+RAMP = 'ramp'
+STEP = 'step'
+SPIKE = 'spike'
+PROFILES = [CONSTANT, RAMP, STEP, SPIKE]
+IDLE_STEP_SEC = 0.1
+TARGET_SAMPLES = 1000
+MAX_DROPPED_PENDING = 10000
+
+
+class RateProfile:
+    """
+    Target rate in arrivals per sec as a function of sec since start of the test
+    """
+
+    def __init__(self, kind, rate_per_sec=0, start_rate=0, ramp_sec=0, steps=None, at_sec=0, duration_sec=0,
+                 spike_rate=0):
+        self.kind = kind
+        self.rate_per_sec = rate_per_sec
+        self.start_rate = start_rate
+        self.ramp_sec = ramp_sec
+        self.steps = sorted(steps or list())
+        self.at_sec = at_sec
+        self.duration_sec = duration_sec
+        self.spike_rate = spike_rate
+
+    def rate_at(self, elapsed):
+        if self.kind == RAMP:
+            if elapsed >= self.ramp_sec:
+                return self.rate_per_sec
+            return self.start_rate + (self.rate_per_sec - self.start_rate) * elapsed / self.ramp_sec
+        if self.kind == STEP:
+            rate = 0
+            for step_start, step_rate in self.steps:
+                if step_start > elapsed:
+                    break
+                rate = step_rate
+            return rate
+        if self.kind == SPIKE and self.at_sec <= elapsed < self.at_sec + self.duration_sec:
+            return self.spike_rate
+        return self.rate_per_sec
+
+    def mean_rate(self, elapsed):
+        """
+        Mean target rate over the first elapsed sec
+        """
+        if elapsed <= 0:
+            return self.rate_at(0)
+        return sum(self.rate_at(elapsed * (i + 0.5) / TARGET_SAMPLES) for i in range(TARGET_SAMPLES)) / TARGET_SAMPLES
+
+
+def create_profile(json_config):
+    """
+    Creates the RateProfile of an event description with rate_per_sec and/or profile keys
+    """
+    name = json_config['name']
+    rate_per_sec = json_config.get('rate_per_sec', 0)
+    profile = dict(json_config.get('profile', {'type': CONSTANT}))
+    kind = profile.pop('type', CONSTANT)
+    if kind not in PROFILES:
+        raise Exception('Unknown rate profile: "{}" for event: "{}", valid profiles are: {}'.format(
+            kind, name, ', '.join(PROFILES)))
+    if kind == RAMP and not profile.get('ramp_sec'):
+        raise Exception('Rate profile "ramp" for event: "{}" needs ramp_sec'.format(name))
+    if kind == STEP and not profile.get('steps'):
+        raise Exception('Rate profile "step" for event: "{}" needs steps'.format(name))
+    if kind == SPIKE:
+        profile['spike_rate'] = profile.pop('rate_per_sec', 0)
+    try:
+        return RateProfile(kind, rate_per_sec, **profile)
+    except TypeError as e:
+        raise Exception('Invalid rate profile for event: "{}": {}'.format(name, e))
+
+
+class RateDispatcher:
+    """
+    Drives one rate event open loop from its own thread.
+
+    Arrival times are drawn from the rate profile independently of how long executions
+    take, every execution is submitted with its intended arrival time as scheduled time.
+    Latency measured from the intended arrival includes any time spent waiting on a
+    saturated system, so it is not hidden by coordinated omission.
+
+    At most max_backlog executions wait for a free worker, it defaults to the size of
+    the pool the event runs on. Arrivals beyond it, or beyond event.max_parallel, are
+    dropped. A dropped arrival would have waited at least until the next execution of
+    the event finished, that time is counted as its latency.
+    """
+
+    def __init__(self, event, dispatcher, kill_event, clock=time.monotonic, wait=None):
+        self.event = event
+        self.dispatcher = dispatcher
+        self.kill_event = kill_event
+        self.clock = clock
+        self.wait = wait or kill_event.wait
+        self.random = random.Random(event.seed)
+        self.max_backlog = event.max_backlog
+        if self.max_backlog is None:
+            self.max_backlog = dispatcher.pool_size(event)
+        self.arrivals = 0
+        self.dropped = 0
+        self._dropped_arrivals = collections.deque()
+        self.completed = 0
+        self.start_time = None
+        self.end_time = None
+        self.offset_sec = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def next_arrival(self, arrival):
+        rate = self.event.profile.rate_at(arrival - self.start_time + self.offset_sec)
+        if rate <= 0:
+            return arrival + IDLE_STEP_SEC
+        if self.event.arrivals == UNIFORM:
+            return arrival + 1.0 / rate
+        return arrival + self.random.expovariate(rate)
+
+    def start(self, start_time, end_time, offset_sec=0):
+        """
+        Starts the arrivals, offset_sec is how far into the profile the run starts
+        """
+        self.start_time = start_time
+        self.end_time = end_time
+        self.offset_sec = offset_sec
+        if hasattr(self.clock, 'register'):
+            self.clock.register()
+        self._thread = threading.Thread(target=self.run, name='orchestration-rate-{}'.format(self.event.name),
+                                        daemon=True)
+        self._thread.start()
+
+    def run(self):
+        try:
+            arrival = self.next_arrival(self.start_time)
+            while arrival < self.end_time:
+                if self.wait(max(arrival - self.clock(), 0)):
+                    return
+                if self.event.profile.rate_at(arrival - self.start_time + self.offset_sec) > 0:
+                    self.fire(arrival)
+                arrival = self.next_arrival(arrival)
+        finally:
+            if hasattr(self.clock, 'unregister'):
+                self.clock.unregister()
+
+    def fire(self, arrival):
+        self.arrivals += 1
+        if not self.event.is_async and self.dispatcher.backlog(self.event.name) >= self.max_backlog:
+            logger.info('Event "{}" has {} executions waiting, dropping arrival'.format(
+                self.event.name, self.max_backlog))
+            self.dispatcher.stats.skipped(self.event.name)
+            self.drop(arrival)
+            return
+        future = self.dispatcher.submit(self.event, arrival)
+        if future is None:
+            self.drop(arrival)
+        else:
+            future.add_done_callback(self._on_done)
+
+    def drop(self, arrival):
+        with self._lock:
+            self.dropped += 1
+            self._dropped_arrivals.append(arrival)
+            full = len(self._dropped_arrivals) >= MAX_DROPPED_PENDING
+        if full:
+            self.record_dropped()
+
+    def record_dropped(self):
+        """
+        Counts the latency of the dropped arrivals up to now
+        """
+        now = self.clock()
+        with self._lock:
+            arrivals, self._dropped_arrivals = self._dropped_arrivals, collections.deque()
+        for arrival in arrivals:
+            self.dispatcher.stats.add_latency(self.event.name, now - arrival)
+
+    def _on_done(self, future):
+        if not future.cancelled() and future.exception() is None:
+            with self._lock:
+                self.completed += 1
+        self.record_dropped()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.record_dropped()
+
+    def report(self):
+        """
+        Returns the target rate of the profile and the achieved rate of completed executions
+        """
+        elapsed = min(self.clock(), self.end_time) - self.start_time
+        with self._lock:
+            completed = self.completed
+        return {
+            'target_per_sec': self.event.profile.mean_rate(elapsed),
+            'achieved_per_sec': completed / elapsed if elapsed > 0 else 0.0,
+            'arrivals': self.arrivals,
+            'completed': completed,
+            'dropped': self.dropped,
+        }
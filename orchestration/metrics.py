@@ -0,0 +1,337 @@
+import collections
+import logging
+import math
+import numbers
+import threading
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW_SEC = 60
+DEFAULT_INTERVAL_SEC = 60
+WINDOW_SLOTS = 60
+PRECISION = 0.01
+NUMPY_MIN_VALUES = 64
+STATS = ('count', 'rate_per_sec', 'mean', 'min', 'max')
+SUMMARY_PERCENTILES = (50, 95, 99)
+
+
+class LogHistogram:
+    """
+    Counts of values in logarithmic buckets, like an HDR histogram.
+
+    Every bucket covers values within +-precision of its midpoint, so percentiles
+    are accurate to precision relative error and memory only grows with the
+    dynamic range of the values, never with their number.
+    """
+
+    def __init__(self, precision=PRECISION):
+        self.precision = precision
+        self._log_growth = math.log((1 + precision) / (1 - precision))
+        self.positive = collections.Counter()
+        self.negative = collections.Counter()
+        self.zero = 0
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value):
+        return int(math.floor(math.log(value) / self._log_growth))
+
+    def _value(self, index):
+        return math.exp((index + 0.5) * self._log_growth)
+
+    def add(self, value):
+        self.add_many([value])
+
+    def add_many(self, values):
+        if not values:
+            return
+        if numpy is not None and len(values) >= NUMPY_MIN_VALUES:
+            self._add_many_numpy(numpy.asarray(values, dtype=float))
+            return
+        for value in values:
+            if value > 0:
+                self.positive[self._index(value)] += 1
+            elif value < 0:
+                self.negative[self._index(-value)] += 1
+            else:
+                self.zero += 1
+        self._add_totals(len(values), sum(values), min(values), max(values))
+
+    def _add_many_numpy(self, values):
+        for buckets, magnitudes in ((self.positive, values[values > 0]), (self.negative, -values[values < 0])):
+            if magnitudes.size:
+                indexes = numpy.floor(numpy.log(magnitudes) / self._log_growth).astype(numpy.int64)
+                unique, counts = numpy.unique(indexes, return_counts=True)
+                buckets.update(dict(zip(unique.tolist(), counts.tolist())))
+        self.zero += int(numpy.count_nonzero(values == 0))
+        self._add_totals(int(values.size), float(values.sum()), float(values.min()), float(values.max()))
+
+    def _add_totals(self, count, total, minimum, maximum):
+        self.count += count
+        self.total += total
+        self.min = minimum if self.min is None else min(self.min, minimum)
+        self.max = maximum if self.max is None else max(self.max, maximum)
+
+    def snapshot(self):
+        """
+        Returns a copy that can be read while other threads keep adding values
+        """
+        copy = LogHistogram(self.precision)
+        copy.positive.update(dict(self.positive))
+        copy.negative.update(dict(self.negative))
+        copy.zero = self.zero
+        copy.count, copy.total, copy.min, copy.max = self.count, self.total, self.min, self.max
+        return copy
+
+    def merge(self, other):
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zero += other.zero
+        if other.count:
+            self._add_totals(other.count, other.total, other.min, other.max)
+
+    @property
+    def mean(self):
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def percentile(self, q):
+        """
+        Nearest rank percentile, to within precision, clamped to the exact min and max
+        """
+        if not self.count:
+            return None
+        rank = max(int(math.ceil(q / 100.0 * self.count)), 1)
+        seen = 0
+        buckets = [(-self._value(index), count) for index, count in sorted(self.negative.items(), reverse=True)]
+        buckets.append((0.0, self.zero))
+        buckets.extend((self._value(index), count) for index, count in sorted(self.positive.items()))
+        for value, count in buckets:
+            seen += count
+            if seen >= rank:
+                return min(max(value, self.min), self.max)
+        return self.max
+
+
+class RollingWindow:
+    """
+    Histogram of the values seen in the last window_sec, kept as WINDOW_SLOTS
+    histograms of window_sec / WINDOW_SLOTS each which expire one at a time
+    """
+
+    def __init__(self, window_sec, precision=PRECISION):
+        self.window_sec = window_sec
+        self.precision = precision
+        self.slot_sec = window_sec / WINDOW_SLOTS
+        self._slots = collections.deque()
+
+    def _expire(self, now):
+        oldest = int(now // self.slot_sec) - WINDOW_SLOTS
+        while self._slots and self._slots[0][0] <= oldest:
+            self._slots.popleft()
+
+    def add_many(self, values, now):
+        slot = int(now // self.slot_sec)
+        if not self._slots or self._slots[-1][0] != slot:
+            self._slots.append((slot, LogHistogram(self.precision)))
+        self._slots[-1][1].add_many(values)
+        self._expire(now)
+
+    def histogram(self, now):
+        self._expire(now)
+        merged = LogHistogram(self.precision)
+        for slot, histogram in self._slots:
+            merged.merge(histogram)
+        return merged
+
+
+class Metric:
+
+    def __init__(self, name, window_sec, started):
+        self.name = name
+        self.started = started
+        self.total = LogHistogram()
+        self.window = RollingWindow(window_sec)
+
+    def add_many(self, values, now):
+        self.total.add_many(values)
+        self.window.add_many(values, now)
+
+    def summary(self, now):
+        elapsed = max(now - self.started, 1e-9)
+        window = self.window.histogram(now)
+        return {
+            'total': histogram_summary(self.total, elapsed),
+            'window': histogram_summary(window, min(elapsed, self.window.window_sec)),
+        }
+
+
+def histogram_summary(histogram, elapsed):
+    summary = {
+        'count': histogram.count,
+        'sum': histogram.total,
+        'rate_per_sec': histogram.count / elapsed,
+        'mean': histogram.mean,
+        'min': histogram.min,
+        'max': histogram.max,
+    }
+    for q in SUMMARY_PERCENTILES:
+        summary['p{}'.format(q)] = histogram.percentile(q)
+    return summary
+
+
+def get_stat(histogram, stat, elapsed):
+    if stat.startswith('p'):
+        return histogram.percentile(float(stat[1:]))
+    return histogram_summary(histogram, elapsed)[stat]
+
+
+class Threshold:
+    """
+    Rule on a stat of a metric, e.g. {"metric": "latency", "stat": "p99", "max": 0.5}.
+    The stat is taken over the rolling window unless "window" is false, then over the whole run.
+    The rule is not checked until the metric has min_count values in the window or run.
+    """
+
+    def __init__(self, rule):
+        self.metric = rule.get('metric')
+        self.stat = rule.get('stat', 'max')
+        self.minimum = rule.get('min')
+        self.maximum = rule.get('max')
+        self.window = rule.get('window', True)
+        self.min_count = rule.get('min_count', 1)
+        if self.metric is None:
+            raise Exception('Threshold {} has no metric'.format(rule))
+        if self.minimum is None and self.maximum is None:
+            raise Exception('Threshold {} needs a min or max'.format(rule))
+        if self.stat not in STATS and not is_percentile(self.stat):
+            raise Exception('Unknown threshold stat: "{}", valid stats are: {} or a percentile like p99'.format(
+                self.stat, ', '.join(STATS)))
+
+    def check(self, metric, now):
+        """
+        Returns a description of the violation, or None if the rule holds
+        """
+        elapsed = max(now - metric.started, 1e-9)
+        if self.window:
+            histogram, elapsed = metric.window.histogram(now), min(elapsed, metric.window.window_sec)
+        else:
+            histogram = metric.total
+        if histogram.count < self.min_count:
+            return None
+        value = get_stat(histogram, self.stat, elapsed)
+        if self.maximum is not None and value > self.maximum:
+            return 'metric "{}" {} {:.6g} is above {}'.format(self.metric, self.stat, value, self.maximum)
+        if self.minimum is not None and value < self.minimum:
+            return 'metric "{}" {} {:.6g} is below {}'.format(self.metric, self.stat, value, self.minimum)
+        return None
+
+
+def is_percentile(stat):
+    try:
+        return stat.startswith('p') and 0 < float(stat[1:]) <= 100
+    except ValueError:
+        return False
+
+
+class MetricAggregator:
+    """
+    Aggregates results of the form {'metric': name, 'value': number} as they are reported,
+    other results and values that are not finite numbers are ignored.
+
+    Keeps counts, rates and percentiles per metric over the whole run and over a
+    rolling window, logs a summary every interval_sec and checks the thresholds
+    at most once a second. A violated threshold sets the kill_switch, which stops
+    the orchestration and fails the test.
+    """
+    CHECK_INTERVAL_SEC = 1
+
+    def __init__(self, kill_switch=None, thresholds=(), window_sec=DEFAULT_WINDOW_SEC,
+                 interval_sec=DEFAULT_INTERVAL_SEC, clock=time.monotonic):
+        self.kill_switch = kill_switch
+        self.thresholds = [Threshold(rule) for rule in thresholds]
+        self.window_sec = window_sec
+        self.interval_sec = interval_sec
+        self.clock = clock
+        self.metrics = dict()
+        self.violations = list()
+        self._lock = threading.Lock()
+        self.started = clock()
+        self._next_summary = self.started + interval_sec
+        self._next_check = self.started
+
+    def observe(self, results):
+        samples = collections.defaultdict(list)
+        for result in results:
+            if not isinstance(result, dict) or 'metric' not in result:
+                continue
+            value = result.get('value')
+            if isinstance(value, numbers.Real) and not isinstance(value, bool) and math.isfinite(value):
+                samples[result['metric']].append(value)
+        if not samples:
+            return
+        now = self.clock()
+        with self._lock:
+            for name, values in samples.items():
+                if name not in self.metrics:
+                    self.metrics[name] = Metric(name, self.window_sec, self.started)
+                self.metrics[name].add_many(values, now)
+
+    def tick(self):
+        """
+        Checks thresholds and logs the summary when they are due
+        """
+        now = self.clock()
+        if self.thresholds and now >= self._next_check:
+            self._next_check = now + self.CHECK_INTERVAL_SEC
+            self.check_thresholds(now)
+        if now >= self._next_summary:
+            self._next_summary = now + self.interval_sec
+            for line in format_summary(self.summary(now)):
+                logger.info(line)
+
+    def check_thresholds(self, now=None):
+        now = self.clock() if now is None else now
+        violations = list()
+        with self._lock:
+            for threshold in self.thresholds:
+                metric = self.metrics.get(threshold.metric)
+                if metric is not None:
+                    violation = threshold.check(metric, now)
+                    if violation is not None:
+                        violations.append(violation)
+        for violation in violations:
+            logger.error('Threshold violated, stopping test: {}'.format(violation))
+        if violations:
+            self.violations.extend(violations)
+            if self.kill_switch is not None:
+                self.kill_switch.set()
+        return violations
+
+    def summary(self, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            return {name: metric.summary(now) for name, metric in self.metrics.items()}
+
+
+def format_summary(summary):
+    """
+    Formats a metric summary as lines for the terminal
+    """
+    lines = list()
+    for name, metric_summary in summary.items():
+        for scope in ('window', 'total'):
+            values = metric_summary[scope]
+            lines.append('{} ({}): {} values, {:.2f}/s, mean {:.6g}, p50 {:.6g}, p95 {:.6g}, p99 {:.6g}, max {:.6g}'.format(
+                name, scope, values['count'], values['rate_per_sec'],
+                *[math.nan if values[key] is None else values[key] for key in ('mean', 'p50', 'p95', 'p99', 'max')]))
+    return lines
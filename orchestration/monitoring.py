@@ -0,0 +1,162 @@
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+HOST = '127.0.0.1'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+NEXT_EVENTS = 10
+# Prometheus metric name of every timing in the live summary of an event
+TIMING_METRICS = {
+    'duration_sec': 'event_duration_seconds',
+    'lateness_sec': 'event_lateness_seconds',
+}
+
+
+def snapshot(orchestrator):
+    """
+    Current state of a running orchestrator.
+
+    Only copies of the orchestrator's structures are read and no lock that the
+    scheduler thread takes is held, so a scrape never delays the schedule.
+    """
+    now = orchestrator.clock()
+    results = orchestrator.reporter.results
+    try:
+        queue_depth = results.qsize()
+    except (NotImplementedError, OSError, EOFError):
+        queue_depth = None
+    elapsed = 0.0
+    if orchestrator.start_time is not None:
+        elapsed = now - orchestrator.start_time
+    processed = orchestrator.reporter.processed
+    return {
+        'name': orchestrator.name,
+        'elapsed_sec': elapsed,
+        'remaining_sec': orchestrator.total_time_sec - elapsed,
+        'next_events': [{'event': name, 'due_in_sec': deadline - now}
+                        for deadline, name in orchestrator.scheduler.pending()[:NEXT_EVENTS]],
+        'in_flight': orchestrator.dispatcher.in_flight_counts(),
+        'lateness': orchestrator.scheduler.report(),
+        'reporter': {
+            'queue_depth': queue_depth,
+            'processed': processed,
+            'processed_per_sec': processed / elapsed if elapsed > 0 else 0.0,
+        },
+        'events': orchestrator.stats.live_summary(),
+        'metrics': orchestrator.metrics.summary(),
+    }
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**label_values):
+    return '{' + ','.join('{}="{}"'.format(key, escape(value)) for key, value in label_values.items()) + '}'
+
+
+def quantile(stat):
+    return str(float(stat[1:]) / 100)
+
+
+def to_prometheus(status):
+    """
+    Formats a snapshot in the Prometheus text exposition format
+    """
+    run = status['name']
+    lines = list()
+
+    def metric(name, metric_type, help_text, samples):
+        lines.append('# HELP orchestration_{} {}'.format(name, help_text))
+        lines.append('# TYPE orchestration_{} {}'.format(name, metric_type))
+        for sample_labels, value in samples:
+            if value is not None:
+                lines.append('orchestration_{}{} {}'.format(name, labels(run=run, **sample_labels), float(value)))
+
+    def summary_metric(name, help_text, distributions):
+        """
+        distributions are (labels, distribution) with the percentiles, count and sum of the values
+        """
+        metric(name, 'summary', help_text,
+               [(dict(sample_labels, quantile=quantile(stat)), value)
+                for sample_labels, distribution in distributions
+                for stat, value in distribution.items() if stat.startswith('p')])
+        for suffix in ('sum', 'count'):
+            for sample_labels, distribution in distributions:
+                lines.append('orchestration_{}_{}{} {}'.format(
+                    name, suffix, labels(run=run, **sample_labels), float(distribution[suffix])))
+
+    metric('elapsed_seconds', 'gauge', 'Seconds since the orchestration started.', [({}, status['elapsed_sec'])])
+    metric('remaining_seconds', 'gauge', 'Seconds until the orchestration ends.', [({}, status['remaining_sec'])])
+    metric('next_deadline_seconds', 'gauge', 'Seconds until the event is due.',
+           [({'event': event['event']}, event['due_in_sec']) for event in status['next_events']])
+    metric('in_flight', 'gauge', 'Executions of the event currently running.',
+           [({'event': name}, count) for name, count in status['in_flight'].items()])
+    metric('lateness_max_seconds', 'gauge', 'Max time the scheduler fired the event after it was due.',
+           [({'event': name}, lateness['max_sec']) for name, lateness in status['lateness'].items()])
+    metric('missed_total', 'counter', 'Executions skipped because the scheduler was a whole interval behind.',
+           [({'event': name}, lateness['missed']) for name, lateness in status['lateness'].items()])
+    reporter = status['reporter']
+    metric('reporter_queue_depth', 'gauge', 'Results waiting for the reporter.', [({}, reporter['queue_depth'])])
+    metric('reporter_results_total', 'counter', 'Results handled by the reporter.', [({}, reporter['processed'])])
+    events = status['events']
+    for key, help_text in (('executions', 'Finished executions of the event.'),
+                           ('errors', 'Executions of the event that raised.'),
+                           ('skipped', 'Executions of the event skipped by its concurrency policy.')):
+        metric('event_{}_total'.format(key), 'counter', help_text,
+               [({'event': name}, summary[key]) for name, summary in events.items()])
+    for key, help_text in (('duration_sec', 'Duration of the executions of the event.'),
+                           ('lateness_sec', 'Time from when the event was due until it was submitted.')):
+        summary_metric(TIMING_METRICS[key], help_text,
+                       [({'event': name}, summary[key]) for name, summary in events.items()])
+    summary_metric('metric', 'Values reported as {"metric": name, "value": x} results.',
+                   [({'metric': name}, summary['total']) for name, summary in status['metrics'].items()])
+    return '\n'.join(lines) + '\n'
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    orchestrator = None
+
+    def do_GET(self):
+        if self.path not in ('/metrics', '/status'):
+            self.send_error(404)
+            return
+        status = snapshot(self.orchestrator)
+        if self.path == '/metrics':
+            body, content_type = to_prometheus(status).encode('utf-8'), PROMETHEUS_CONTENT_TYPE
+        else:
+            body, content_type = json.dumps(status, indent=2).encode('utf-8'), 'application/json'
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class StatusServer:
+    """
+    Serves /metrics in Prometheus text format and /status as JSON for a running
+    orchestrator, on localhost from its own thread. Port 0 picks a free port.
+    """
+
+    def __init__(self, orchestrator, port=0):
+        handler = type('StatusHandler', (StatusHandler,), {'orchestrator': orchestrator})
+        self.server = ThreadingHTTPServer((HOST, port), handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name='orchestration-status', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        logger.info('Orchestration status on http://{}:{}/metrics and /status'.format(HOST, self.port))
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
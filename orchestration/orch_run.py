@@ -1,3 +1,9 @@
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from orchestration import distributed
 from orchestration import plugin
 
 ESSENTIAL_FIXTURES = ['all_events', 'kill_switch', 'result_reporter']
@@ -7,17 +13,61 @@ def get_path():
     return __file__
 
 
-def generate_test(name, test_time_sec, setup_fixtures):
+def generate_test(test_name, test_time_sec, setup_fixtures, worker_address=None, description_name=None,
+                  **orchestrator_options):
+    fixture_names = ESSENTIAL_FIXTURES + setup_fixtures
+
+    def generated_test(**fixtures):
+        args = [fixtures[fixture_name] for fixture_name in fixture_names]
+        if worker_address is not None:
+            events = {event.name: event.func for event in fixtures['all_events']}
+            distributed.WorkerAgent(worker_address, events, fixtures['kill_switch'], fixtures['result_reporter']).run()
+            return
+        orchestrator = plugin.Orchestrator(test_time_sec, *args, **orchestrator_options)
+        try:
+            orchestrator.run()
+        finally:
+            plugin.publish_run(orchestrator)
+
+    generated_test.__signature__ = inspect.Signature(
+        [inspect.Parameter(fixture_name, inspect.Parameter.POSITIONAL_OR_KEYWORD) for fixture_name in fixture_names])
+    generated_test.__name__ = test_name
+    generated_test.orchestration_name = description_name
+    globals()[test_name] = generated_test
+
+
+def generate_batch_test(test_name, runs, parallel):
+    """
+    Generates one test running the orchestrations of runs, parallel at a time. Each description
+    has its own kill_switch and result_reporter fixtures, all fixtures are resolved before any
+    orchestration starts since pytest can only resolve them from the test thread.
+    """
 
-    def generated_test(*args):
-        orchestrator = plugin.Orchestrator(test_time_sec, *args)
-        orchestrator.run()
+    def generated_test(request):
+        prepared = list()
+        for run in runs:
+            description = plugin.LOADED_DESCRIPTIONS[run['name']]
+            isolated = description['isolated_fixtures']
+            for fixture_name in run['setup_fixtures']:
+                request.getfixturevalue(fixture_name)
+            events = plugin.get_events(request, description)
+            kill_switch = request.getfixturevalue(isolated['kill_switch'])
+            result_reporter = request.getfixturevalue(isolated['result_reporter'])
+            prepared.append((run, events, kill_switch, result_reporter))
 
-    fixture_signature_list = ESSENTIAL_FIXTURES + setup_fixtures
-    fixture_signature_str = ', '.join(fixture_signature_list)
+        def run_orchestration(run, events, kill_switch, result_reporter):
+            orchestrator = plugin.Orchestrator(
+                run['test_time_sec'], events, kill_switch, result_reporter, **run['options'])
+            try:
+                orchestrator.run()
+            finally:
+                plugin.publish_run(orchestrator)
 
-    func_def = 'lambda {fixtures}: generated_test({fixtures})'.format(fixtures=fixture_signature_str)
-    eval_test = eval(func_def, {'generated_test': generated_test})
+        with ThreadPoolExecutor(max_workers=parallel, thread_name_prefix='orchestration-batch') as executor:
+            futures = [(run['name'], executor.submit(run_orchestration, run, *rest)) for run, *rest in prepared]
+        failures = ['{}: {}'.format(name, future.exception()) for name, future in futures if future.exception()]
+        if failures:
+            pytest.fail('Orchestrations failed, {}'.format('; '.join(failures)), False)
 
-    globals()[name] = eval_test
-    globals()[name].__name__ = name
+    generated_test.__name__ = test_name
+    globals()[test_name] = generated_test
@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+STARTUP = 'startup'
+TEARDOWN = 'teardown'
+PHASES = [STARTUP, TEARDOWN]
+
+
+def event_phases(json_config, at_startup=True):
+    """
+    Returns (at_startup, at_teardown) of an event description, from its phase key if set
+    """
+    if 'phase' not in json_config:
+        return json_config.get('at_startup', at_startup), json_config.get('at_teardown', False)
+    phase = json_config['phase']
+    phase_list = [phase] if isinstance(phase, str) else list(phase)
+    for name in phase_list:
+        if name not in PHASES:
+            raise Exception('Unknown phase: "{}" for event: "{}", valid phases are: {}'.format(
+                name, json_config['name'], ', '.join(PHASES)))
+    return STARTUP in phase_list, TEARDOWN in phase_list
+
+
+def dependencies(json_config):
+    depends_on = json_config.get('depends_on', list())
+    if isinstance(depends_on, str):
+        return [depends_on]
+    return list(depends_on)
+
+
+def find_cycle(graph):
+    """
+    Returns the event names of a dependency cycle in graph, a dict of name to the names it
+    depends on, or None if graph is acyclic
+    """
+    visiting, done = list(), set()
+
+    def visit(name):
+        if name in done:
+            return None
+        if name in visiting:
+            return visiting[visiting.index(name):] + [name]
+        visiting.append(name)
+        for dependency in graph.get(name, ()):
+            cycle = visit(dependency)
+            if cycle is not None:
+                return cycle
+        visiting.pop()
+        done.add(name)
+        return None
+
+    for name in graph:
+        cycle = visit(name)
+        if cycle is not None:
+            return cycle
+    return None
+
+
+def check_graph(graph):
+    """
+    Raises an exception if an event depends on an unknown event or if dependencies form a cycle
+    """
+    for name, depends_on in graph.items():
+        for dependency in depends_on:
+            if dependency not in graph:
+                raise Exception('Event "{}" depends on unknown event: "{}"'.format(name, dependency))
+    cycle = find_cycle(graph)
+    if cycle is not None:
+        raise Exception('Events depend on each other in a cycle: {}'.format(' -> '.join(cycle)))
+
+
+def validate(event_configs):
+    """
+    Checks the phase and depends_on keys of the events of a description
+    """
+    graph = dict()
+    for json_config in event_configs:
+        event_phases(json_config)
+        graph.setdefault(json_config['name'], list()).extend(dependencies(json_config))
+    check_graph(graph)
+
+
+class PhaseRunner:
+    """
+    Runs the events of a startup or teardown phase, each as soon as the events it depends on are done.
+
+    Independent events run in parallel on the dispatcher. Events that already ran, e.g.
+    before a run was resumed, can be passed to start() and are taken as done without running. Dependencies on events of
+    known_names that are not part of the phase are ignored, dependencies on any other
+    name are rejected. When an event fails, the events depending on it are not run.
+    Start and end of every execution is recorded for the critical path.
+    """
+
+    def __init__(self, phase, events, submit, clock=time.monotonic, known_names=None):
+        self.phase = phase
+        self.events = events
+        self.submit = submit
+        self.clock = clock
+        names = {event.name for event in events}
+        known_names = names.union(known_names or ())
+        for event in events:
+            for name in event.depends_on:
+                if name not in known_names:
+                    raise Exception('Event "{}" depends on unknown event: "{}"'.format(event.name, name))
+        self.graph = {event.name: [name for name in event.depends_on if name in names] for event in events}
+        check_graph(self.graph)
+        self.start_time = None
+        self.started = dict()
+        self.finished = dict()
+        self.failed = list()
+        self._already_done = set()
+        self._waiting = dict()
+        self._dependents = {name: list() for name in self.graph}
+        for event in events:
+            self._waiting[event.name] = set(self.graph[event.name])
+            for dependency in self.graph[event.name]:
+                self._dependents[dependency].append(event)
+        self._lock = threading.RLock()
+        self._done = threading.Condition(self._lock)
+
+    def start(self, already_done=()):
+        self.start_time = self.clock()
+        with self._lock:
+            self._already_done = set(already_done)
+            for event in self.events:
+                if not self._waiting[event.name]:
+                    self._run(event)
+
+    def _run(self, event):
+        self.started[event.name] = self.clock()
+        if event.name in self._already_done:
+            self._finish(event, True)
+            return
+        future = self.submit(event)
+        if future is None:
+            self._finish(event, True)
+            return
+        future.add_done_callback(lambda done: self._finish(event, not done.cancelled() and not done.exception()))
+
+    def _finish(self, event, succeeded):
+        with self._lock:
+            self.finished[event.name] = self.clock()
+            if not succeeded:
+                self._fail(event)
+            for dependent in self._dependents[event.name]:
+                if dependent.name in self.finished:
+                    continue
+                self._waiting[dependent.name].discard(event.name)
+                if succeeded and not self._waiting[dependent.name]:
+                    self._run(dependent)
+            self._done.notify_all()
+
+    def _fail(self, event):
+        self.failed.append(event.name)
+        for dependent in self._dependents[event.name]:
+            if dependent.name not in self.finished and dependent.name not in self.started:
+                logger.error('Not running {} event "{}", it depends on "{}" which failed'.format(
+                    self.phase, dependent.name, event.name))
+                self.started[dependent.name] = self.finished[dependent.name] = self.clock()
+                self._fail(dependent)
+
+    def succeeded(self):
+        """
+        Returns the names of the events that are done and did not fail
+        """
+        with self._lock:
+            return sorted(name for name in self.finished if name not in self.failed)
+
+    def wait(self, timeout=None):
+        """
+        Waits until every event of the phase is done or not run, returns False on timeout
+        """
+        with self._done:
+            return self._done.wait_for(lambda: len(self.finished) == len(self.graph), timeout)
+
+    def critical_path(self):
+        """
+        Returns the chain of events that decided how long the phase took, ending with the last one done
+        """
+        with self._lock:
+            finished = dict(self.finished)
+        if not finished:
+            return list()
+        name = max(finished, key=finished.get)
+        path = [name]
+        while True:
+            done = [dependency for dependency in self.graph[name] if dependency in finished]
+            if not done:
+                break
+            name = max(done, key=finished.get)
+            path.append(name)
+        return path[::-1]
+
+    def report(self):
+        with self._lock:
+            finished = dict(self.finished)
+            started = dict(self.started)
+        if self.start_time is None or not finished:
+            return None
+        return {
+            'duration_sec': max(finished.values()) - self.start_time,
+            'events': len(self.graph),
+            'failed': list(self.failed),
+            'critical_path': [{
+                'event': name,
+                'start_sec': started[name] - self.start_time,
+                'duration_sec': finished[name] - started[name],
+            } for name in self.critical_path()],
+        }
+
+
+def format_report(phase_reports):
+    lines = list()
+    for phase in PHASES:
+        report = phase_reports.get(phase)
+        if report is None:
+            continue
+        lines.append('{}: {} events in {:.4f}s, {} failed'.format(
+            phase, report['events'], report['duration_sec'], len(report['failed'])))
+        for step in report['critical_path']:
+            lines.append('  {:<40} start {:>10.4f}s  took {:>10.4f}s'.format(
+                step['event'], step['start_sec'], step['duration_sec']))
+    return lines
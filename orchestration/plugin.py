@@ -1,24 +1,69 @@
+import fnmatch
 import functools
 import importlib
 import inspect
-import json
 import logging
-import multiprocessing
-import os
-import copy
 import time
 import types
 from concurrent.futures import ThreadPoolExecutor
 from os import path
 
 import pytest
+from orchestration import checkpoint
+from orchestration import descriptions
+from orchestration import dispatch
+from orchestration import distributed
+from orchestration import history
+from orchestration import load
+from orchestration import metrics
+from orchestration import monitoring
 from orchestration import orch_run
+from orchestration import phases
+from orchestration import profiling
+from orchestration import registry
 from orchestration import reporter
+from orchestration import scheduler
+from orchestration import simulation
+from orchestration import sinks
+from orchestration import stats
+from orchestration import timer
+from orchestration import symbols
+from orchestration import transport
 
 
 logger = logging.getLogger(__name__)
-UNIQUE_ID = list(range(100))
-LOADED_DESCRIPTIONS = dict()
+LOADED_DESCRIPTIONS = descriptions.LazyDescriptions()
+SYMBOL_TABLES = dict()
+# Run reports of the --run-orch and --simulate-orch tests, shown in the terminal summary
+PUBLISHED_RUNS = dict()
+BATCH_NAMES = list()
+BATCH_TEST_NAME = 'test_orchestration_batch'
+INI_OPTIONS = {
+    'orchestration_sources': 'comma separated python files with the event functions',
+    'orchestration_descriptions': 'folder with the orchestration description .json files',
+    'orchestration_timeout': 'sec added to the description run time before the test times out',
+    'orchestration_max_workers': 'size of the thread pool events run on',
+    'orchestration_max_processes': 'size of the process pool of process events',
+    'orchestration_report_transport': 'queue results are reported through: manager, process, pipe, thread, shm_ring',
+    'orchestration_ring_format': 'struct format of the shm_ring records',
+    'orchestration_ring_capacity': 'number of records the shm_ring holds',
+    'orchestration_result_sink': 'where results go: log, ndjson or binary',
+    'orchestration_result_path': 'file the result sink writes to',
+    'orchestration_result_max_bytes': 'size the result file is rotated at',
+    'orchestration_result_compression': 'compression of rotated result files',
+    'orchestration_stats_file': 'file the event timings are written to, .csv or .json',
+    'orchestration_history_records': 'executions per event kept in memory before spilling to disk',
+    'orchestration_history_dir': 'folder execution history is spilled to',
+    'orchestration_metrics_window_sec': 'rolling window of the metric aggregates',
+    'orchestration_metrics_interval_sec': 'how often metric thresholds are checked',
+    'orchestration_status_port': 'port /metrics and /status are served on',
+    'orchestration_checkpoint_dir': 'folder checkpoints are written to',
+    'orchestration_checkpoint_interval_sec': 'how often the run is checkpointed',
+    'orchestration_simulation_file': 'file the --simulate-orch report is written to',
+    'orchestration_timer_spin_sec': 'sec the scheduler spins before a deadline instead of sleeping',
+    'orchestration_profile_dir': 'folder event profiles are written to',
+    'orchestration_done_timeout_sec': 'sec a distributed firing may run before missing workers fail it',
+}
 
 
 @pytest.fixture
@@ -26,7 +71,11 @@ def kill_switch(request):
     """
     Event that will be set when test is ended so we know when subprocess should be killed
     """
-    kill_event = multiprocessing.Event()
+    return create_kill_switch(request)
+
+
+def create_kill_switch(request):
+    kill_event = transport.CONTEXT.Event()
 
     def fin():
         kill_event.set()
@@ -36,20 +85,57 @@ def kill_switch(request):
 
 
 @pytest.fixture
-def report_queue():
-    result_queue = multiprocessing.Manager().Queue()
+def report_queue(request):
+    """
+    Queue the result_reporter is fed through, the transport is selected with
+    "orchestration_report_transport" in the .ini file
+    """
+    return create_report_queue(request)
+
+
+def create_report_queue(request):
+    transport_name = get_ini_value(request.config, 'orchestration_report_transport', 'manager')
+    options = dict()
+    if transport_name == 'shm_ring':
+        options['record_format'] = get_ini_value(request.config, 'orchestration_ring_format', 'd')
+        options['capacity'] = int(get_ini_value(request.config, 'orchestration_ring_capacity', 65536))
+    result_queue = transport.create_report_queue(transport_name, **options)
+    if hasattr(result_queue, 'close'):
+        request.addfinalizer(result_queue.close)
     return result_queue
 
 
 @pytest.fixture
-def result_reporter(report_queue):
-    result_reporter = reporter.ResultReporter(report_queue)
+def result_reporter(request, report_queue):
+    """
+    Reporter the events report through, "orchestration_result_sink" in the .ini file
+    selects if results are logged or written to files
+    """
+    return create_result_reporter(request, report_queue, getattr(request.function, 'orchestration_name', None))
+
+
+def create_result_reporter(request, report_queue, name=None):
+    """
+    When several descriptions run in one session, result files are prefixed with the test_name of the description
+    """
+    sink = get_ini_value(request.config, 'orchestration_result_sink', sinks.LOG)
+    result_path = get_ini_value(request.config, 'orchestration_result_path')
+    if sink in sinks.SINKS and name is not None:
+        result_path = batch_path(result_path or 'orchestration_results' + sinks.SINKS[sink].EXTENSION, name)
+    result_reporter = sinks.create_sink(
+        sink,
+        report_queue,
+        path=result_path,
+        max_bytes=int(get_ini_value(request.config, 'orchestration_result_max_bytes', sinks.DEFAULT_MAX_BYTES)),
+        compression=get_ini_value(request.config, 'orchestration_result_compression'))
     return result_reporter
 
 
 @pytest.fixture
 def target_description(request):
-    orchestration_name = request.config.getoption('--run-orch')
+    orchestration_name = getattr(request.function, 'orchestration_name', None)
+    if orchestration_name is None:
+        orchestration_name = run_patterns(request.config.getoption('--run-orch'))[0]
     orchestration_config = LOADED_DESCRIPTIONS[orchestration_name]
     return orchestration_config
 
@@ -78,72 +164,113 @@ def generate_value_fixture(value):
     return pytest.fixture(generated_fixture)
 
 
-def generate_factory_fixture(func, new_params):
+def generate_factory_fixture(func, renamed):
+    """
+    Generates a fixture returning a no argument callable that calls func with its fixtures.
+    Parameters of func in renamed, {"video_path": "nightly_video_path_3"}, are renamed so
+    pytest resolves them to the generated value fixtures.
+    """
+    signature = inspect.signature(func)
+    fixture_params = list()
+    positional_only = list()
+    call_names = dict()
+    for param in signature.parameters.values():
+        fixture_name = renamed.get(param.name, param.name)
+        fixture_params.append(param.replace(name=fixture_name))
+        if param.kind == inspect.Parameter.POSITIONAL_ONLY:
+            positional_only.append(fixture_name)
+        else:
+            call_names[fixture_name] = param.name
 
-    def generated_fixture(*args, **kwargs):
+    def generated_fixture(**fixtures):
+        args = tuple(fixtures[name] for name in positional_only)
+        kwargs = {call_names[name]: value for name, value in fixtures.items() if name in call_names}
 
-        def factory_func():
-            func(*args, **kwargs)
+        if inspect.iscoroutinefunction(func):
+            async def factory_func():
+                await func(*args, **kwargs)
+        else:
+            def factory_func():
+                func(*args, **kwargs)
 
+        factory_func.func = func
+        factory_func.args = args
+        factory_func.kwargs = kwargs
         return factory_func
 
-    args_str = adjust_parameters(func, new_params)
-    func_def = 'lambda {args}: generated_fixture({args})'.format(args=args_str)
-    eval_func = eval(func_def, {'generated_fixture': generated_fixture})
-    return pytest.fixture(functools.wraps(func)(eval_func))
-
-
-def adjust_parameters(func, params):
-    arg_spec = inspect.getargspec(func)
-    formatted_args = inspect.formatargspec(*arg_spec)
-    sig = inspect.signature(func)
-    param_sig_list = list(sig.parameters.values())
-
-    for param in params:
-        param_name = param.rsplit('_', 1)[0]
-        formatted_args = formatted_args.replace(param_name, param)
-        for i, old_param in enumerate(param_sig_list):
-            if old_param.name == param_name:
-                param_sig_list[i] = old_param.replace(name=param)
-    func.__signature__ = sig.replace(parameters=param_sig_list)
-    clean_args_str = formatted_args.lstrip('(').rstrip(')')
-    return clean_args_str
+    generated_fixture.__signature__ = signature.replace(parameters=fixture_params)
+    generated_fixture.__name__ = func.__name__
+    generated_fixture.__qualname__ = func.__qualname__
+    generated_fixture.__doc__ = func.__doc__
+    return pytest.fixture(generated_fixture)
 
 
 def setup_value_fixtures(orchestration_description):
-    desc_working_copy = copy.deepcopy(orchestration_description)
-    for i, event in enumerate(desc_working_copy['events']):
+    """
+    Generates a fixture per param, the params of every event are renamed to their fixture
+    and the original names are kept in "param_fixtures" of the event
+    """
+    test_name = orchestration_description['test_name']
+    fixtures = dict()
+    for position, event in enumerate(orchestration_description['events']):
         if 'params' not in event:
             continue
-        for param_name, param_value in event['params'].items():
-            unique_name = '{}_{}'.format(param_name, UNIQUE_ID.pop(0))
-            globals()[unique_name] = generate_value_fixture(param_value)
-            orchestration_description['events'][i]['params'][unique_name] = orchestration_description['events'][i]['params'].pop(param_name)
+        event['param_fixtures'] = dict()
+        for param_name, param_value in list(event['params'].items()):
+            unique_name = registry.REGISTRY.unique_name(test_name, registry.PARAM, param_name, position)
+            fixtures[unique_name] = generate_value_fixture(param_value)
+            event['params'][unique_name] = event['params'].pop(param_name)
+            event['param_fixtures'][param_name] = unique_name
+    registry.REGISTRY.register(fixtures)
 
 
-def setup_factory_fixtures(sources, orchestration_description):
-    module_sources = list()
+def get_symbol_table(sources):
+    """
+    Imports every orchestration_sources module once and builds the table of event functions
+    """
+    key = tuple(sources)
+    if key in SYMBOL_TABLES:
+        return SYMBOL_TABLES[key]
+    modules = list()
     for source in sources:
+        source = source.strip()
         if not path.exists(source):
             logger.warning('Specified orchestration_source: {} do not exist!'.format(source))
             continue
-        event_module = filepath_to_modulepath(source)
-        module_sources.append(event_module)
+        modules.append(importlib.import_module(filepath_to_modulepath(source)))
+    SYMBOL_TABLES[key] = symbols.SymbolTable(modules)
+    return SYMBOL_TABLES[key]
 
-    for i, event in enumerate(orchestration_description['events']):
+
+def setup_factory_fixtures(sources, orchestration_description):
+    symbol_table = get_symbol_table(sources)
+    test_name = orchestration_description['test_name']
+    fixtures = dict()
+    generated_names = dict()
+    for position, event in enumerate(orchestration_description['events']):
         event_name = event['name']
-        for module in module_sources:
-            tmp_module = importlib.import_module(module)
-            try:
-                event_fun = copy_func(getattr(tmp_module, event_name))
-                generated_event_name = '{}_{}'.format(event_name, UNIQUE_ID.pop(0))
-                event_params = event.get('params', list())
-                globals()[generated_event_name] = generate_factory_fixture(event_fun, event_params)
-                orchestration_description['events'][i]['name'] = generated_event_name
-                break
-            except Exception as e:
-                logger.debug('Caught exception {}'.format(e))
-                pass
+        event_fun = symbol_table.resolve(event_name)
+        generated_event_name = registry.REGISTRY.unique_name(test_name, registry.EVENT, event_name, position)
+        renamed = dict(event.get('param_fixtures', dict()))
+        renamed.update(orchestration_description.get('isolated_fixtures', dict()))
+        fixtures[generated_event_name] = generate_factory_fixture(event_fun, renamed)
+        event['name'] = generated_event_name
+        generated_names.setdefault(event_name, list()).append(generated_event_name)
+    rename_dependencies(orchestration_description['events'], generated_names)
+    orchestration_description['generated_names'] = generated_names
+    registry.REGISTRY.register(fixtures)
+
+
+def rename_dependencies(events, generated_names):
+    """
+    Points the depends_on of events at the generated event names, a name used by several
+    events of the description depends on all of them
+    """
+    for event in events:
+        if 'depends_on' not in event:
+            continue
+        event['depends_on'] = [generated_name for name in phases.dependencies(event)
+                               for generated_name in generated_names.get(name, [name])]
 
 
 def copy_func(func):
@@ -159,8 +286,34 @@ def copy_func(func):
     return new_func
 
 
-def _setup_fixtures(orch_source, orchestration_description):
+def setup_isolated_fixtures(orchestration_description):
+    """
+    Generates a kill_switch and result_reporter fixture for the description, its events get them
+    instead of the shared ones so it can run in parallel with other descriptions in one test
+    """
+    name = orchestration_description['test_name']
+
+    def isolated_kill_switch(request):
+        return create_kill_switch(request)
+
+    def isolated_result_reporter(request):
+        return create_result_reporter(request, create_report_queue(request), name)
+
+    isolated = {
+        'kill_switch': registry.REGISTRY.unique_name(name, registry.ISOLATED, 'kill_switch'),
+        'result_reporter': registry.REGISTRY.unique_name(name, registry.ISOLATED, 'result_reporter'),
+    }
+    orchestration_description['isolated_fixtures'] = isolated
+    registry.REGISTRY.register({
+        isolated['kill_switch']: pytest.fixture(isolated_kill_switch),
+        isolated['result_reporter']: pytest.fixture(isolated_result_reporter),
+    })
+
+
+def _setup_fixtures(orch_source, orchestration_description, isolated=False):
     setup_value_fixtures(orchestration_description)
+    if isolated:
+        setup_isolated_fixtures(orchestration_description)
     setup_factory_fixtures(orch_source, orchestration_description)
     LOADED_DESCRIPTIONS[orchestration_description['test_name']] = orchestration_description
 
@@ -174,90 +327,340 @@ def get_json_description(base_folder, name):
     if not name.endswith('.json'):
         name += '.json'
     description_path = path.join(base_folder, name)
-    with open(description_path) as f:
-        try:
-            description_config = json.load(f, strict=False)
-        except Exception as e:
-            logger.error('Failed to load config file: "{}", error: {}'.format(name, e))
-            return None
-    return description_config
+    return descriptions.load_description(description_path)
 
 
 def get_source_and_desc_folder(config):
-    try:
-        orchestration_sources = config.sections['pytest']['orchestration_sources'].split(',')
-    except KeyError:
+    orchestration_sources = get_ini_value(config, 'orchestration_sources')
+    if orchestration_sources is None:
         raise Exception('No "orchestration_sources" entry found in .ini config')
-    try:
-        orchestration_descriptions_folder = config.sections['pytest']['orchestration_descriptions']
-    except KeyError:
+    orchestration_descriptions_folder = get_ini_value(config, 'orchestration_descriptions')
+    if orchestration_descriptions_folder is None:
         raise Exception('No "orchestration_descriptions" entry found in .ini config file')
-    return orchestration_sources, orchestration_descriptions_folder
+    return orchestration_sources.split(','), orchestration_descriptions_folder
 
 
+def get_ini_value(config, name, default=None):
+    """
+    Returns the value of one of INI_OPTIONS, or default if it is not set
+    """
+    value = config.getini(name)
+    if value in ('', None):
+        return default
+    return value
+
+
+def batch_path(file_path, name):
+    """
+    Prefixes the file name with the description test_name when several descriptions run in one session
+    """
+    if file_path is None or len(BATCH_NAMES) < 2:
+        return file_path
+    return path.join(path.dirname(file_path), '{}_{}'.format(name, path.basename(file_path)))
+
+
+def run_patterns(run_orch):
+    """
+    Returns the description names and globs of --run-orch, given comma separated or as several options
+    """
+    patterns = list()
+    for value in run_orch or list():
+        patterns.extend(pattern.strip() for pattern in value.split(',') if pattern.strip())
+    return patterns
+
+
+def resolve_names(index, patterns):
+    """
+    Returns the description names matching patterns, in the order given and without duplicates
+    """
+    names = list()
+    for pattern in patterns:
+        if any(char in pattern for char in '*?['):
+            if not index.entries:
+                index.refresh()
+            matches = fnmatch.filter(index.names(), pattern)
+            if not matches:
+                logger.warning('No orchestration description matches: "{}"'.format(pattern))
+        else:
+            matches = [pattern]
+        names.extend(name for name in matches if name not in names)
+    return names
+
+
+@pytest.hookimpl(trylast=True)
 def pytest_configure(config):
-    config_to_run = config.getoption('--run-orch')
+    registry.REGISTRY.install(config.pluginmanager)
+    PUBLISHED_RUNS.clear()
+    config_to_run = run_patterns(config.getoption('--run-orch')) or None
     if config.getoption('--load-orch') or config_to_run:
-        orchestration_sources, orchestration_descriptions_folder = get_source_and_desc_folder(config.inicfg.config)
-        for root, dirs, files in os.walk(orchestration_descriptions_folder, topdown=False):
-            for name in files:
-                orchestration_description = get_json_description(root, name)
-                if orchestration_description is None:
-                    continue
-                # If --run-orch not specified we setup all fixtures
-                if config_to_run is None:
-                    _setup_fixtures(orchestration_sources, orchestration_description)
-                # If --run-orch is specified we only setup its related fixtures
-                elif config_to_run == orchestration_description['test_name']:
-                    _setup_fixtures(orchestration_sources, orchestration_description)
-                    _setup_test(config, orchestration_description)
-                    return
-        pytest.exit('Failed to setup orchestration!')
-
-
-def _setup_test(config, orch_desc):
+        orchestration_sources, orchestration_descriptions_folder = get_source_and_desc_folder(config)
+        index = descriptions.DescriptionIndex(orchestration_descriptions_folder, getattr(config, 'cache', None))
+        # If --run-orch not specified all descriptions are set up on first use
+        if config_to_run is None:
+            index.refresh()
+            loader = functools.partial(_load_description, index, orchestration_sources)
+            LOADED_DESCRIPTIONS.defer(index.names(), loader)
+            return
+        # If --run-orch is specified we only load and setup the fixtures of its descriptions
+        BATCH_NAMES[:] = resolve_names(index, config_to_run)
+        isolated = len(BATCH_NAMES) > 1 and int(config.getoption('--orch-parallel')) > 1
+        orchestration_descriptions = list()
+        for name in BATCH_NAMES:
+            orchestration_description = index.load(name)
+            if orchestration_description is None:
+                pytest.exit('Failed to setup orchestration: "{}"!'.format(name))
+            _setup_fixtures(orchestration_sources, orchestration_description, isolated)
+            orchestration_descriptions.append(orchestration_description)
+        if not orchestration_descriptions:
+            pytest.exit('Failed to setup orchestration!')
+        _setup_tests(config, orchestration_descriptions)
+
+
+def _load_description(index, orchestration_sources, name):
+    orchestration_description = index.load(name)
+    if orchestration_description is None:
+        raise KeyError(name)
+    _setup_fixtures(orchestration_sources, orchestration_description)
+
+
+def pytest_sessionstart(session):
+    registry.REGISTRY.session_started(session)
+
+
+def pytest_sessionfinish(session):
+    registry.REGISTRY.session_finished()
+
+
+def _setup_tests(config, orch_descs):
+    """
+    Generates a test per description, or a single test running them --orch-parallel at a time
+    """
+    timeout = float(get_ini_value(config, 'orchestration_timeout', 60*60))
+    parallel = int(config.getoption('--orch-parallel'))
+    if len(orch_descs) > 1 and (config.getoption('--orch-coordinator') or config.getoption('--orch-worker')):
+        raise Exception('Distributed runs take a single orchestration description')
+    runs = [_setup_run(config, orch_desc) for orch_desc in orch_descs]
+    if len(runs) > 1 and parallel > 1:
+        for i, run in enumerate(runs):
+            # Every orchestration running at the same time needs a status port of its own
+            if run['options'].get('status_port'):
+                run['options']['status_port'] += i
+        orch_run.generate_batch_test(BATCH_TEST_NAME, runs, parallel)
+        test_names = [BATCH_TEST_NAME]
+        test_time_sec = sum(run['test_time_sec'] for run in runs)
+    else:
+        for run in runs:
+            orch_run.generate_test(run['test_name'], run['test_time_sec'], run['setup_fixtures'],
+                                   description_name=run['name'], **run['options'])
+        test_names = [run['test_name'] for run in runs]
+        test_time_sec = max(run['test_time_sec'] for run in runs)
+    config.args.append(orch_run.get_path())
+    config.option.timeout = float(test_time_sec + timeout)
+    config.option.keyword = ' or '.join(test_names)
+
+
+def _setup_run(config, orch_desc):
+    """
+    Returns the test name, run time, setup fixtures and Orchestrator options of a description
+    """
     test_name = 'test_{}'.format(orch_desc['test_name'])
-    timeout = config.inicfg.config.sections['pytest'].get('orchestration_timeout', 60*60)
 
     if config.getoption('--runtime-orch'):
         orch_desc['total_hours'] = float(config.getoption('--runtime-orch'))
 
     test_time_sec = orch_desc['total_hours'] * 3600
+    phases.validate(orch_desc['events'])
     setup_fixtures = orch_desc.get('unref_setup_fixtures', list())
-    orch_run.generate_test(test_name, test_time_sec, setup_fixtures)
-    config.args.append(orch_run.get_path())
-    config.option.timeout = float(test_time_sec + timeout)
-    config.option.keyword = test_name
+    orchestrator_options = dict()
+    for option in ['max_workers', 'max_processes', 'history_records']:
+        value = get_ini_value(config, 'orchestration_{}'.format(option))
+        if value is not None:
+            orchestrator_options[option] = int(value)
+    orchestrator_options['name'] = orch_desc['test_name']
+    orchestrator_options['stats_path'] = batch_path(get_ini_value(config, 'orchestration_stats_file'),
+                                                    orch_desc['test_name'])
+    orchestrator_options['history_dir'] = get_ini_value(config, 'orchestration_history_dir')
+    orchestrator_options['thresholds'] = orch_desc.get('thresholds', list())
+    if config.getoption('--simulate-orch'):
+        orchestrator_options['clock'] = simulation.create_clock(config.getoption('--simulate-orch'))
+        orchestrator_options['stub_events'] = not config.getoption('--simulate-execute')
+        orchestrator_options['simulation_path'] = batch_path(
+            get_ini_value(config, 'orchestration_simulation_file'), orch_desc['test_name'])
+    checkpoint_file = checkpoint.checkpoint_path(get_checkpoint_folder(config), orch_desc['test_name'])
+    if not config.getoption('--simulate-orch'):
+        orchestrator_options['checkpoint_file'] = checkpoint_file
+    orchestrator_options['checkpoint_interval_sec'] = float(
+        get_ini_value(config, 'orchestration_checkpoint_interval_sec', checkpoint.DEFAULT_INTERVAL_SEC))
+    if config.getoption('--resume-orch'):
+        orchestrator_options['resume'] = checkpoint.load(checkpoint_file)
+        if orchestrator_options['resume'] is None:
+            logger.warning('No checkpoint to resume from in "{}", starting from the beginning'.format(checkpoint_file))
+    status_port = config.getoption('--orch-status-port') or get_ini_value(config, 'orchestration_status_port')
+    if status_port is not None:
+        orchestrator_options['status_port'] = int(status_port)
+    orchestrator_options['profiler'] = config.getoption('--orch-profiler')
+    orchestrator_options['profile_dir'] = get_ini_value(config, 'orchestration_profile_dir')
+    for option in ['metrics_window_sec', 'metrics_interval_sec', 'timer_spin_sec']:
+        value = get_ini_value(config, 'orchestration_{}'.format(option))
+        if value is not None:
+            orchestrator_options[option] = float(value)
+    if config.getoption('--orch-coordinator'):
+        orchestrator_options['coordinator_address'] = distributed.parse_address(config.getoption('--orch-coordinator'))
+        orchestrator_options['workers'] = int(config.getoption('--orch-workers'))
+        orchestrator_options['done_timeout_sec'] = float(get_ini_value(
+            config, 'orchestration_done_timeout_sec', distributed.DEFAULT_DONE_TIMEOUT_SEC))
+    if config.getoption('--orch-worker'):
+        orchestrator_options = dict(worker_address=distributed.parse_address(config.getoption('--orch-worker')))
+    return {
+        'name': orch_desc['test_name'],
+        'test_name': test_name,
+        'test_time_sec': test_time_sec,
+        'setup_fixtures': setup_fixtures,
+        'options': orchestrator_options,
+    }
+
+
+def get_checkpoint_folder(config):
+    """
+    Checkpoints go to "orchestration_checkpoint_dir" from the .ini file, or the pytest cache
+    """
+    folder = get_ini_value(config, 'orchestration_checkpoint_dir')
+    if folder is not None:
+        return folder
+    cache = getattr(config, 'cache', None)
+    if cache is None:
+        return '.'
+    make_folder = getattr(cache, 'mkdir', None) or cache.makedir
+    return str(make_folder('orchestration'))
+
+
+def publish_run(orchestrator):
+    """
+    Adds the run report of orchestrator to the terminal summary
+    """
+    PUBLISHED_RUNS[orchestrator.name] = orchestrator.run_report
+
+
+def pytest_terminal_summary(terminalreporter):
+    for name, run_report in PUBLISHED_RUNS.items():
+        if 'summary' in run_report:
+            terminalreporter.write_sep('-', 'orchestration event timings: {}'.format(name))
+            for line in stats.format_summary(run_report['summary']):
+                terminalreporter.write_line(line)
+        if 'timers' in run_report:
+            terminalreporter.write_line(timer.format_accuracy(run_report['timers']))
+        if run_report.get('profiles'):
+            terminalreporter.write_sep('-', 'orchestration profiles: {}'.format(name))
+            for file_path in run_report['profiles']:
+                terminalreporter.write_line(file_path)
+        if 'phases' in run_report:
+            terminalreporter.write_sep('-', 'orchestration phases: {}'.format(name))
+            for line in phases.format_report(run_report['phases']):
+                terminalreporter.write_line(line)
+        if 'simulation' in run_report:
+            terminalreporter.write_sep('-', 'orchestration simulation: {}'.format(name))
+            for line in simulation.format_report(run_report['simulation']):
+                terminalreporter.write_line(line)
+        if 'metrics' in run_report:
+            terminalreporter.write_sep('-', 'orchestration metrics: {}'.format(name))
+            for line in metrics.format_summary(run_report['metrics']):
+                terminalreporter.write_line(line)
 
 
 def pytest_addoption(parser):
     group = parser.getgroup("orchestration", "orchestrating tests")
+    for name, help_text in INI_OPTIONS.items():
+        parser.addini(name, help_text)
     group.addoption('--load-orch', action='store_true', default=False, help='orchestration events will be loaded')
-    group.addoption('--run-orch', action='store', help='orchestration description name')
+    group.addoption('--run-orch', action='append',
+                    help='orchestration description names or globs, comma separated or given several times')
+    group.addoption('--orch-parallel', action='store', default=1, metavar='N',
+                    help='run up to N of the --run-orch descriptions at the same time')
     group.addoption('--runtime-orch', action='store', help='Optional, runtime for orch test, will override description value')
+    group.addoption('--orch-coordinator', action='store', metavar='HOST:PORT',
+                    help='run the schedule as coordinator, executing events on workers connecting to HOST:PORT')
+    group.addoption('--orch-workers', action='store', default=1, help='number of workers the coordinator waits for')
+    group.addoption('--simulate-orch', action='store', nargs='?', const=simulation.INSTANT, metavar='SPEEDUP',
+                    help='run the orchestration on a virtual clock, instantly or SPEEDUP times faster than real time')
+    group.addoption('--simulate-execute', action='store_true', default=False,
+                    help='execute the events when simulating instead of stubbing them')
+    group.addoption('--orch-profiler', action='store', choices=profiling.PROFILERS,
+                    help='profile every event, the profiler key of an event takes precedence')
+    group.addoption('--resume-orch', action='store_true', default=False,
+                    help='resume the --run-orch orchestration from its last checkpoint')
+    group.addoption('--orch-status-port', action='store', metavar='PORT',
+                    help='serve /metrics and /status of the running orchestration on localhost:PORT')
+    group.addoption('--orch-worker', action='store', metavar='HOST:PORT',
+                    help='run as a worker executing events for the coordinator at HOST:PORT')
 
 
 def create_event_from_json(json_config, func):
     name = json_config['name']
+    if 'rate_per_sec' in json_config or 'profile' in json_config:
+        return create_rate_event_from_json(json_config, func)
     if json_config.get('interval_sec'):
         interval_sec = json_config.get('interval_sec')
+    elif json_config.get('interval_ms'):
+        interval_sec = json_config.get('interval_ms') / 1000.0
     elif json_config.get('interval_min'):
         interval_sec = json_config.get('interval_min') * 60
     elif json_config.get('interval_hour'):
         interval_sec = json_config.get('interval_hour') * 60 * 60
     else:
         interval_sec = None
-    at_startup = json_config.get('at_startup', True)
-    at_teardown = json_config.get('at_teardown', False)
-    event = Event(name, func, interval_sec, at_startup, at_teardown)
+    if interval_sec is not None and interval_sec < 0:
+        raise Exception('Interval of event: "{}" can not be negative'.format(name))
+    at_startup, at_teardown = phases.event_phases(json_config)
+    concurrency = json_config.get('concurrency', dispatch.QUEUE)
+    if concurrency not in dispatch.POLICIES:
+        raise Exception('Unknown concurrency policy: "{}" for event: "{}", valid policies are: {}'.format(
+            concurrency, name, ', '.join(dispatch.POLICIES)))
+    max_parallel = json_config.get('max_parallel', 1)
+    executor = json_config.get('executor', dispatch.THREAD)
+    if executor not in dispatch.EXECUTORS:
+        raise Exception('Unknown executor: "{}" for event: "{}", valid executors are: {}'.format(
+            executor, name, ', '.join(dispatch.EXECUTORS)))
+    event = Event(name, func, interval_sec, at_startup, at_teardown, concurrency, max_parallel, executor,
+                  phases.dependencies(json_config), json_config.get('jitter_sec', 0),
+                  json_config.get('phase_offset_sec', 0), json_config.get('profiler'))
+    if event.profiler is not None:
+        profiling.check_profiler(event.profiler, event)
     return event
 
 
+def create_rate_event_from_json(json_config, func):
+    name = json_config['name']
+    arrivals = json_config.get('arrivals', load.POISSON)
+    if arrivals not in load.ARRIVALS:
+        raise Exception('Unknown arrivals: "{}" for event: "{}", valid arrivals are: {}'.format(
+            arrivals, name, ', '.join(load.ARRIVALS)))
+    executor = json_config.get('executor', dispatch.THREAD)
+    if executor not in dispatch.EXECUTORS:
+        raise Exception('Unknown executor: "{}" for event: "{}", valid executors are: {}'.format(
+            executor, name, ', '.join(dispatch.EXECUTORS)))
+    at_startup, at_teardown = phases.event_phases(json_config, at_startup=False)
+    return RateEvent(
+        name,
+        func,
+        load.create_profile(json_config),
+        arrivals,
+        at_startup,
+        at_teardown,
+        json_config.get('max_parallel', float('inf')),
+        executor,
+        json_config.get('seed'),
+        phases.dependencies(json_config),
+        json_config.get('profiler'),
+        json_config.get('max_backlog'))
+
+
 class Event:
     """
     A class representing the event being used in a orchestration test.
     Holds configurations, result and a reference to the callable function
     """
+    __slots__ = ('name', 'func', 'interval_sec', 'at_startup', 'at_teardown', 'concurrency', 'max_parallel',
+                 'executor', 'is_async', 'depends_on', 'jitter_sec', 'phase_offset_sec', 'profiler')
 
     def __init__(
             self,
@@ -265,122 +668,305 @@ class Event:
             func,
             interval_sec,
             at_startup,
-            at_teardown):
+            at_teardown,
+            concurrency=dispatch.QUEUE,
+            max_parallel=1,
+            executor=dispatch.THREAD,
+            depends_on=(),
+            jitter_sec=0,
+            phase_offset_sec=0,
+            profiler=None):
         self.name = name
         self.func = func
         self.interval_sec = interval_sec
-        self._time_left = interval_sec
         self.at_startup = at_startup
         self.at_teardown = at_teardown
+        self.concurrency = concurrency
+        self.max_parallel = max_parallel
+        self.executor = executor
+        self.is_async = inspect.iscoroutinefunction(func)
+        self.depends_on = list(depends_on)
+        self.jitter_sec = jitter_sec
+        self.phase_offset_sec = phase_offset_sec
+        self.profiler = profiler
 
-    @property
-    def time_left(self):
-        return self._time_left
 
-    @time_left.setter
-    def time_left(self, time):
-        if time >= 0:
-            self._time_left = time
-        else:
-            self._time_left = 0
+class RateEvent(Event):
+    """
+    An open loop load event, executed at the rate given by its load.RateProfile
+    instead of on an interval. Executions overlap up to max_parallel and at most
+    max_backlog wait for a free worker, None is the pool size. Arrivals beyond that
+    are dropped and counted as skipped.
+    """
+    __slots__ = ('profile', 'arrivals', 'seed', 'max_backlog')
 
-    def reset(self):
-        """
-        Resets the wait time for the event
-        """
-        self.time_left = self.interval_sec
+    def __init__(
+            self,
+            name,
+            func,
+            profile,
+            arrivals=load.POISSON,
+            at_startup=False,
+            at_teardown=False,
+            max_parallel=float('inf'),
+            executor=dispatch.THREAD,
+            seed=None,
+            depends_on=(),
+            profiler=None,
+            max_backlog=None):
+        super().__init__(name, func, None, at_startup, at_teardown, dispatch.ALLOW_OVERLAP, max_parallel, executor,
+                         depends_on, profiler=profiler)
+        self.profile = profile
+        self.arrivals = arrivals
+        self.seed = seed
+        self.max_backlog = max_backlog
 
 
 class Orchestrator:
     """
     Class that takes a list of events and schedules them according to their
     interval_sec parameter.
+
+    All waits are done on the kill_event, so a tripped kill switch wakes the
+    scheduler immediately instead of after the current sleep.
+
+    At the end of run() the event timings, timer accuracy, metrics, phase reports,
+    profiles and simulation of the run are in run_report.
     """
-    TIC_TIME = 60
 
-    def __init__(self, total_time_sec, events, kill_event, reporter, *args):
-        self.total_time_sec = total_time_sec
+    def __init__(
+            self,
+            total_time_sec,
+            events,
+            kill_event,
+            reporter,
+            *args,
+            max_workers=None,
+            max_processes=None,
+            name='orchestration',
+            stats_path=None,
+            coordinator_address=None,
+            workers=1,
+            done_timeout_sec=distributed.DEFAULT_DONE_TIMEOUT_SEC,
+            history_records=history.DEFAULT_MEMORY_RECORDS,
+            history_dir=None,
+            thresholds=(),
+            metrics_window_sec=metrics.DEFAULT_WINDOW_SEC,
+            metrics_interval_sec=metrics.DEFAULT_INTERVAL_SEC,
+            status_port=None,
+            checkpoint_file=None,
+            checkpoint_interval_sec=checkpoint.DEFAULT_INTERVAL_SEC,
+            resume=None,
+            clock=None,
+            stub_events=False,
+            simulation_path=None,
+            timer_spin_sec=timer.SPIN_SEC,
+            profiler=None,
+            profile_dir=None):
+        self.name = name
+        self.resumed = resume
+        self.elapsed_offset = 0
+        if resume is not None:
+            self.elapsed_offset = resume['elapsed_sec']
+            logger.info('Resuming orchestration {} sec in'.format(self.elapsed_offset))
+        self.total_time_sec = max(total_time_sec - self.elapsed_offset, 0)
         self.all_events = events
         self.kill_event = kill_event
         self.interval_events = [event for event in events if event.interval_sec is not None]
-        self._executor_workers = dict()
+        self.rate_events = [event for event in events if isinstance(event, RateEvent)]
+        self.simulated = clock is not None
+        self.simulation_path = simulation_path
+        self.clock = time.monotonic
+        self.timers = [timer.PrecisionTimer(kill_event, self.clock, timer_spin_sec)]
+        self.wait = self.timers[0].wait
+        if self.simulated:
+            self.clock = clock
+            self.wait = functools.partial(clock.wait, kill_event)
+        if stub_events:
+            simulation.stub_events(events)
+        self.scheduler = scheduler.Scheduler(self.clock)
+        if max_workers is None:
+            max_workers = max(32, len(events) + 4)
+        self.coordinator = None
+        if coordinator_address is not None:
+            self.coordinator = distributed.Coordinator(
+                coordinator_address, workers, reporter, done_timeout=done_timeout_sec)
+            for event in events:
+                event.func = self.coordinator.remote_call(event.name)
+                event.executor = dispatch.THREAD
+                event.is_async = False
+        self.profiles = profiling.ProfileSession(name, profile_dir)
+        if self.coordinator is None:
+            for event in events:
+                if event.profiler:
+                    event.func = self.profiles.wrap(event, event.profiler)
+                elif profiler:
+                    reason = profiling.unsupported(profiler, event)
+                    if reason is not None:
+                        logger.warning('Not profiling with "{}": {}'.format(profiler, reason))
+                        continue
+                    event.func = self.profiles.wrap(event, profiler)
+        shared = {'kill_switch': kill_event, 'result_reporter': reporter}
+        run_stats = stats.RunStats(history_records, history_dir)
+        self.dispatcher = dispatch.Dispatcher(max_workers, max_processes, shared, self.clock, run_stats)
+        self.dispatcher.prepare(events)
+        self.stats = self.dispatcher.stats
+        if isinstance(clock, simulation.VirtualClock):
+            clock.before_advance = functools.partial(self.dispatcher.wait_idle, simulation.IDLE_WAIT_SEC)
+        self.rate_dispatchers = list()
+        for event in self.rate_events:
+            wait = self.wait
+            if not self.simulated:
+                self.timers.append(timer.PrecisionTimer(kill_event, self.clock, timer_spin_sec))
+                wait = self.timers[-1].wait
+            self.rate_dispatchers.append(load.RateDispatcher(event, self.dispatcher, kill_event, self.clock, wait))
+        self.stats_path = stats_path
+        self.run_report = dict()
+        self.start_time = None
+        self.end_time = None
+        self._teardown_futures = list()
+        event_names = {event.name for event in events}
+        self.startup_phase = phases.PhaseRunner(
+            phases.STARTUP, [event for event in events if event.at_startup], self.execute, self.clock, event_names)
+        self.teardown_phase = phases.PhaseRunner(
+            phases.TEARDOWN, [event for event in events if event.at_teardown], self.execute_teardown, self.clock,
+            event_names)
         self.reporter = reporter
+        self.metrics = metrics.MetricAggregator(
+            kill_event, thresholds, metrics_window_sec, metrics_interval_sec, self.clock)
+        reporter.aggregator = self.metrics
+        self.status_server = None
+        if status_port is not None:
+            self.status_server = monitoring.StatusServer(self, status_port)
+        self.checkpointer = None
+        if checkpoint_file is not None:
+            self.checkpointer = checkpoint.Checkpointer(self, checkpoint_file, checkpoint_interval_sec)
+        self._reporter_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='orchestration-reporter')
         self.start_reporter()
 
-    @property
-    def executor_workers(self):
-        if not self._executor_workers:
-            return self._executor_workers
-        for event in self.all_events:
-            self._executor_workers[event.name] = ThreadPoolExecutor(max_workers=1)
-        return self._executor_workers
-
     def start_reporter(self):
-        self.executor_workers['reporter'] = ThreadPoolExecutor(max_workers=1)
-        self.executor_workers['reporter'].submit(self.reporter.monitor, self.kill_event)
+        self._reporter_executor.submit(self.reporter.monitor, self.kill_event)
 
-    def run_startup_events(self):
-        for event in self.all_events:
-            if event.at_startup:
-                self.execute(event)
+    def run_startup_events(self, already_done=()):
+        self.startup_phase.start(already_done)
 
     def run_teardown_events(self):
-        for event in self.all_events:
-            if event.at_teardown:
-                self.execute(event)
-
-    def execute(self, event):
-        try:
-            self.executor_workers[event.name].shutdown()
-        except Exception:
-            pass
+        self.teardown_phase.start()
+        self.teardown_phase.wait()
+
+    def execute(self, event, scheduled=None):
         logger.info('Executing event: {}'.format(event.name))
-        try:
-            self.executor_workers[event.name].submit(event.func)
-        except Exception:
-            pass
+        return self.dispatcher.submit(event, scheduled)
+
+    def execute_teardown(self, event):
+        future = self.execute(event)
+        if future is not None:
+            self._teardown_futures.append(future)
+        return future
 
     def next_event(self, timeout_sec):
         """
-        Sleeps until its time for next event and executes it
+        Waits until its time for next event and executes every event that is due.
+        Returns early without executing anything if the kill_event is set.
         """
         logger.info('next_event timeout: {}'.format(timeout_sec))
-        if not self.interval_events:
+        next_deadline = self.scheduler.next_deadline()
+        if next_deadline is None:
             logger.info('No interval events left to run, {} sec until end of test'.format(timeout_sec))
-            time.sleep(self.TIC_TIME)
+            self.wait(timeout_sec)
             return None
-        upcoming_event = self.interval_events.pop(0)
-        if upcoming_event.time_left > timeout_sec:
-            logger.warning('Next event: "{}" is scheduled after test end.'.format(upcoming_event.name))
+        wait_sec = max(next_deadline - self.clock(), 0)
+        # An event due exactly at the end of the test is not executed
+        if wait_sec > timeout_sec or (self.end_time is not None and next_deadline >= self.end_time):
+            logger.info('Next event: "{}" is scheduled after test end.'.format(self.scheduler.peek().name))
+            self.wait(timeout_sec)
             return None
-        logger.info('Waiting {} sec for next event: "{}"'.format(upcoming_event.time_left, upcoming_event.name))
-        time.sleep(upcoming_event.time_left)
-        self.execute(upcoming_event)
-        self.update_events(upcoming_event)
-
-    def update_events(self, last_event):
-        """
-        Updates the scheduled list of events
-        """
-        for event in self.interval_events:
-            event.time_left = event.time_left - last_event.time_left
-        last_event.reset()
-        self.interval_events.append(last_event)
-        self.interval_events = sorted(self.interval_events, key=lambda x: x.time_left)
+        logger.info('Waiting {} sec for next event: "{}"'.format(wait_sec, self.scheduler.peek().name))
+        if self.wait(wait_sec):
+            return None
+        for event, deadline in self.scheduler.pop_due(self.clock()):
+            self.execute(event, deadline)
 
     def kill_all_events(self):
         self.kill_event.set()
-        for name, executor in self.executor_workers.items():
-            logger.info('Shutting down: {}'.format(name))
-            executor.shutdown(10)
+        self.reporter.stop()
+        self.dispatcher.cancel_async(keep=self._teardown_futures)
+        if self.coordinator is not None:
+            self.coordinator.kill()
+        logger.info('Shutting down event executions')
+        self.dispatcher.shutdown()
+        if self.coordinator is not None:
+            logger.info('Stopping orchestration workers')
+            self.coordinator.stop()
+        logger.info('Shutting down reporter')
+        self._reporter_executor.shutdown()
+        if self.coordinator is not None:
+            # The monitor stopped at the kill switch, the workers sent results until they disconnected
+            self.reporter.monitor(self.kill_event)
+
+    def report_stats(self):
+        """
+        Logs the timing summary of all executions and writes it to stats_path if set
+        """
+        summary = self.stats.summary()
+        for rate_dispatcher in self.rate_dispatchers:
+            summary.setdefault(rate_dispatcher.event.name, stats.EventStats(rate_dispatcher.event.name).summary())
+            summary[rate_dispatcher.event.name]['rate'] = rate_dispatcher.report()
+        self.run_report['summary'] = summary
+        for line in stats.format_summary(summary):
+            logger.info(line)
+        if not self.simulated:
+            self.run_report['timers'] = timer.accuracy(self.timers)
+            logger.info(timer.format_accuracy(self.run_report['timers']))
+        metric_summary = self.metrics.summary()
+        if metric_summary:
+            self.run_report['metrics'] = metric_summary
+            for line in metrics.format_summary(metric_summary):
+                logger.info(line)
+        phase_reports = {runner.phase: runner.report() for runner in (self.startup_phase, self.teardown_phase)}
+        phase_reports = {phase: report for phase, report in phase_reports.items() if report is not None}
+        if phase_reports:
+            self.run_report['phases'] = phase_reports
+            for line in phases.format_report(phase_reports):
+                logger.info(line)
+        if self.stats_path:
+            self.stats.dump(self.stats_path)
+        if self.simulated:
+            self.report_simulation(summary)
+
+    def report_simulation(self, summary):
+        """
+        Stores the firing timeline and count of every event, and writes them to simulation_path if set
+        """
+        report = {
+            'counts': {name: event_summary['executions'] for name, event_summary in summary.items()},
+            'timeline': simulation.timeline(self.stats, self.start_time),
+        }
+        self.run_report['simulation'] = report
+        if self.simulation_path:
+            simulation.write_report(self.simulation_path, report)
 
     def run(self):
+        if self.coordinator is not None:
+            logger.info('Waiting for {} orchestration workers'.format(self.coordinator.expected_workers))
+            self.coordinator.wait_for_workers()
         logger.info('Test orchestration started!')
-        end_time = time.time() + self.total_time_sec
-        self.run_startup_events()
+        start_time = self.start_time = self.clock()
+        self.end_time = start_time + self.total_time_sec
+        if self.status_server is not None:
+            self.status_server.start()
+        resumed = self.resumed or dict()
+        for event in self.interval_events:
+            self.scheduler.add(event, start_time, resumed.get('deadlines', dict()).get(event.name))
+        if self.checkpointer is not None:
+            self.checkpointer.start()
+        self.profiles.start()
+        self.run_startup_events(resumed.get('startup_succeeded', ()))
+        for rate_dispatcher in self.rate_dispatchers:
+            rate_dispatcher.start(start_time, self.end_time, self.elapsed_offset)
         test_failure = False
-        while time.time() <= end_time:
-            time_left = end_time - time.time()
+        while self.clock() < self.end_time:
+            time_left = self.end_time - self.clock()
             if time_left <= 0:
                 time_left = 0
             if self.kill_event.is_set():
@@ -388,8 +974,23 @@ class Orchestrator:
                 test_failure = True
                 break
             self.next_event(time_left)
+        if self.simulated:
+            self.clock.unregister()
+        for rate_dispatcher in self.rate_dispatchers:
+            rate_dispatcher.join()
         self.run_teardown_events()
         self.kill_all_events()
+        self.profiles.stop()
+        self.run_report['profiles'] = self.profiles.write()
+        for name, lateness in self.scheduler.report().items():
+            logger.info('Event "{}" lateness: {}'.format(name, lateness))
+        self.report_stats()
+        if self.status_server is not None:
+            self.status_server.stop()
+        if self.checkpointer is not None:
+            self.checkpointer.stop(keep=test_failure)
         if test_failure:
+            if self.metrics.violations:
+                pytest.fail('Test failed, {}'.format('; '.join(self.metrics.violations)), False)
             pytest.fail('Test failed', False)
         logger.info('Orchestration test finished!')
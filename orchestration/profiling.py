@@ -0,0 +1,258 @@
+import collections
+import cProfile
+import functools
+import inspect
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+
+from orchestration import dispatch
+
+logger = logging.getLogger(__name__)
+
+CPROFILE = 'cprofile'
+SAMPLING = 'sampling'
+PROFILERS = [CPROFILE, SAMPLING]
+SAMPLE_INTERVAL_SEC = 0.01
+MAX_OVERHEAD = 0.01
+MAX_DEPTH = 64
+
+
+def unsupported(profiler, event):
+    """
+    Returns why event can not be profiled with profiler, or None if it can
+    """
+    if event.executor == dispatch.PROCESS:
+        return 'Event "{}" can not be profiled, it runs in a process'.format(event.name)
+    if profiler == CPROFILE and event.is_async:
+        return 'Coroutine event "{}" can only be profiled with "{}", its executions share a thread'.format(
+            event.name, SAMPLING)
+    return None
+
+
+def check_profiler(profiler, event):
+    if profiler not in PROFILERS:
+        raise Exception('Unknown profiler: "{}" for event: "{}", valid profilers are: {}'.format(
+            profiler, event.name, ', '.join(PROFILERS)))
+    reason = unsupported(profiler, event)
+    if reason is not None:
+        raise Exception(reason)
+
+
+def copy_factory_attributes(wrapper, func):
+    for name in ('func', 'args', 'kwargs'):
+        if hasattr(func, name):
+            setattr(wrapper, name, getattr(func, name))
+    return wrapper
+
+
+class CProfileCollector:
+    """
+    Runs every execution of an event under cProfile, the stats of all executions are added up.
+
+    Since Python 3.12 only one cProfile can be active in a process, an execution that starts
+    while another one is profiled runs without profiling and is counted in unprofiled.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.executions = 0
+        self.unprofiled = 0
+        self.stats = None
+        self._lock = threading.Lock()
+
+    def wrap(self, func):
+
+        @functools.wraps(func)
+        def profiled():
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                self.skip(e)
+                func()
+                return
+            try:
+                func()
+            finally:
+                profile.disable()
+                self.add(profile)
+
+        return copy_factory_attributes(profiled, func)
+
+    def skip(self, error):
+        with self._lock:
+            self.unprofiled += 1
+            first = self.unprofiled == 1
+        if first:
+            logger.warning('Running event "{}" without cProfile: {}'.format(self.name, error))
+
+    def add(self, profile):
+        with self._lock:
+            self.executions += 1
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+    def write(self, file_path):
+        with self._lock:
+            if self.stats is None:
+                return None
+            self.stats.dump_stats(file_path + '.pstats')
+        return file_path + '.pstats'
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return '{}:{}'.format(os.path.basename(code.co_filename), code.co_name)
+
+
+class StackSampler:
+    """
+    Samples the stacks of running event executions from a background thread.
+
+    Every execution marks its own frame as the base of the event, a sample walks
+    each thread's stack up to the closest base frame and counts the collapsed stack
+    for that event. The sampler sleeps at least sample_interval_sec between samples,
+    and longer when a sample takes more than max_overhead of the time, so the cost
+    stays bounded with many threads or deep stacks.
+    """
+
+    def __init__(self, sample_interval_sec=SAMPLE_INTERVAL_SEC, max_overhead=MAX_OVERHEAD):
+        self.sample_interval_sec = sample_interval_sec
+        self.max_overhead = max_overhead
+        self.stacks = collections.defaultdict(collections.Counter)
+        self.samples = 0
+        self.sample_sec = 0.0
+        self._bases = dict()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def wrap(self, name, func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def sampled_async():
+                frame = sys._getframe()
+                self._bases[id(frame)] = name
+                try:
+                    await func()
+                finally:
+                    del self._bases[id(frame)]
+
+            return copy_factory_attributes(sampled_async, func)
+
+        @functools.wraps(func)
+        def sampled():
+            frame = sys._getframe()
+            self._bases[id(frame)] = name
+            try:
+                func()
+            finally:
+                del self._bases[id(frame)]
+
+        return copy_factory_attributes(sampled, func)
+
+    def sample(self):
+        bases = dict(self._bases)
+        if not bases:
+            return
+        own_thread = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            stack = list()
+            while frame is not None and id(frame) not in bases:
+                stack.append(frame_name(frame))
+                frame = frame.f_back
+            if frame is None or not stack:
+                continue
+            self.stacks[bases[id(frame)]][';'.join(reversed(stack[-MAX_DEPTH:]))] += 1
+        self.samples += 1
+
+    def _run(self):
+        sleep_sec = self.sample_interval_sec
+        while not self._stopped.wait(sleep_sec):
+            start = time.perf_counter()
+            self.sample()
+            elapsed_sec = time.perf_counter() - start
+            self.sample_sec += elapsed_sec
+            sleep_sec = max(self.sample_interval_sec, elapsed_sec / self.max_overhead)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='orchestration-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write(self, name, file_path):
+        stacks = self.stacks.get(name)
+        if not stacks:
+            return None
+        with open(file_path + '.collapsed', 'w') as f:
+            for stack, count in sorted(stacks.items()):
+                f.write('{} {}\n'.format(stack, count))
+        return file_path + '.collapsed'
+
+
+class ProfileSession:
+    """
+    Profiles the events of one orchestration run and writes a file per profiled event at the end,
+    pstats for cProfile and collapsed stacks, as read by flamegraph tools, for sampling
+    """
+
+    def __init__(self, run_name, output_dir=None):
+        self.run_name = run_name
+        self.output_dir = output_dir or '.'
+        self.collectors = dict()
+        self.sampler = None
+
+    def wrap(self, event, profiler):
+        check_profiler(profiler, event)
+        if profiler == CPROFILE:
+            self.collectors[event.name] = CProfileCollector(event.name)
+            return self.collectors[event.name].wrap(event.func)
+        if self.sampler is None:
+            self.sampler = StackSampler()
+        self.collectors[event.name] = self.sampler
+        return self.sampler.wrap(event.name, event.func)
+
+    def start(self):
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def stop(self):
+        if self.sampler is not None:
+            self.sampler.stop()
+
+    def write(self):
+        """
+        Returns the files written
+        """
+        if not self.collectors:
+            return list()
+        os.makedirs(self.output_dir, exist_ok=True)
+        files = list()
+        for name, collector in self.collectors.items():
+            file_path = os.path.join(self.output_dir, '{}.{}'.format(self.run_name, name))
+            if isinstance(collector, StackSampler):
+                written = collector.write(name, file_path)
+            else:
+                written = collector.write(file_path)
+            if written is not None:
+                files.append(written)
+                logger.info('Wrote profile of event "{}" to: {}'.format(name, written))
+            if getattr(collector, 'unprofiled', 0):
+                logger.warning('{} executions of event "{}" were not profiled, another profile was active'.format(
+                    collector.unprofiled, name))
+        if self.sampler is not None and self.sampler.samples:
+            logger.info('Stack sampler took {} samples, {:.4f} sec in total'.format(
+                self.sampler.samples, self.sampler.sample_sec))
+        return files
@@ -0,0 +1,107 @@
+import types
+
+PLUGIN_NAME = 'orchestration-generated-fixtures'
+PREFIX = 'orch'
+SEPARATOR = '__'
+PARAM = 'param'
+EVENT = 'event'
+ISOLATED = 'isolated'
+
+
+def is_alnum(char):
+    return char.isascii() and char.isalnum()
+
+
+def escape(part):
+    """
+    Returns part made of identifier characters, without a double underscore and not ending with one.
+
+    An underscore between an alphanumeric and a letter is kept, every other character that
+    is not an ASCII letter or digit is written as an underscore and its code in 6 hex digits.
+    """
+    escaped = list()
+    for i, char in enumerate(part):
+        if is_alnum(char):
+            escaped.append(char)
+        elif (char == '_' and 0 < i < len(part) - 1 and is_alnum(part[i - 1])
+              and is_alnum(part[i + 1]) and not part[i + 1].isdigit()):
+            escaped.append(char)
+        else:
+            escaped.append('_{:06x}'.format(ord(char)))
+    return ''.join(escaped)
+
+
+class FixtureRegistry:
+    """
+    Holds the fixtures generated from descriptions.
+
+    Generated names are made of the test_name of the description, the kind of fixture,
+    the base name and the position of the event in the description, so a description
+    gets the same names whichever order descriptions are set up in. Every part is
+    escaped, so different parts never give the same name.
+
+    The fixtures live in their own module which is registered as a pytest
+    plugin. Fixtures registered after the session has started are registered as
+    a plugin module of their own, pytest parses the fixtures of every plugin
+    registered while the session is running.
+    """
+
+    def __init__(self):
+        self.module = types.ModuleType('orchestration.generated_fixtures')
+        self._pluginmanager = None
+        self._session_started = False
+        self._late_plugins = 0
+
+    def __contains__(self, name):
+        return hasattr(self.module, name)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self.module, name)
+        except AttributeError:
+            raise KeyError(name)
+
+    def __len__(self):
+        return len(self.names())
+
+    def names(self):
+        return [name for name in vars(self.module) if not name.startswith('__')]
+
+    def unique_name(self, scope, kind, base_name, position=None):
+        """
+        Returns the fixture name of kind for base_name in the description named scope,
+        position is the index of the event the fixture belongs to
+        """
+        parts = [PREFIX, escape(scope), kind, escape(base_name)]
+        if position is not None:
+            parts.append(str(position))
+        return SEPARATOR.join(parts)
+
+    def register(self, fixtures):
+        """
+        Registers a dict of fixture name: fixture function
+        """
+        for name in fixtures:
+            if name in self:
+                raise Exception('Fixture "{}" is already registered'.format(name))
+        self.module.__dict__.update(fixtures)
+        if not self._session_started:
+            return
+        holder = types.ModuleType(self.module.__name__)
+        holder.__dict__.update(fixtures)
+        self._late_plugins += 1
+        self._pluginmanager.register(holder, '{}-{}'.format(PLUGIN_NAME, self._late_plugins))
+
+    def install(self, pluginmanager):
+        self._pluginmanager = pluginmanager
+        if not pluginmanager.is_registered(self.module):
+            pluginmanager.register(self.module, PLUGIN_NAME)
+
+    def session_started(self, session):
+        self._session_started = True
+
+    def session_finished(self):
+        self._session_started = False
+
+
+REGISTRY = FixtureRegistry()
@@ -1,27 +1,96 @@
+import asyncio
 import logging
-import time
+import queue
 
 logger = logging.getLogger(__name__)
 
 
+class StopMonitor:
+    """
+    Marker put on the result queue to wake up a blocked monitor
+    """
+
+
 class ResultReporter:
+    WAIT_TIMEOUT = 0.5
+    MAX_BATCH = 1000
+    aggregator = None
+    processed = 0
 
     def __init__(self, results) -> None:
         self.results = results
 
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state['aggregator'] = None
+        return state
+
     def add_result(self, result):
         self.results.put_nowait(result)
 
+    async def add_result_async(self, result):
+        """
+        add_result for coroutine events. Transports that do I/O on put are fed
+        from the default executor so the event loop is never blocked.
+        """
+        if isinstance(self.results, queue.Queue):
+            self.results.put_nowait(result)
+            return
+        await asyncio.get_running_loop().run_in_executor(None, self.results.put_nowait, result)
+
+    def stop(self):
+        """
+        Wakes up the monitor so it notices the kill switch without waiting for WAIT_TIMEOUT.
+        Queues that only carry fixed format records wake it up through their wake() method.
+        """
+        wake = getattr(self.results, 'wake', None)
+        if wake is not None:
+            wake()
+            return
+        self.results.put_nowait(StopMonitor())
+
     def monitor(self, kill_switch):
+        """
+        Blocks on the result queue and hands everything available to on_result() in batches.
+        Results still queued when the kill switch is set are drained before returning.
+        """
         while not kill_switch.is_set():
-            if self.results.empty():
-                time.sleep(0.5)
-                continue
-            self.on_result()
-
-    def on_result(self):
-        output = self.results.get_nowait()
-        if 'error' in output:
-            logger.error(output)
-        else:
-            logger.info(output)
+            self._dispatch(self.next_batch(self.WAIT_TIMEOUT))
+            if self.aggregator is not None:
+                self.aggregator.tick()
+        batch = self.next_batch(None)
+        while batch:
+            self._dispatch(batch)
+            batch = self.next_batch(None)
+
+    def next_batch(self, timeout):
+        """
+        Waits up to timeout sec for a result, then drains up to MAX_BATCH results without blocking.
+        A timeout of None does not wait at all.
+        """
+        batch = list()
+        try:
+            if timeout is None:
+                batch.append(self.results.get_nowait())
+            else:
+                batch.append(self.results.get(timeout=timeout))
+            while len(batch) < self.MAX_BATCH:
+                batch.append(self.results.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _dispatch(self, batch):
+        results = [result for result in batch if not isinstance(result, StopMonitor)]
+        if results:
+            self.processed += len(results)
+            if self.aggregator is not None:
+                self.aggregator.observe(results)
+            self.on_result(results)
+
+    def on_result(self, results):
+        for output in results:
+            if 'error' in output:
+                logger.error(output)
+            else:
+                logger.info(output)
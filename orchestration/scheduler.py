@@ -0,0 +1,131 @@
+import heapq
+import itertools
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Lateness:
+    """
+    Accumulates how late an event fired compared to its scheduled deadline
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.missed = 0
+
+    def add(self, lateness):
+        self.count += 1
+        self.total += lateness
+        self.last = lateness
+        if lateness > self.max:
+            self.max = lateness
+
+    @property
+    def mean(self):
+        if not self.count:
+            return 0.0
+        return self.total / self.count
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_sec': self.mean,
+            'max_sec': self.max,
+            'last_sec': self.last,
+            'missed': self.missed,
+        }
+
+
+class Scheduler:
+    """
+    Priority queue of interval events keyed on absolute monotonic deadlines.
+
+    Every deadline is derived from the previous deadline rather than from the
+    time the event actually fired, so event runtime and sleep overshoot never
+    accumulate into drift. An event with jitter_sec fires a random fraction of
+    jitter_sec after each deadline, the jitter does not accumulate either.
+    """
+
+    def __init__(self, clock=time.monotonic, seed=None):
+        self.clock = clock
+        self.random = random.Random(seed)
+        self._heap = list()
+        self._sequence = itertools.count()
+        self.lateness = dict()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def add(self, event, start_time=None, delay_sec=None):
+        """
+        Schedules an interval event for its first execution, delay_sec after start_time.
+        delay_sec defaults to the interval plus the phase offset of the event.
+        """
+        if start_time is None:
+            start_time = self.clock()
+        if delay_sec is None:
+            delay_sec = event.interval_sec + event.phase_offset_sec
+        self.lateness.setdefault(event.name, Lateness())
+        self.push(event, start_time + delay_sec)
+
+    def push(self, event, deadline):
+        # The sequence number keeps ordering stable for equal deadlines and
+        # avoids ever comparing two events with each other.
+        fire_at = deadline
+        if event.jitter_sec:
+            fire_at += self.random.uniform(0, event.jitter_sec)
+        heapq.heappush(self._heap, (fire_at, next(self._sequence), event, deadline))
+
+    def next_deadline(self):
+        """
+        Returns when the next event fires, its deadline plus jitter
+        """
+        if not self._heap:
+            return None
+        return self._heap[0][0]
+
+    def peek(self):
+        if not self._heap:
+            return None
+        return self._heap[0][2]
+
+    def pop_due(self, now=None):
+        """
+        Pops every event whose firing time has passed and reschedules it.
+        Returns a list of (event, fire_at) tuples in firing order, fire_at is the
+        deadline plus the jitter drawn for that firing, or the deadline without jitter.
+        """
+        if now is None:
+            now = self.clock()
+        due = list()
+        while self._heap and self._heap[0][0] <= now:
+            fire_at, _, event, deadline = heapq.heappop(self._heap)
+            lateness = self.lateness.setdefault(event.name, Lateness())
+            lateness.add(now - fire_at)
+            due.append((event, fire_at))
+            next_deadline = deadline + event.interval_sec
+            if next_deadline <= now:
+                # We are more than a whole interval behind, skip the slots we
+                # missed instead of firing them back to back.
+                missed = int((now - next_deadline) // event.interval_sec) + 1
+                lateness.missed += missed
+                next_deadline += missed * event.interval_sec
+                logger.warning('Event "{}" missed {} execution(s)'.format(event.name, missed))
+            self.push(event, next_deadline)
+        return due
+
+    def pending(self):
+        """
+        Returns (fire_at, event name) of every scheduled event in firing order.
+        Works on a copy of the heap, so it can be called from other threads.
+        """
+        return sorted((fire_at, event.name) for fire_at, _, event, _ in list(self._heap))
+
+    def report(self):
+        return {name: lateness.as_dict() for name, lateness in dict(self.lateness).items()}
@@ -0,0 +1,144 @@
+import json
+import logging
+import threading
+import time
+
+from orchestration import dispatch
+
+logger = logging.getLogger(__name__)
+
+INSTANT = 'instant'
+IDLE_WAIT_SEC = 1
+KILL_POLL_SEC = 0.05
+TIMELINE_LINES = 50
+
+
+class ScaledClock:
+    """
+    Clock running speedup times faster than real time, waits are shortened to match
+    """
+
+    def __init__(self, speedup):
+        self.speedup = float(speedup)
+        self._start = time.monotonic()
+
+    def __call__(self):
+        return (time.monotonic() - self._start) * self.speedup
+
+    def wait(self, kill_event, timeout):
+        return kill_event.wait(timeout / self.speedup)
+
+    def register(self):
+        pass
+
+    def unregister(self):
+        pass
+
+
+class VirtualClock:
+    """
+    Discrete event clock, time only moves when every registered thread is waiting.
+
+    Each wait() registers when its thread wants to wake up, once all participants
+    are waiting the clock jumps straight to the earliest of those times. Before
+    jumping, before_advance is called, which lets executions started at the
+    current time finish first, so events take no virtual time at all.
+    The thread creating the clock is the first participant.
+    """
+
+    def __init__(self, before_advance=None):
+        self.now = 0.0
+        self.before_advance = before_advance
+        self.participants = 1
+        self._waiting = dict()
+        self._condition = threading.Condition()
+
+    def __call__(self):
+        return self.now
+
+    def register(self):
+        with self._condition:
+            self.participants += 1
+
+    def unregister(self):
+        with self._condition:
+            self.participants -= 1
+            self._advance()
+
+    def _advance(self):
+        if not self._waiting or len(self._waiting) < self.participants:
+            return
+        if self.before_advance is not None:
+            self.before_advance()
+        self.now = max(self.now, min(self._waiting.values()))
+        self._condition.notify_all()
+
+    def wait(self, kill_event, timeout):
+        if timeout is None:
+            raise Exception('Can not wait forever on a virtual clock')
+        thread = threading.get_ident()
+        with self._condition:
+            wake_time = self.now + timeout
+            self._waiting[thread] = wake_time
+            self._advance()
+            while self.now < wake_time and not kill_event.is_set():
+                self._condition.wait(KILL_POLL_SEC)
+            del self._waiting[thread]
+        return kill_event.is_set()
+
+
+def create_clock(speedup):
+    """
+    Returns the clock for a --simulate-orch value, INSTANT or a speedup factor
+    """
+    if speedup == INSTANT:
+        return VirtualClock()
+    try:
+        speedup = float(speedup)
+    except ValueError:
+        raise Exception('--simulate-orch takes no value or a speedup factor, not: "{}"'.format(speedup))
+    if speedup <= 0:
+        raise Exception('--simulate-orch speedup has to be above 0, not: {}'.format(speedup))
+    return ScaledClock(speedup)
+
+
+def stub_events(events):
+    """
+    Replaces the function of every event with one doing nothing
+    """
+    for event in events:
+        event.func = stub
+        event.is_async = False
+        event.executor = dispatch.THREAD
+
+
+def stub():
+    pass
+
+
+def timeline(run_stats, start_time):
+    """
+    Returns every execution of a run as (sec since start, event name) in order of execution
+    """
+    firings = list()
+    for name, event_stats in dict(run_stats.events).items():
+        firings.extend((submitted - start_time, name) for submitted in event_stats.log.column('submitted'))
+    return sorted(firings)
+
+
+def write_report(path, report):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info('Wrote simulated timeline to: {}'.format(path))
+
+
+def format_report(report):
+    lines = ['{:<40} {:>10}'.format('event', 'firings')]
+    for name, count in sorted(report['counts'].items()):
+        lines.append('{:<40} {:>10}'.format(name, count))
+    lines.append('timeline:')
+    for elapsed, name in report['timeline'][:TIMELINE_LINES]:
+        lines.append('{:>12.3f}s {}'.format(elapsed, name))
+    if len(report['timeline']) > TIMELINE_LINES:
+        lines.append('... {} more'.format(len(report['timeline']) - TIMELINE_LINES))
+    return lines
@@ -0,0 +1,151 @@
+import abc
+import gzip
+import json
+import logging
+import lzma
+import os
+import pickle
+import struct
+
+from orchestration import reporter
+
+logger = logging.getLogger(__name__)
+
+LOG = 'log'
+NDJSON = 'ndjson'
+BINARY = 'binary'
+COMPRESSIONS = {'gzip': (gzip.open, '.gz'), 'lzma': (lzma.open, '.xz')}
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+BUFFER_SIZE = 1024 * 1024
+LENGTH = struct.Struct('<I')
+
+
+class FileSink(reporter.ResultReporter, abc.ABC):
+    """
+    Reporter writing every result to size rotated files instead of the log.
+
+    Results are encoded and written a batch at a time from the monitor thread.
+    A new file is started once max_bytes of uncompressed data have been written
+    to the current one, files are named after path with a running number, e.g.
+    results.0000.ndjson.gz for path results.ndjson and gzip compression.
+    """
+    EXTENSION = ''
+
+    def __init__(self, results, path, max_bytes=DEFAULT_MAX_BYTES, compression=None):
+        super().__init__(results)
+        if compression is not None and compression not in COMPRESSIONS:
+            raise Exception('Unknown result compression: "{}", valid compressions are: {}'.format(
+                compression, ', '.join(COMPRESSIONS)))
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.files = list()
+        self._file = None
+        self._written = 0
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_file'] = None
+        return state
+
+    @abc.abstractmethod
+    def encode(self, result):
+        """
+        Returns result as the bytes written to the file
+        """
+
+    def next_path(self):
+        root, extension = os.path.splitext(self.path)
+        extension = extension or self.EXTENSION
+        if self.compression is not None:
+            extension += COMPRESSIONS[self.compression][1]
+        return '{}.{:04d}{}'.format(root, len(self.files), extension)
+
+    def _open(self):
+        file_path = self.next_path()
+        if self.compression is None:
+            self._file = open(file_path, 'wb', buffering=BUFFER_SIZE)
+        else:
+            self._file = COMPRESSIONS[self.compression][0](file_path, 'wb')
+        self._written = 0
+        self.files.append(file_path)
+        logger.info('Writing results to: {}'.format(file_path))
+
+    def on_result(self, results):
+        data = b''.join(self.encode(result) for result in results)
+        if self._file is not None and self._written + len(data) > self.max_bytes:
+            self.close()
+        if self._file is None:
+            self._open()
+        self._file.write(data)
+        self._written += len(data)
+
+    def monitor(self, kill_switch):
+        try:
+            super().monitor(kill_switch)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class NdjsonSink(FileSink):
+    """
+    One JSON document per line, results that are not JSON serializable are written as their repr()
+    """
+    EXTENSION = '.ndjson'
+
+    def encode(self, result):
+        return (json.dumps(result, default=repr, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+class BinarySink(FileSink):
+    """
+    Every result is pickled and prefixed with its length as a little endian uint32
+    """
+    EXTENSION = '.bin'
+
+    def encode(self, result):
+        data = pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+        return LENGTH.pack(len(data)) + data
+
+
+SINKS = {NDJSON: NdjsonSink, BINARY: BinarySink}
+
+
+def create_sink(sink, results, path=None, max_bytes=DEFAULT_MAX_BYTES, compression=None):
+    """
+    Creates the reporter for a sink name, "log" is the plain logging ResultReporter
+    """
+    if sink == LOG:
+        return reporter.ResultReporter(results)
+    if sink not in SINKS:
+        raise Exception('Unknown result sink: "{}", valid sinks are: {}'.format(sink, ', '.join([LOG] + list(SINKS))))
+    sink_class = SINKS[sink]
+    return sink_class(results, path or 'orchestration_results' + sink_class.EXTENSION, max_bytes, compression)
+
+
+def _open_for_read(file_path):
+    for opener, extension in COMPRESSIONS.values():
+        if file_path.endswith(extension):
+            return opener(file_path, 'rb')
+    return open(file_path, 'rb')
+
+
+def read_results(file_path):
+    """
+    Iterates over the results in a file written by a sink, the format is taken from the file name
+    """
+    with _open_for_read(file_path) as f:
+        if '.ndjson' in os.path.basename(file_path):
+            for line in f:
+                yield json.loads(line)
+            return
+        while True:
+            header = f.read(LENGTH.size)
+            if not header:
+                return
+            yield pickle.loads(f.read(LENGTH.unpack(header)[0]))
@@ -0,0 +1,236 @@
+import csv
+import json
+import logging
+import math
+import threading
+
+from orchestration import history
+from orchestration import metrics
+
+logger = logging.getLogger(__name__)
+
+OK = 'ok'
+ERROR = 'error'
+CANCELLED = 'cancelled'
+PERCENTILES = (50, 95, 99)
+DISTRIBUTIONS = ('duration_sec', 'queue_wait_sec', 'lateness_sec', 'latency_sec')
+
+
+class ExecutionRecord:
+    """
+    Timing of one execution of an event, all times are time.monotonic() values
+    """
+    __slots__ = ('name', 'scheduled', 'submitted', 'started', 'duration', 'outcome', 'exception')
+
+    def __init__(self, name, scheduled, submitted):
+        self.name = name
+        self.scheduled = scheduled
+        self.submitted = submitted
+        self.started = None
+        self.duration = None
+        self.outcome = None
+        self.exception = None
+
+    @property
+    def lateness(self):
+        return self.submitted - self.scheduled
+
+    @property
+    def queue_wait(self):
+        if self.started is None:
+            return None
+        return self.started - self.submitted
+
+    @property
+    def latency(self):
+        """
+        Time from when the execution was due until it finished, includes time spent late or queued
+        """
+        if self.started is None or self.duration is None:
+            return None
+        return self.started + self.duration - self.scheduled
+
+
+def percentile(sorted_values, q):
+    """
+    Nearest rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    rank = max(int(math.ceil(q / 100.0 * len(sorted_values))), 1)
+    return sorted_values[rank - 1]
+
+
+def distribution(values):
+    values = sorted(value for value in values if value is not None)
+    summary = {'p{}'.format(q): percentile(values, q) for q in PERCENTILES}
+    summary['max'] = values[-1] if values else None
+    return summary
+
+
+def histogram_distribution(histogram):
+    summary = {'p{}'.format(q): histogram.percentile(q) for q in PERCENTILES}
+    summary['max'] = histogram.max
+    return summary
+
+
+class EventStats:
+    """
+    Execution history of one event, kept in a columnar history.ExecutionLog.
+    Only the last exception is kept, every exception is logged when it happens.
+
+    Duration, queue wait, lateness and latency are also counted in histograms as
+    executions are added, the summary is taken from them so it never has to read
+    the log back. Percentiles are accurate to metrics.PRECISION, max is exact.
+    """
+
+    def __init__(self, name, memory_records=history.DEFAULT_MEMORY_RECORDS, spill_dir=None):
+        self.name = name
+        self.log = history.ExecutionLog(memory_records, spill_dir)
+        self.skipped = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.last_exception = None
+        self.histograms = {key: metrics.LogHistogram() for key in DISTRIBUTIONS}
+
+    def add(self, record):
+        self.log.add(record)
+        if record.outcome == ERROR:
+            self.errors += 1
+        elif record.outcome == CANCELLED:
+            self.cancelled += 1
+        if record.exception is not None:
+            self.last_exception = record.exception
+        values = (record.duration, record.queue_wait, record.lateness, record.latency)
+        for key, value in zip(DISTRIBUTIONS, values):
+            if value is not None:
+                self.histograms[key].add(value)
+
+    def live_summary(self):
+        """
+        Summary of duration and lateness that can be read while executions are added, without a lock
+        """
+        summary = {'executions': len(self.log), 'errors': self.errors, 'skipped': self.skipped}
+        for key in ('duration_sec', 'lateness_sec'):
+            histogram = self.histograms[key].snapshot()
+            summary[key] = histogram_distribution(histogram)
+            summary[key].update(count=histogram.count, sum=histogram.total)
+        return summary
+
+    def summary(self):
+        summary = {
+            'executions': len(self.log),
+            'errors': self.errors,
+            'cancelled': self.cancelled,
+            'skipped': self.skipped,
+        }
+        for key in DISTRIBUTIONS:
+            summary[key] = histogram_distribution(self.histograms[key])
+        return summary
+
+
+class RunStats:
+    """
+    Collects execution records for every event of an orchestration run.
+    memory_records and spill_dir are passed on to the history.ExecutionLog of every event.
+    """
+
+    def __init__(self, memory_records=history.DEFAULT_MEMORY_RECORDS, spill_dir=None):
+        self.events = dict()
+        self.memory_records = memory_records
+        self.spill_dir = spill_dir
+        self._lock = threading.Lock()
+
+    def _event_stats(self, name):
+        if name not in self.events:
+            self.events[name] = EventStats(name, self.memory_records, self.spill_dir)
+        return self.events[name]
+
+    def add(self, record):
+        with self._lock:
+            self._event_stats(record.name).add(record)
+
+    def skipped(self, name):
+        with self._lock:
+            self._event_stats(name).skipped += 1
+
+    def add_latency(self, name, latency):
+        """
+        Counts the latency of an arrival that was not executed, see load.RateDispatcher
+        """
+        with self._lock:
+            self._event_stats(name).histograms['latency_sec'].add(latency)
+
+    def summary(self):
+        with self._lock:
+            return {name: event_stats.summary() for name, event_stats in self.events.items()}
+
+    def live_summary(self):
+        """
+        Approximate summary while the run is going on, never waits for the lock
+        """
+        return {name: event_stats.live_summary() for name, event_stats in dict(self.events).items()}
+
+    def dump(self, path):
+        """
+        Writes the summary to path, as CSV if it ends with .csv otherwise as JSON
+        """
+        summary = self.summary()
+        if path.endswith('.csv'):
+            write_csv(path, summary)
+        else:
+            with open(path, 'w') as f:
+                json.dump({'events': summary}, f, indent=2)
+        logger.info('Wrote orchestration stats to: {}'.format(path))
+
+
+def flatten(summary):
+    row = dict()
+    for key, value in summary.items():
+        if isinstance(value, dict):
+            for sub_key, sub_value in value.items():
+                row['{}_{}'.format(key, sub_key)] = sub_value
+        else:
+            row[key] = value
+    return row
+
+
+def write_csv(path, summary):
+    rows = [dict(event=name, **flatten(event_summary)) for name, event_summary in summary.items()]
+    if not rows:
+        return
+    with open(path, 'w', newline='') as f:
+        fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def format_summary(summary):
+    """
+    Formats a run summary as a table for the terminal
+    """
+    header = '{:<40} {:>6} {:>6} {:>7} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'event', 'runs', 'errors', 'skipped', 'p50', 'p95', 'p99', 'max', 'late p99')
+    lines = [header]
+    for name, event_summary in summary.items():
+        duration = event_summary['duration_sec']
+        lines.append('{:<40} {:>6} {:>6} {:>7} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+            name, event_summary['executions'], event_summary['errors'], event_summary['skipped'],
+            format_sec(duration['p50']), format_sec(duration['p95']), format_sec(duration['p99']),
+            format_sec(duration['max']), format_sec(event_summary['lateness_sec']['p99'])))
+    for name, event_summary in summary.items():
+        if 'rate' not in event_summary:
+            continue
+        rate = event_summary['rate']
+        lines.append('{}: target {:.1f}/s achieved {:.1f}/s, {} dropped, latency p50 {} p99 {} max {}'.format(
+            name, rate['target_per_sec'], rate['achieved_per_sec'], rate['dropped'],
+            format_sec(event_summary['latency_sec']['p50']), format_sec(event_summary['latency_sec']['p99']),
+            format_sec(event_summary['latency_sec']['max'])))
+    return lines
+
+
+def format_sec(value):
+    if value is None:
+        return '-'
+    return '{:.4f}s'.format(value)
@@ -0,0 +1,41 @@
+import collections
+import types
+
+
+class SymbolTable:
+    """
+    Maps event names to the functions implementing them across all orchestration_sources modules
+    """
+
+    def __init__(self, modules):
+        self.module_names = [module.__name__ for module in modules]
+        self.functions = dict()
+        self.duplicates = collections.defaultdict(list)
+        found_in = dict()
+        for module in modules:
+            for name, obj in vars(module).items():
+                if not isinstance(obj, types.FunctionType):
+                    continue
+                if name not in self.functions:
+                    self.functions[name] = obj
+                    found_in[name] = module.__name__
+                elif self.functions[name] is not obj:
+                    if not self.duplicates[name]:
+                        self.duplicates[name].append(found_in[name])
+                    self.duplicates[name].append(module.__name__)
+
+    def __contains__(self, name):
+        return name in self.functions
+
+    def resolve(self, name):
+        """
+        Returns the function for event name, raises an exception if it is missing or ambiguous
+        """
+        if name in self.duplicates:
+            raise Exception('Event "{}" is defined in more than one orchestration_sources module: {}'.format(
+                name, ', '.join(self.duplicates[name])))
+        try:
+            return self.functions[name]
+        except KeyError:
+            raise Exception('Event "{}" was not found in orchestration_sources: {}'.format(
+                name, ', '.join(self.module_names)))
@@ -0,0 +1,61 @@
+import logging
+import time
+
+from orchestration import metrics
+
+logger = logging.getLogger(__name__)
+
+SPIN_SEC = 0.001
+
+
+class PrecisionTimer:
+    """
+    Waits on the kill switch with sub-millisecond accuracy.
+
+    A plain sleep can wake up a scheduler tick late, so the timer sleeps until spin_sec
+    before the deadline and spins the rest of the way, yielding to other threads on every
+    turn. How late every wait woke up is counted in a histogram, one timer per thread.
+    """
+
+    def __init__(self, kill_event, clock=time.monotonic, spin_sec=SPIN_SEC):
+        self.kill_event = kill_event
+        self.clock = clock
+        self.spin_sec = spin_sec
+        self.overshoot = metrics.LogHistogram()
+
+    def wait(self, timeout):
+        """
+        Waits timeout sec, returns True as soon as the kill switch is set
+        """
+        deadline = self.clock() + timeout
+        sleep_sec = timeout - self.spin_sec
+        if sleep_sec > 0 and self.kill_event.wait(sleep_sec):
+            return True
+        while self.clock() < deadline:
+            if self.kill_event.is_set():
+                return True
+            time.sleep(0)
+        self.overshoot.add(self.clock() - deadline)
+        return self.kill_event.is_set()
+
+
+def accuracy(timers):
+    """
+    Returns how late the waits of all timers woke up
+    """
+    overshoot = metrics.LogHistogram()
+    for precision_timer in timers:
+        overshoot.merge(precision_timer.overshoot.snapshot())
+    return {
+        'waits': overshoot.count,
+        'p50_sec': overshoot.percentile(50),
+        'p99_sec': overshoot.percentile(99),
+        'max_sec': overshoot.max,
+    }
+
+
+def format_accuracy(report):
+    if not report['waits']:
+        return 'timer: no waits'
+    return 'timer: {} waits, overshoot p50 {:.1f}us p99 {:.1f}us max {:.1f}us'.format(
+        report['waits'], report['p50_sec'] * 1e6, report['p99_sec'] * 1e6, report['max_sec'] * 1e6)
@@ -0,0 +1,161 @@
+import multiprocessing
+import queue
+import struct
+from multiprocessing import queues
+from multiprocessing import resource_tracker
+from multiprocessing import shared_memory
+
+# The queues, the kill switch and the process executor all use this start method, locks can
+# only be shared between processes started the same way. forkserver, or spawn where it is not
+# available, starts workers from a clean process instead of forking one that is running threads.
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+CONTEXT = multiprocessing.get_context(START_METHOD)
+
+
+class PipeQueue(queues.SimpleQueue):
+    """
+    A multiprocessing.SimpleQueue, a bare pipe without the feeder thread of
+    multiprocessing.Queue, extended with the queue methods ResultReporter uses.
+    Meant for a single consumer.
+    """
+
+    def __init__(self):
+        super().__init__(ctx=CONTEXT)
+
+    def put_nowait(self, obj):
+        self.put(obj)
+
+    def get(self, block=True, timeout=None):
+        if not block:
+            timeout = 0
+        if timeout is not None and not self._reader.poll(timeout):
+            raise queue.Empty
+        return super().get()
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+
+class ShmRingQueue:
+    """
+    Fixed size ring buffer in multiprocessing.shared_memory for fixed layout samples.
+
+    Every record is packed with struct using record_format, so only tuples of
+    numbers (or a single number for one field formats) can be reported. The
+    queue can be handed to other processes when they are started, like any
+    other multiprocessing primitive. Meant for a single consumer, wake() makes
+    a blocked get() return without a record since no marker fits the format.
+    """
+    HEADER = struct.Struct('QQ')
+
+    def __init__(self, record_format='d', capacity=65536):
+        self.record = struct.Struct(record_format)
+        self.capacity = capacity
+        size = self.HEADER.size + self.record.size * capacity
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._owner = True
+        self._write_lock = CONTEXT.Lock()
+        self._items = CONTEXT.Semaphore(0)
+        self._free = CONTEXT.Semaphore(capacity)
+
+    def __getstate__(self):
+        return (self._shm.name, self.record.format, self.capacity, self._write_lock, self._items, self._free)
+
+    def __setstate__(self, state):
+        name, record_format, self.capacity, self._write_lock, self._items, self._free = state
+        self.record = struct.Struct(record_format)
+        self._shm = shared_memory.SharedMemory(name=name)
+        # Only the creating process should unlink the segment, keep the
+        # resource tracker from doing it when this process exits.
+        resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self._owner = False
+
+    def _offset(self, index):
+        return self.HEADER.size + self.record.size * (index % self.capacity)
+
+    def put_nowait(self, sample):
+        if not isinstance(sample, (tuple, list)):
+            sample = (sample,)
+        # Packed before taking a slot, a sample not matching the format must not leak one
+        record = self.record.pack(*sample)
+        if not self._free.acquire(False):
+            raise queue.Full
+        with self._write_lock:
+            head, tail = self.HEADER.unpack_from(self._shm.buf, 0)
+            offset = self._offset(head)
+            self._shm.buf[offset:offset + self.record.size] = record
+            self.HEADER.pack_into(self._shm.buf, 0, head + 1, tail)
+        self._items.release()
+
+    def wake(self):
+        """
+        Makes one get() raise queue.Empty instead of blocking
+        """
+        self._items.release()
+
+    def put(self, sample, block=True, timeout=None):
+        self.put_nowait(sample)
+
+    def get(self, block=True, timeout=None):
+        if not self._items.acquire(block, timeout):
+            raise queue.Empty
+        with self._write_lock:
+            head, tail = self.HEADER.unpack_from(self._shm.buf, 0)
+            if head == tail:
+                # Woken up by wake(), there is no record for this release
+                raise queue.Empty
+            sample = self.record.unpack_from(self._shm.buf, self._offset(tail))
+            self.HEADER.pack_into(self._shm.buf, 0, head, tail + 1)
+        self._free.release()
+        if len(sample) == 1:
+            return sample[0]
+        return sample
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        head, tail = self.HEADER.unpack_from(self._shm.buf, 0)
+        return head - tail
+
+    def empty(self):
+        return self.qsize() == 0
+
+    def close(self):
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+_manager = None
+
+
+def manager_queue():
+    """
+    Queue on a multiprocessing.Manager server, one server is started per session and shared by every queue
+    """
+    global _manager
+    if _manager is None:
+        _manager = CONTEXT.Manager()
+    return _manager.Queue()
+
+
+TRANSPORTS = {
+    'manager': manager_queue,
+    'process': CONTEXT.Queue,
+    'pipe': PipeQueue,
+    'thread': queue.Queue,
+    'shm_ring': ShmRingQueue,
+}
+
+
+def create_report_queue(transport='manager', **options):
+    """
+    Creates the queue used by ResultReporter, see TRANSPORTS for valid transport names
+    """
+    try:
+        factory = TRANSPORTS[transport]
+    except KeyError:
+        raise Exception('Unknown report transport: "{}", valid transports are: {}'.format(
+            transport, ', '.join(TRANSPORTS)))
+    return factory(**options)
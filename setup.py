@@ -12,10 +12,13 @@ setuptools.setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/simlind/pytest-orchestration",
-    packages=setuptools.find_packages(exclude=['test*']),
+    packages=setuptools.find_packages(exclude=['test*', 'benchmarks*']),
+    python_requires=">=3.8",
+    extras_require={"numpy": ["numpy"]},
     entry_points={"pytest11": ["orchestration = orchestration.plugin"]},
     classifiers=[
         "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3 :: Only",
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
         "Framework :: Pytest"
@@ -1,3 +1,4 @@
+import os
 import pytest
 import logging
 
@@ -23,3 +24,7 @@ def fixture_and_param_func(str_value, int_value, list_value, dict_value, request
     assert int_value == 5
     assert list_value == [1, 2, 3, 4, 5]
     assert dict_value == {'key': 'value'}
+
+
+def report_pid_func(result_reporter, kill_switch, value):
+    result_reporter.add_result({'pid': os.getpid(), 'value': value, 'killed': kill_switch.is_set()})
@@ -0,0 +1,56 @@
+import asyncio
+import multiprocessing
+import queue
+import time
+
+from orchestration import dispatch
+from orchestration import plugin
+from orchestration import reporter
+
+
+def test_thousands_of_coroutine_events():
+    result_reporter = reporter.ResultReporter(queue.Queue())
+    dispatcher = dispatch.Dispatcher(4)
+
+    async def probe():
+        await asyncio.sleep(0.5)
+        await result_reporter.add_result_async('probed')
+
+    events = [plugin.Event('probe_{}'.format(i), probe, None, True, False) for i in range(2000)]
+    assert all(event.is_async for event in events)
+    start_time = time.monotonic()
+    for event in events:
+        dispatcher.submit(event)
+    dispatcher.shutdown(10)
+    assert time.monotonic() - start_time < 5
+    assert result_reporter.results.qsize() == 2000
+
+
+def test_add_result_async_with_manager_queue():
+    manager = multiprocessing.Manager()
+    result_reporter = reporter.ResultReporter(manager.Queue())
+
+    async def report():
+        await asyncio.gather(*[result_reporter.add_result_async(i) for i in range(10)])
+
+    asyncio.run(report())
+    assert sorted(result_reporter.next_batch(None)) == list(range(10))
+    manager.shutdown()
+
+
+def test_kill_switch_cancels_coroutine_events():
+    cancelled = list()
+
+    async def forever():
+        try:
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    events = [plugin.Event('forever_{}'.format(i), forever, None, True, False) for i in range(10)]
+    orchestrator = plugin.Orchestrator(0.2, events, multiprocessing.Event(), reporter.ResultReporter(queue.Queue()))
+    start_time = time.monotonic()
+    orchestrator.run()
+    assert time.monotonic() - start_time < 1
+    assert len(cancelled) == 10
@@ -0,0 +1,41 @@
+import json
+
+from orchestration import descriptions
+from orchestration import plugin
+from orchestration import transport
+
+
+def write_description(folder, test_name):
+    (folder / '{}.json'.format(test_name)).write_text(
+        json.dumps({'test_name': test_name, 'total_hours': 1, 'events': list()}))
+
+
+def test_run_patterns():
+    assert plugin.run_patterns(None) == []
+    assert plugin.run_patterns(['nightly_a, nightly_b', 'soak_*']) == ['nightly_a', 'nightly_b', 'soak_*']
+
+
+def test_resolve_names(tmp_path):
+    for test_name in ['nightly_a', 'nightly_b', 'soak_1', 'soak_2']:
+        write_description(tmp_path, test_name)
+    index = descriptions.DescriptionIndex(str(tmp_path))
+    assert plugin.resolve_names(index, ['soak_*', 'nightly_b', 'soak_1', 'missing_*']) == [
+        'soak_1', 'soak_2', 'nightly_b']
+
+
+def test_batch_path(monkeypatch):
+    monkeypatch.setattr(plugin, 'BATCH_NAMES', ['only'])
+    assert plugin.batch_path('out/stats.json', 'only') == 'out/stats.json'
+    monkeypatch.setattr(plugin, 'BATCH_NAMES', ['nightly_a', 'nightly_b'])
+    assert plugin.batch_path('out/stats.json', 'nightly_a') == 'out/nightly_a_stats.json'
+    assert plugin.batch_path(None, 'nightly_a') is None
+
+
+def test_manager_queues_share_one_server():
+    first = transport.create_report_queue('manager')
+    second = transport.create_report_queue('manager')
+    assert first._token.address == second._token.address
+    first.put_nowait('first')
+    second.put_nowait('second')
+    assert (first.get(timeout=5), second.get(timeout=5)) == ('first', 'second')
+
@@ -0,0 +1,101 @@
+import json
+import multiprocessing
+import queue
+import threading
+import time
+
+import pytest
+
+from orchestration import checkpoint
+from orchestration import plugin
+from orchestration import reporter
+
+
+def make_orchestrator(total_time_sec, events, **options):
+    return plugin.Orchestrator(
+        total_time_sec, events, multiprocessing.Event(), reporter.ResultReporter(queue.Queue()), **options)
+
+
+def test_write_and_load(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    assert checkpoint.load(checkpoint_file) is None
+    checkpoint.write(checkpoint_file, {'version': checkpoint.VERSION, 'elapsed_sec': 5})
+    assert checkpoint.load(checkpoint_file)['elapsed_sec'] == 5
+    assert [path.name for path in tmp_path.iterdir()] == ['checkpoint.json']
+    checkpoint.write(checkpoint_file, {'version': 0})
+    with pytest.raises(Exception, match='has version 0, expected 2'):
+        checkpoint.load(checkpoint_file)
+
+
+def test_merge_counters():
+    previous = {'a': {'executions': 2, 'errors': 1, 'skipped': 0}}
+    current = {'a': {'executions': 3, 'errors': 0, 'skipped': 1, 'duration_sec': {}},
+               'b': {'executions': 1, 'errors': 0, 'skipped': 0}}
+    assert checkpoint.merge_counters(previous, current) == {
+        'a': {'executions': 5, 'errors': 1, 'skipped': 1},
+        'b': {'executions': 1, 'errors': 0, 'skipped': 0}}
+
+
+def test_successful_run_removes_checkpoint(tmp_path):
+    checkpoint_file = tmp_path / 'checkpoint.json'
+    events = [plugin.Event('tick', lambda: None, 0.1, False, False)]
+    orchestrator = make_orchestrator(0.5, events, checkpoint_file=str(checkpoint_file), checkpoint_interval_sec=0.1)
+    orchestrator.run()
+    assert not checkpoint_file.exists()
+
+
+def test_resume_from_checkpoint(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    calls = list()
+    events = [plugin.Event('setup', lambda: calls.append('setup'), None, True, False),
+              plugin.Event('tick', lambda: calls.append('tick'), 0.4, False, False)]
+    orchestrator = make_orchestrator(1.0, events, checkpoint_file=checkpoint_file, checkpoint_interval_sec=0.1)
+    threading.Timer(0.7, orchestrator.kill_event.set).start()
+    with pytest.raises(pytest.fail.Exception):
+        orchestrator.run()
+    with open(checkpoint_file) as f:
+        state = json.load(f)
+    assert 0.65 < state['elapsed_sec'] < 0.9
+    assert state['startup_succeeded'] == ['setup']
+    assert 0 < state['deadlines']['tick'] <= 0.4
+    assert state['counters']['tick']['executions'] == 1
+    assert calls == ['setup', 'tick']
+
+    resumed = make_orchestrator(1.0, events, checkpoint_file=checkpoint_file, checkpoint_interval_sec=0.1,
+                                resume=checkpoint.load(checkpoint_file))
+    assert resumed.total_time_sec == pytest.approx(1.0 - state['elapsed_sec'])
+    start_time = time.monotonic()
+    resumed.run()
+    assert time.monotonic() - start_time < 0.5
+    assert calls == ['setup', 'tick', 'tick']
+
+
+def test_resume_during_startup(tmp_path):
+    checkpoint_file = str(tmp_path / 'checkpoint.json')
+    calls = list()
+
+    def slow():
+        calls.append('slow')
+        time.sleep(0.6)
+
+    events = [plugin.Event('fast', lambda: calls.append('fast'), None, True, False),
+              plugin.Event('slow', slow, None, True, False),
+              plugin.Event('after_slow', lambda: calls.append('after_slow'), None, True, False, depends_on=['slow'])]
+    orchestrator = make_orchestrator(1.0, events, checkpoint_file=checkpoint_file, checkpoint_interval_sec=0.1)
+    states = list()
+
+    def crash():
+        # What a process dying during the slow startup event leaves behind
+        states.append(checkpoint.load(checkpoint_file))
+        orchestrator.kill_event.set()
+
+    threading.Timer(0.35, crash).start()
+    with pytest.raises(pytest.fail.Exception):
+        orchestrator.run()
+    assert states[0]['startup_succeeded'] == ['fast']
+    assert sorted(calls) == ['after_slow', 'fast', 'slow']
+
+    del calls[:]
+    resumed = make_orchestrator(1.0, events, resume=states[0])
+    resumed.run()
+    assert calls == ['slow', 'after_slow']
@@ -0,0 +1,84 @@
+import json
+import os
+
+from orchestration import descriptions
+
+pytest_plugins = ['pytester']
+
+
+class DictCache:
+
+    def __init__(self):
+        self.values = dict()
+
+    def get(self, key, default):
+        return json.loads(json.dumps(self.values.get(key, default)))
+
+    def set(self, key, value):
+        self.values[key] = value
+
+
+def write_description(folder, file_name, test_name):
+    description_path = folder / file_name
+    description_path.write_text(json.dumps({'test_name': test_name, 'total_hours': 1, 'events': list()}))
+    return description_path
+
+
+def test_index_only_parses_changed_files(tmp_path, monkeypatch):
+    for i in range(20):
+        write_description(tmp_path, 'desc_{}.json'.format(i), 'desc_{}'.format(i))
+    cache = DictCache()
+    descriptions.DescriptionIndex(str(tmp_path), cache).refresh()
+
+    parsed = list()
+    load_description = descriptions.load_description
+    monkeypatch.setattr(descriptions, 'load_description', lambda p: parsed.append(p) or load_description(p))
+    index = descriptions.DescriptionIndex(str(tmp_path), cache)
+    assert index.load('desc_7')['test_name'] == 'desc_7'
+    assert parsed == [str(tmp_path / 'desc_7.json')]
+
+    changed = write_description(tmp_path, 'desc_3.json', 'renamed')
+    os.utime(str(changed), (0, 12345))
+    del parsed[:]
+    assert index.find('renamed') == str(changed)
+    assert parsed == [str(changed)]
+    assert index.find('desc_3') is None
+
+
+def test_lazy_descriptions():
+    loaded = descriptions.LazyDescriptions()
+    calls = list()
+
+    def loader(name):
+        calls.append(name)
+        loaded[name] = {'test_name': name}
+
+    loaded.defer(['first', 'second'], loader)
+    assert list(loaded) == ['first', 'second']
+    assert calls == list()
+    assert loaded['second'] == {'test_name': 'second'}
+    assert loaded['second'] == {'test_name': 'second'}
+    assert calls == ['second']
+    assert 'first' in loaded
+    assert 'third' not in loaded
+    assert calls == ['second']
+
+
+def test_fixtures_registered_after_session_start(testdir, monkeypatch):
+    monkeypatch.setenv('PYTHONPATH', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    testdir.makepyfile('''
+        from orchestration import plugin
+        from orchestration import registry
+
+        registry.REGISTRY.register({'late_value': plugin.generate_value_fixture(42)})
+
+
+        def test_late_fixture(request):
+            assert request.getfixturevalue('late_value') == 42
+
+
+        def test_late_fixture_argument(late_value):
+            assert late_value == 42
+    ''')
+    result = testdir.runpytest_subprocess('-p', 'orchestration.plugin')
+    result.assert_outcomes(passed=2)
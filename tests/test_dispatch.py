@@ -0,0 +1,125 @@
+import threading
+import time
+
+from orchestration import dispatch
+from orchestration import plugin
+
+
+class BlockingFunc:
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(5)
+
+
+def make_event(func, concurrency, max_parallel=1):
+    return plugin.Event('blocking', func, None, False, False, concurrency, max_parallel)
+
+
+def test_skip_if_running():
+    func = BlockingFunc()
+    dispatcher = dispatch.Dispatcher(4)
+    event = make_event(func, dispatch.SKIP_IF_RUNNING)
+    assert dispatcher.submit(event) is not None
+    assert dispatcher.submit(event) is None
+    func.release.set()
+    dispatcher.shutdown(5)
+    assert func.calls == 1
+
+
+def test_queue():
+    func = BlockingFunc()
+    dispatcher = dispatch.Dispatcher(4)
+    event = make_event(func, dispatch.QUEUE)
+    for i in range(3):
+        dispatcher.submit(event)
+    assert dispatcher.in_flight() == 1
+    func.release.set()
+    assert dispatcher.wait_idle(5)
+    dispatcher.shutdown(5)
+    # The third execution is coalesced into the one already queued
+    assert func.calls == 2
+    assert dispatcher.stats.events['blocking'].skipped == 1
+
+
+def test_shutdown_drops_queued():
+    func = BlockingFunc()
+    dispatcher = dispatch.Dispatcher(4)
+    event = make_event(func, dispatch.QUEUE)
+    dispatcher.submit(event)
+    dispatcher.submit(event)
+    func.release.set()
+    dispatcher.shutdown(5)
+    assert func.calls == 1
+
+
+def test_backlog_and_shutdown_cancels_pending():
+    func = BlockingFunc()
+    dispatcher = dispatch.Dispatcher(1)
+    event = make_event(func, dispatch.ALLOW_OVERLAP, max_parallel=5)
+    futures = [dispatcher.submit(event) for i in range(3)]
+    time.sleep(0.1)
+    assert dispatcher.backlog('blocking') == 2
+    threading.Timer(0.2, func.release.set).start()
+    dispatcher.shutdown(5)
+    assert func.calls == 1
+    assert [future.cancelled() for future in futures] == [False, True, True]
+    assert dispatcher.stats.summary()['blocking']['cancelled'] == 2
+
+
+def test_allow_overlap():
+    func = BlockingFunc()
+    dispatcher = dispatch.Dispatcher(4)
+    event = make_event(func, dispatch.ALLOW_OVERLAP, max_parallel=2)
+    futures = [dispatcher.submit(event) for i in range(3)]
+    assert futures[2] is None
+    assert dispatcher.in_flight() == 2
+    func.release.set()
+    dispatcher.shutdown(5)
+    assert func.calls == 2
+
+
+def test_cancel_previous():
+    func = BlockingFunc()
+    dispatcher = dispatch.Dispatcher(1)
+    blocker = plugin.Event('blocker', func, None, False, False)
+    event = make_event(func, dispatch.CANCEL_PREVIOUS)
+    event.name = 'cancellable'
+    dispatcher.submit(blocker)
+    first = dispatcher.submit(event)
+    second = dispatcher.submit(event)
+    assert first.cancelled()
+    func.release.set()
+    assert dispatcher.wait_idle(5)
+    dispatcher.shutdown(5)
+    assert second.done() and not second.cancelled()
+    assert func.calls == 2
+
+
+def test_cancel_previous_running_thread():
+    func = BlockingFunc()
+    dispatcher = dispatch.Dispatcher(4)
+    event = make_event(func, dispatch.CANCEL_PREVIOUS)
+    assert dispatcher.submit(event) is not None
+    while not func.calls:
+        time.sleep(0.01)
+    assert dispatcher.submit(event) is None
+    assert dispatcher.in_flight() == 1
+    func.release.set()
+    dispatcher.shutdown(5)
+    assert func.calls == 1
+
+
+def test_submit_does_not_block():
+    func = BlockingFunc()
+    dispatcher = dispatch.Dispatcher(2)
+    start_time = time.monotonic()
+    for i in range(100):
+        dispatcher.submit(make_event(func, dispatch.QUEUE))
+    assert time.monotonic() - start_time < 0.5
+    func.release.set()
+    dispatcher.shutdown(5)
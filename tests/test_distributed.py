@@ -0,0 +1,152 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+import pytest
+
+from orchestration import distributed
+from orchestration import plugin
+from orchestration import reporter
+
+
+def run_worker(address, name):
+    kill_switch = threading.Event()
+    result_reporter = reporter.ResultReporter(queue.Queue())
+
+    def ping():
+        result_reporter.add_result({'worker': name, 'event': 'ping', 'time': time.time()})
+
+    def fail():
+        raise ValueError('failed on {}'.format(name))
+
+    def linger():
+        kill_switch.wait(10)
+        time.sleep(1)
+        result_reporter.add_result({'worker': name, 'event': 'linger'})
+
+    events = {'ping': ping, 'fail': fail, 'linger': linger}
+    distributed.WorkerAgent(address, events, kill_switch, result_reporter, name=name).run()
+
+
+def start_workers(address, count):
+    workers = [multiprocessing.Process(target=run_worker, args=(address, 'worker-{}'.format(i))) for i in range(count)]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+def collect(result_reporter, count, timeout=10):
+    results = list()
+    deadline = time.monotonic() + timeout
+    while len(results) < count and time.monotonic() < deadline:
+        results.extend(result_reporter.next_batch(0.1))
+    return results
+
+
+def test_parse_address():
+    assert distributed.parse_address('localhost:5000') == ('localhost', 5000)
+
+
+def test_firing_runs_on_all_workers():
+    result_reporter = reporter.ResultReporter(queue.Queue())
+    coordinator = distributed.Coordinator(('127.0.0.1', 0), 3, result_reporter)
+    workers = start_workers(coordinator.address, 3)
+    try:
+        coordinator.wait_for_workers(30)
+        done = coordinator.fire('ping')
+        assert sorted(done) == ['worker-0', 'worker-1', 'worker-2']
+        results = collect(result_reporter, 3)
+        assert sorted(result['worker'] for result in results) == ['worker-0', 'worker-1', 'worker-2']
+        started = [message['started'] for message in done.values()]
+        assert max(started) - min(started) < 0.05
+    finally:
+        coordinator.stop()
+        for worker in workers:
+            worker.join(10)
+    assert all(worker.exitcode == 0 for worker in workers)
+    assert coordinator.workers == dict()
+
+
+def test_remote_errors_are_raised():
+    result_reporter = reporter.ResultReporter(queue.Queue())
+    coordinator = distributed.Coordinator(('127.0.0.1', 0), 2, result_reporter)
+    workers = start_workers(coordinator.address, 2)
+    try:
+        coordinator.wait_for_workers(30)
+        with pytest.raises(Exception, match='failed on workers: .*ValueError'):
+            coordinator.fire('fail')
+        with pytest.raises(Exception, match='could not be prepared: .*unknown event: missing'):
+            coordinator.fire('missing')
+        coordinator.fire('ping')
+    finally:
+        coordinator.stop()
+        for worker in workers:
+            worker.join(10)
+
+
+def test_results_reported_after_kill_are_forwarded():
+    result_reporter = reporter.ResultReporter(queue.Queue())
+    coordinator = distributed.Coordinator(('127.0.0.1', 0), 1, result_reporter)
+    workers = start_workers(coordinator.address, 1)
+    try:
+        coordinator.wait_for_workers(30)
+        firing = threading.Thread(target=coordinator.fire, args=('linger',))
+        firing.start()
+        time.sleep(0.2)
+        coordinator.kill()
+        firing.join(10)
+    finally:
+        coordinator.stop()
+        for worker in workers:
+            worker.join(10)
+    assert [result['event'] for result in collect(result_reporter, 1)] == ['linger']
+
+
+def test_hung_workers_time_out():
+    coordinator = distributed.Coordinator(('127.0.0.1', 0), 1, reporter.ResultReporter(queue.Queue()),
+                                          barrier_timeout=0.5, done_timeout=0.5)
+    workers = start_workers(coordinator.address, 1)
+    try:
+        coordinator.wait_for_workers(30)
+        start_time = time.monotonic()
+        with pytest.raises(Exception, match='timed out waiting for workers to be done: worker-0'):
+            coordinator.fire('linger')
+        assert time.monotonic() - start_time < 5
+        coordinator.fire('ping', done_timeout=5)
+    finally:
+        coordinator.stop()
+        for worker in workers:
+            worker.join(10)
+
+
+def test_clock_skew_is_logged(caplog):
+    coordinator = distributed.Coordinator(('127.0.0.1', 0), 1, reporter.ResultReporter(queue.Queue()))
+    assert abs(coordinator.check_clock('worker-0', time.time())) < 0.05
+    assert 'worker-0' not in caplog.text
+    assert coordinator.check_clock('worker-1', time.time() + 2) > 1.9
+    assert 'Clock of worker "worker-1" is 2.0' in caplog.text
+    coordinator.stop()
+
+
+def test_missing_workers_time_out():
+    coordinator = distributed.Coordinator(('127.0.0.1', 0), 1, reporter.ResultReporter(queue.Queue()))
+    with pytest.raises(Exception, match='Only 0 of 1 orchestration workers connected'):
+        coordinator.wait_for_workers(0.1)
+    coordinator.stop()
+
+
+def test_orchestrator_as_coordinator():
+    kill_event = multiprocessing.Event()
+    result_reporter = reporter.ResultReporter(queue.Queue())
+    received = list()
+    result_reporter.on_result = received.extend
+    event = plugin.Event('ping', lambda: None, 1, True, False)
+    orchestrator = plugin.Orchestrator(
+        2.5, [event], kill_event, result_reporter, coordinator_address=('127.0.0.1', 0), workers=2)
+    workers = start_workers(orchestrator.coordinator.address, 2)
+    orchestrator.run()
+    for worker in workers:
+        worker.join(10)
+    assert len(received) == 6
+    assert orchestrator.stats.summary()['ping']['executions'] == 3
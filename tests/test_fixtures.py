@@ -22,10 +22,8 @@ def get_sec_config_under_test():
 def result_reporter(report_queue):
 
     my_reporter = reporter.ResultReporter(report_queue)
-
-    def do_nothing():
-        pass
-    my_reporter.on_result = do_nothing
+    my_reporter.received = list()
+    my_reporter.on_result = my_reporter.received.extend
     return my_reporter
 
 
@@ -40,7 +38,7 @@ def test_orchestrate(request, kill_switch, result_reporter, dummy):
     assert end_time == pytest.approx(total_time, 3)
     assert 1 == dummy.inc_value
     assert 3 == dummy.dec_value
-    assert 3 == result_reporter.results.qsize()
+    assert 3 == len(result_reporter.received)
 
 
 @pytest.mark.parametrize('test_config', [get_config_under_test(), get_sec_config_under_test()])
@@ -53,7 +51,7 @@ def test_fixture_creation(request, test_config):
 def test_shared_object(request, dummy):
     test_config = get_config_under_test()
     all_events = plugin.get_events(request, test_config)
-    test_funcs_names = ['increament_func_6', 'decreament_func_7']
+    test_funcs_names = ['orch__test_config__event__increament_func__2', 'orch__test_config__event__decreament_func__3']
     test_events = [event for event in all_events if event.name in test_funcs_names]
 
     expected_value = 1
@@ -68,7 +66,7 @@ def test_shared_object(request, dummy):
 def test_param_fixtures(request):
     test_config = get_config_under_test()
     for event in test_config['events']:
-        if event['name'].startswith('fixture_and_param_func'):
+        if 'fixture_and_param_func' in event['name']:
             param_fixtures = event['params']
             break
     for param_name, value in param_fixtures.items():
@@ -87,7 +85,7 @@ def test_reused_params(request):
     param_fixtures = list()
     for test_config in [first_test_config, sec_test_config]:
         for event in test_config['events']:
-            if event['name'].startswith('fixture_and_param_func'):
+            if 'fixture_and_param_func' in event['name']:
                 param_fixtures.append(event['params'])
                 break
     result_dict = dict()
@@ -0,0 +1,76 @@
+import asyncio
+import inspect
+
+from orchestration import orch_run
+from orchestration import plugin
+
+
+def prefixed_params(value, value_max, kill_switch):
+    return value, value_max, kill_switch
+
+
+def unwrap(fixture):
+    return getattr(fixture, '_get_wrapped_function', lambda: fixture.__pytest_wrapped__.obj)()
+
+
+def test_factory_fixture_renames_exact_parameters():
+    fixture = unwrap(plugin.generate_factory_fixture(prefixed_params, {'value': 'value_3'}))
+    assert list(inspect.signature(fixture).parameters) == ['value_3', 'value_max', 'kill_switch']
+
+    factory = fixture(value_3=1, value_max=2, kill_switch=3)
+    assert factory.kwargs == {'value': 1, 'value_max': 2, 'kill_switch': 3}
+
+
+def test_factory_fixture_calls_function():
+    results = list()
+
+    def event(video_path, result_reporter, /, kill_switch=None):
+        results.append((video_path, result_reporter, kill_switch))
+
+    fixture = unwrap(plugin.generate_factory_fixture(event, {'video_path': 'video_path_12'}))
+    factory = fixture(video_path_12='clip.mp4', result_reporter='reporter')
+    factory()
+    assert results == [('clip.mp4', 'reporter', None)]
+
+
+def test_async_factory_fixture():
+    results = list()
+
+    async def probe(url):
+        results.append(url)
+
+    factory = unwrap(plugin.generate_factory_fixture(probe, {'url': 'url_1'}))(url_1='http://localhost')
+    assert inspect.iscoroutinefunction(factory)
+    asyncio.run(factory())
+    assert results == ['http://localhost']
+
+
+def test_generated_test_signature():
+    orch_run.generate_test('test_generated_signature', 60, ['device_with_collectd'])
+    generated_test = getattr(orch_run, 'test_generated_signature')
+    assert generated_test.__name__ == 'test_generated_signature'
+    assert list(inspect.signature(generated_test).parameters) == [
+        'all_events', 'kill_switch', 'result_reporter', 'device_with_collectd']
+    delattr(orch_run, 'test_generated_signature')
+
+
+def test_isolated_fixtures():
+    description = {'test_name': 'isolated', 'total_hours': 1,
+                   'events': [{'name': 'report_pid_func', 'params': {'value': 1}}]}
+    plugin._setup_fixtures(['tests/events.py'], description, isolated=True)
+    isolated = description['isolated_fixtures']
+    assert sorted(isolated) == ['kill_switch', 'result_reporter']
+    fixture = unwrap(plugin.registry.REGISTRY[description['events'][0]['name']])
+    assert list(inspect.signature(fixture).parameters) == [
+        isolated['result_reporter'], isolated['kill_switch'], description['events'][0]['params'].popitem()[0]]
+
+
+def test_dependencies_use_generated_names():
+    description = {'test_name': 'renamed_dependencies', 'total_hours': 1,
+                   'events': [{'name': 'assert_func'},
+                              {'name': 'assert_func'},
+                              {'name': 'report_pid_func', 'params': {'value': 1}, 'depends_on': 'assert_func'}]}
+    plugin._setup_fixtures(['tests/events.py'], description)
+    generated = description['generated_names']['assert_func']
+    assert generated == [event['name'] for event in description['events'][:2]]
+    assert description['events'][2]['depends_on'] == generated
@@ -0,0 +1,74 @@
+import math
+import os
+import resource
+
+import pytest
+
+from orchestration import history
+from orchestration import load
+from orchestration import plugin
+from orchestration import stats
+
+
+def make_record(i, outcome=stats.OK):
+    record = stats.ExecutionRecord('event', float(i), i + 0.5)
+    record.outcome = outcome
+    if outcome != stats.CANCELLED:
+        record.started = i + 1.0
+        record.duration = 2.0
+    return record
+
+
+def rss_bytes():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def test_events_have_no_dict():
+    event = plugin.Event('a', lambda: None, 1, True, False)
+    rate_event = plugin.RateEvent('b', lambda: None, load.RateProfile(load.CONSTANT, 1))
+    for obj in (event, rate_event, stats.ExecutionRecord('a', 0, 0)):
+        assert not hasattr(obj, '__dict__')
+
+
+def test_spilled_columns_are_read_back(tmp_path):
+    log = history.ExecutionLog(memory_records=4, spill_dir=str(tmp_path))
+    for i in range(10):
+        log.add(make_record(i, stats.CANCELLED if i == 7 else stats.OK))
+    assert len(log) == 10
+    assert len(log.columns['outcome']) == 2
+    assert list(log.column('scheduled')) == [float(i) for i in range(10)]
+    started = list(log.column('started'))
+    assert math.isnan(started[7])
+    assert started[:7] == [i + 1.0 for i in range(7)]
+    assert list(log.outcomes()).count(stats.CANCELLED) == 1
+    log.close()
+
+
+def test_summary_is_the_same_when_spilled():
+    summaries = list()
+    for memory_records in (1000, 3):
+        event_stats = stats.EventStats('event', memory_records)
+        for i in range(20):
+            event_stats.add(make_record(i, stats.ERROR if i % 5 == 0 else stats.OK))
+        summaries.append(event_stats.summary())
+    assert summaries[0] == summaries[1]
+    assert summaries[0]['executions'] == 20
+    assert summaries[0]['errors'] == 4
+    assert summaries[0]['latency_sec']['max'] == 3.0
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/statm'), reason='needs /proc to measure memory')
+def test_memory_is_bounded_for_10m_executions():
+    memory_records = 100000
+    log = history.ExecutionLog(memory_records)
+    append = log.append
+    rss_before = rss_bytes()
+    for i in range(10000000):
+        append(1.0, 2.0, 3.0, 0.5, 0)
+    rss_growth = rss_bytes() - rss_before
+    assert len(log) == 10000000
+    assert log.memory_bytes() <= memory_records * 33 * 1.2
+    assert rss_growth < 32 * 1024 * 1024
+    assert sum(log.column('duration')) == 5000000.0
+    log.close()
@@ -0,0 +1,101 @@
+import multiprocessing
+import queue
+import time
+
+import pytest
+
+from orchestration import load
+from orchestration import plugin
+from orchestration import reporter
+
+
+def make_orchestrator(total_time_sec, events, **options):
+    kill_event = multiprocessing.Event()
+    result_reporter = reporter.ResultReporter(queue.Queue())
+    return plugin.Orchestrator(total_time_sec, events, kill_event, result_reporter, **options)
+
+
+def test_profiles():
+    ramp = load.create_profile({'name': 'a', 'rate_per_sec': 100, 'profile': {'type': 'ramp', 'ramp_sec': 10}})
+    assert ramp.rate_at(0) == 0
+    assert ramp.rate_at(5) == 50
+    assert ramp.rate_at(20) == 100
+    assert ramp.mean_rate(10) == pytest.approx(50)
+    step = load.create_profile({'name': 'a', 'profile': {'type': 'step', 'steps': [[10, 20], [0, 10]]}})
+    assert [step.rate_at(t) for t in (0, 9.9, 10, 100)] == [10, 10, 20, 20]
+    spike = load.create_profile(
+        {'name': 'a', 'rate_per_sec': 5, 'profile': {'type': 'spike', 'at_sec': 10, 'duration_sec': 2,
+                                                     'rate_per_sec': 500}})
+    assert [spike.rate_at(t) for t in (0, 10, 11.9, 12)] == [5, 500, 500, 5]
+
+
+@pytest.mark.parametrize('profile, message', [
+    ({'type': 'sine'}, 'Unknown rate profile: "sine"'),
+    ({'type': 'ramp'}, 'needs ramp_sec'),
+    ({'type': 'step'}, 'needs steps'),
+    ({'type': 'spike', 'height': 3}, 'Invalid rate profile'),
+])
+def test_invalid_profiles(profile, message):
+    with pytest.raises(Exception, match=message):
+        load.create_profile({'name': 'a', 'rate_per_sec': 1, 'profile': profile})
+
+
+def test_rate_event_from_json():
+    event = plugin.create_event_from_json({'name': 'a', 'rate_per_sec': 10, 'arrivals': 'uniform'}, lambda: None)
+    assert isinstance(event, plugin.RateEvent)
+    assert event.interval_sec is None
+    assert event.at_startup is False
+    with pytest.raises(Exception, match='Unknown arrivals'):
+        plugin.create_event_from_json({'name': 'a', 'rate_per_sec': 10, 'arrivals': 'burst'}, lambda: None)
+
+
+@pytest.mark.parametrize('arrivals', [load.UNIFORM, load.POISSON])
+def test_achieved_rate(arrivals):
+    event = plugin.RateEvent('load', lambda: time.sleep(0.01), load.RateProfile(load.CONSTANT, 200), arrivals,
+                             seed=1)
+    orchestrator = make_orchestrator(1, [event])
+    orchestrator.run()
+    rate = orchestrator.run_report['summary']['load']['rate']
+    assert rate['target_per_sec'] == 200
+    assert 150 <= rate['arrivals'] <= 250
+    assert rate['completed'] + orchestrator.run_report['summary']['load']['cancelled'] == rate['arrivals']
+    assert rate['dropped'] == 0
+
+
+def test_latency_includes_queueing():
+    event = plugin.RateEvent('slow', lambda: time.sleep(0.1), load.RateProfile(load.CONSTANT, 40), load.UNIFORM,
+                             max_backlog=5)
+    orchestrator = make_orchestrator(1, [event], max_workers=1)
+    start_time = time.monotonic()
+    orchestrator.run()
+    assert time.monotonic() - start_time < 1.5
+    summary = orchestrator.run_report['summary']['slow']
+    assert summary['rate']['arrivals'] >= 35
+    assert summary['duration_sec']['max'] < 0.2
+    assert summary['latency_sec']['max'] > 0.4
+
+
+def test_backlog_is_bounded():
+    event = plugin.RateEvent('backlog', lambda: time.sleep(0.1), load.RateProfile(load.CONSTANT, 100), load.UNIFORM)
+    orchestrator = make_orchestrator(1, [event], max_workers=2)
+    assert orchestrator.rate_dispatchers[0].max_backlog == 2
+    start_time = time.monotonic()
+    orchestrator.run()
+    assert time.monotonic() - start_time < 1.5
+    summary = orchestrator.run_report['summary']['backlog']
+    rate = summary['rate']
+    assert rate['dropped'] > 50
+    assert summary['skipped'] == rate['dropped']
+    assert rate['completed'] + rate['dropped'] + summary['cancelled'] == rate['arrivals']
+    # Dropped arrivals are counted in the latency until the next execution finished
+    assert summary['latency_sec']['p50'] > 0.01
+
+
+def test_max_parallel_drops_arrivals():
+    event = plugin.RateEvent('capped', lambda: time.sleep(0.2), load.RateProfile(load.CONSTANT, 50), load.UNIFORM,
+                             max_parallel=1)
+    orchestrator = make_orchestrator(0.5, [event])
+    orchestrator.run()
+    summary = orchestrator.run_report['summary']['capped']
+    assert summary['rate']['dropped'] > 0
+    assert summary['skipped'] == summary['rate']['dropped']
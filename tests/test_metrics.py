@@ -0,0 +1,102 @@
+import multiprocessing
+import queue
+import random
+import threading
+
+import pytest
+
+from orchestration import metrics
+from orchestration import plugin
+from orchestration import reporter
+from orchestration import stats
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_histogram_percentiles(monkeypatch, use_numpy):
+    if use_numpy and metrics.numpy is None:
+        pytest.skip('numpy is not installed')
+    if not use_numpy:
+        monkeypatch.setattr(metrics, 'numpy', None)
+    values = [random.lognormvariate(0, 2) for i in range(20000)] + [0.0] * 100 + [-5.0] * 100
+    histogram = metrics.LogHistogram()
+    for i in range(0, len(values), 1000):
+        histogram.add_many(values[i:i + 1000])
+    exact = sorted(values)
+    for q in (1, 50, 95, 99, 100):
+        assert histogram.percentile(q) == pytest.approx(stats.percentile(exact, q), rel=0.011)
+    assert histogram.count == len(values)
+    assert histogram.max == max(values)
+    assert len(histogram.positive) < 3000
+
+
+def test_rolling_window_expires():
+    window = metrics.RollingWindow(60)
+    window.add_many([1.0] * 10, 0)
+    window.add_many([2.0] * 5, 30)
+    assert window.histogram(59).count == 15
+    assert window.histogram(61).count == 5
+    assert window.histogram(200).count == 0
+
+
+def test_aggregator_summary():
+    clock = FakeClock()
+    aggregator = metrics.MetricAggregator(window_sec=10, clock=clock)
+    aggregator.observe([{'metric': 'fps', 'value': 30}, {'metric': 'fps', 'value': 20}, {'other': 1},
+                        {'metric': 'fps', 'value': 'n/a'}, {'metric': 'fps', 'value': float('nan')}, ('tuple', 1)])
+    clock.now += 20
+    aggregator.observe([{'metric': 'fps', 'value': 10}])
+    summary = aggregator.summary()['fps']
+    assert summary['total']['count'] == 3
+    assert summary['total']['mean'] == 20
+    assert summary['total']['rate_per_sec'] == pytest.approx(3 / 20.0)
+    assert summary['window']['count'] == 1
+    assert summary['window']['p50'] == 10
+
+
+@pytest.mark.parametrize('rule, message', [
+    ({'stat': 'p99', 'max': 1}, 'has no metric'),
+    ({'metric': 'a', 'stat': 'p99'}, 'needs a min or max'),
+    ({'metric': 'a', 'stat': 'median', 'max': 1}, 'Unknown threshold stat: "median"'),
+])
+def test_invalid_thresholds(rule, message):
+    with pytest.raises(Exception, match=message):
+        metrics.Threshold(rule)
+
+
+def test_threshold_trips_kill_switch():
+    kill_switch = threading.Event()
+    thresholds = [{'metric': 'latency', 'stat': 'p99', 'max': 0.5, 'min_count': 10},
+                  {'metric': 'fps', 'stat': 'mean', 'min': 25, 'window': False}]
+    aggregator = metrics.MetricAggregator(kill_switch, thresholds)
+    aggregator.observe([{'metric': 'latency', 'value': 1.0}] * 5 + [{'metric': 'fps', 'value': 30}])
+    assert aggregator.check_thresholds() == []
+    aggregator.observe([{'metric': 'latency', 'value': 1.0}] * 5 + [{'metric': 'fps', 'value': 10}])
+    violations = aggregator.check_thresholds()
+    assert len(violations) == 2
+    assert 'metric "latency" p99' in violations[0]
+    assert 'metric "fps" mean 20 is below 25' == violations[1]
+    assert kill_switch.is_set()
+
+
+def test_orchestrator_fails_on_threshold():
+    kill_event = multiprocessing.Event()
+    result_reporter = reporter.ResultReporter(queue.Queue())
+
+    def slow_request():
+        result_reporter.add_result({'metric': 'latency', 'value': 2.0})
+
+    event = plugin.Event('request', slow_request, 0.1, True, False)
+    orchestrator = plugin.Orchestrator(
+        30, [event], kill_event, result_reporter, thresholds=[{'metric': 'latency', 'stat': 'max', 'max': 1}])
+    with pytest.raises(pytest.fail.Exception, match='metric "latency" max 2 is above 1'):
+        orchestrator.run()
+    assert orchestrator.run_report['metrics']['latency']['total']['max'] == 2.0
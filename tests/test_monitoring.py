@@ -0,0 +1,88 @@
+import json
+import multiprocessing
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from orchestration import monitoring
+from orchestration import plugin
+from orchestration import reporter
+
+
+@pytest.fixture
+def running_orchestrator():
+    result_reporter = reporter.ResultReporter(queue.Queue())
+
+    def sample():
+        result_reporter.add_result({'metric': 'latency', 'value': 0.25})
+
+    events = [plugin.Event('sample', sample, 0.1, True, False),
+              plugin.Event('hourly', lambda: None, 3600, False, False)]
+    orchestrator = plugin.Orchestrator(
+        1.5, events, multiprocessing.Event(), result_reporter, name='live', status_port=0)
+    runner = threading.Thread(target=orchestrator.run)
+    runner.start()
+    time.sleep(0.6)
+    yield orchestrator
+    runner.join(10)
+
+
+def get(orchestrator, path):
+    url = 'http://{}:{}{}'.format(monitoring.HOST, orchestrator.status_server.port, path)
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.headers['Content-Type'], response.read().decode('utf-8')
+
+
+def test_status(running_orchestrator):
+    content_type, body = get(running_orchestrator, '/status')
+    status = json.loads(body)
+    assert content_type == 'application/json'
+    assert 0.5 < status['elapsed_sec'] < 1.5
+    assert [event['event'] for event in status['next_events']] == ['sample', 'hourly']
+    assert status['events']['sample']['executions'] >= 4
+    assert status['reporter']['processed'] >= 4
+    assert status['metrics']['latency']['total']['p50'] == pytest.approx(0.25, rel=0.01)
+
+
+def test_prometheus_metrics(running_orchestrator):
+    content_type, body = get(running_orchestrator, '/metrics')
+    assert content_type.startswith('text/plain; version=0.0.4')
+    assert '# TYPE orchestration_event_executions_total counter' in body
+    assert 'orchestration_next_deadline_seconds{run="live",event="hourly"}' in body
+    assert 'orchestration_event_duration_seconds{run="live",event="sample",quantile="0.99"}' in body
+    assert 'orchestration_event_lateness_seconds{run="live",event="sample",quantile="0.5"}' in body
+    assert 'orchestration_metric_count{run="live",metric="latency"}' in body
+    assert 'orchestration_event_duration_seconds_sum{run="live",event="sample"}' in body
+    for line in body.splitlines():
+        if not line.startswith('#'):
+            float(line.rsplit(' ', 1)[1])
+
+
+def test_prometheus_metrics_parse(running_orchestrator):
+    parser = pytest.importorskip('prometheus_client.parser')
+    families = {family.name: family for family in parser.text_string_to_metric_families(
+        get(running_orchestrator, '/metrics')[1])}
+    assert 'orchestration_metric_count' not in families
+    for name in ('orchestration_metric', 'orchestration_event_duration_seconds',
+                 'orchestration_event_lateness_seconds'):
+        assert families[name].type == 'summary'
+    samples = {sample.name: sample for sample in families['orchestration_metric'].samples}
+    assert samples['orchestration_metric_count'].value >= 4
+    assert samples['orchestration_metric_sum'].value == pytest.approx(
+        0.25 * samples['orchestration_metric_count'].value, rel=0.01)
+    sample_names = {sample.name for sample in families['orchestration_event_duration_seconds'].samples}
+    assert sample_names == {'orchestration_event_duration_seconds', 'orchestration_event_duration_seconds_sum',
+                            'orchestration_event_duration_seconds_count'}
+
+
+def test_unknown_path(running_orchestrator):
+    with pytest.raises(urllib.error.HTTPError, match='404'):
+        get(running_orchestrator, '/')
+
+
+def test_label_escaping():
+    assert monitoring.labels(event='say "hi"\n') == '{event="say \\"hi\\"\\n"}'
@@ -0,0 +1,84 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+import pytest
+
+from orchestration import dispatch
+from orchestration import plugin
+from orchestration import reporter
+
+
+def make_orchestrator(total_time_sec, events):
+    kill_event = multiprocessing.Event()
+    result_reporter = reporter.ResultReporter(queue.Queue())
+    return plugin.Orchestrator(total_time_sec, events, kill_event, result_reporter)
+
+
+@pytest.mark.parametrize('interval_sec', [None, 600])
+def test_kill_switch_shutdown_latency(interval_sec):
+    event = plugin.Event('idle', lambda: None, interval_sec, True, False)
+    orchestrator = make_orchestrator(3600, [event])
+    tripped = dict()
+
+    def trip():
+        tripped['time'] = time.monotonic()
+        orchestrator.kill_event.set()
+
+    threading.Timer(0.2, trip).start()
+    with pytest.raises(pytest.fail.Exception):
+        orchestrator.run()
+    assert time.monotonic() - tripped['time'] < 0.2
+
+
+def test_test_end_latency():
+    event = plugin.Event('idle', lambda: None, 600, True, False)
+    orchestrator = make_orchestrator(0.3, [event])
+    start_time = time.monotonic()
+    orchestrator.run()
+    assert time.monotonic() - start_time < 0.5
+
+
+def test_slow_event_does_not_delay_fast_event():
+    fast_calls = list()
+    kill_event = multiprocessing.Event()
+
+    def slow():
+        kill_event.wait(10)
+
+    events = [
+        plugin.Event('slow', slow, 1, True, False, dispatch.SKIP_IF_RUNNING),
+        plugin.Event('fast', lambda: fast_calls.append(time.monotonic()), 1, False, False),
+    ]
+    result_reporter = reporter.ResultReporter(queue.Queue())
+    orchestrator = plugin.Orchestrator(3.5, events, kill_event, result_reporter)
+    start_time = time.monotonic()
+    orchestrator.run()
+    assert time.monotonic() - start_time < 4
+    assert [round(call - start_time) for call in fast_calls] == [1, 2, 3]
+
+
+def test_event_due_at_test_end_is_not_executed():
+    calls = list()
+    events = [plugin.Event('counter', lambda: calls.append(1), 1, True, False)]
+    make_orchestrator(3, events).run()
+    assert len(calls) == 3
+
+
+def test_slow_queued_event_does_not_overrun_test_end():
+    events = [plugin.Event('slow', lambda: time.sleep(0.5), 0.1, False, False)]
+    orchestrator = make_orchestrator(1, events)
+    start_time = time.monotonic()
+    orchestrator.run()
+    assert time.monotonic() - start_time < 1.8
+    assert orchestrator.stats.events['slow'].skipped > 0
+
+
+def test_run_report_is_published_only_when_asked():
+    orchestrator = make_orchestrator(0.1, [plugin.Event('tick', lambda: None, 0.05, False, False)])
+    orchestrator.run()
+    assert orchestrator.run_report['summary']['tick']['executions'] >= 1
+    assert orchestrator.name not in plugin.PUBLISHED_RUNS
+    plugin.publish_run(orchestrator)
+    assert plugin.PUBLISHED_RUNS.pop(orchestrator.name) is orchestrator.run_report
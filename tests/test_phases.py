@@ -0,0 +1,114 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+import pytest
+
+from orchestration import phases
+from orchestration import plugin
+from orchestration import reporter
+
+
+def make_orchestrator(total_time_sec, events):
+    return plugin.Orchestrator(
+        total_time_sec, events, multiprocessing.Event(), reporter.ResultReporter(queue.Queue()), name='phases')
+
+
+def test_event_phases():
+    assert phases.event_phases({'name': 'a'}) == (True, False)
+    assert phases.event_phases({'name': 'a', 'phase': 'teardown'}) == (False, True)
+    assert phases.event_phases({'name': 'a', 'phase': ['startup', 'teardown']}) == (True, True)
+    with pytest.raises(Exception, match='Unknown phase: "setup"'):
+        phases.event_phases({'name': 'a', 'phase': 'setup'})
+
+
+def test_validate():
+    phases.validate([{'name': 'a'}, {'name': 'b', 'depends_on': 'a'}, {'name': 'c', 'depends_on': ['a', 'b']}])
+    with pytest.raises(Exception, match='depends on unknown event: "d"'):
+        phases.validate([{'name': 'a', 'depends_on': ['d']}])
+    with pytest.raises(Exception, match='cycle: a -> b -> c -> a'):
+        phases.validate([{'name': 'a', 'depends_on': 'b'}, {'name': 'b', 'depends_on': 'c'},
+                         {'name': 'c', 'depends_on': 'a'}])
+
+
+def test_parallel_startup_respects_dependencies():
+    calls = list()
+    lock = threading.Lock()
+
+    def step(name, sec):
+        def func():
+            time.sleep(sec)
+            with lock:
+                calls.append(name)
+        return func
+
+    events = [plugin.Event('network', step('network', 0.2), None, True, False),
+              plugin.Event('device', step('device', 0.3), None, True, False),
+              plugin.Event('streamer', step('streamer', 0.1), None, True, False, depends_on=['network', 'device']),
+              plugin.Event('player', step('player', 0.1), None, True, False, depends_on=['streamer'])]
+    orchestrator = make_orchestrator(1.0, events)
+    start_time = time.monotonic()
+    orchestrator.run_startup_events()
+    assert orchestrator.startup_phase.wait(5)
+    assert time.monotonic() - start_time < 0.7
+    assert calls == ['network', 'device', 'streamer', 'player']
+
+    report = orchestrator.startup_phase.report()
+    assert report['events'] == 4
+    assert [step['event'] for step in report['critical_path']] == ['device', 'streamer', 'player']
+    assert report['duration_sec'] == pytest.approx(0.5, abs=0.15)
+    orchestrator.kill_all_events()
+
+
+def test_failed_dependency_is_not_run():
+    calls = list()
+
+    def fail():
+        raise Exception('Device did not boot')
+
+    events = [plugin.Event('device', fail, None, True, False),
+              plugin.Event('streamer', lambda: calls.append('streamer'), None, True, False, depends_on=['device']),
+              plugin.Event('other', lambda: calls.append('other'), None, True, False)]
+    orchestrator = make_orchestrator(1.0, events)
+    orchestrator.run_startup_events()
+    assert orchestrator.startup_phase.wait(5)
+    assert calls == ['other']
+    assert orchestrator.startup_phase.failed == ['device', 'streamer']
+    orchestrator.kill_all_events()
+
+
+def test_teardown_in_dependency_order():
+    calls = list()
+    events = [plugin.Event('collect_logs', lambda: calls.append('collect_logs'), None, False, True,
+                           depends_on=['stop_streamer']),
+              plugin.Event('stop_streamer', lambda: (time.sleep(0.1), calls.append('stop_streamer')), None,
+                           False, True)]
+    orchestrator = make_orchestrator(0.1, events)
+    orchestrator.run()
+    assert calls == ['stop_streamer', 'collect_logs']
+    assert [step['event'] for step in orchestrator.run_report['phases']['teardown']['critical_path']] == [
+        'stop_streamer', 'collect_logs']
+
+
+def test_cycle_is_rejected():
+    events = [plugin.Event('a', lambda: None, None, True, False, depends_on=['b']),
+              plugin.Event('b', lambda: None, None, True, False, depends_on=['a'])]
+    with pytest.raises(Exception, match='cycle'):
+        make_orchestrator(1.0, events)
+
+
+def test_unknown_dependency_is_rejected():
+    events = [plugin.Event('streamer', lambda: None, None, True, False, depends_on=['boot_device']),
+              plugin.Event('collect_logs', lambda: None, None, False, True, depends_on=['streamer'])]
+    with pytest.raises(Exception, match='"streamer" depends on unknown event: "boot_device"'):
+        make_orchestrator(1.0, events)
+    del events[0].depends_on[:]
+    make_orchestrator(1.0, events).kill_all_events()
+
+
+def test_event_from_json():
+    event = plugin.create_event_from_json(
+        {'name': 'collect_logs', 'phase': 'teardown', 'depends_on': 'stop_streamer'}, lambda: None)
+    assert (event.at_startup, event.at_teardown) == (False, True)
+    assert event.depends_on == ['stop_streamer']
@@ -0,0 +1,61 @@
+import os
+import threading
+
+import pytest
+
+from orchestration import dispatch
+from orchestration import plugin
+from orchestration import reporter
+from orchestration import transport
+from tests import events
+
+
+def make_factory(func, *args):
+
+    def factory_func():
+        func(*args)
+
+    factory_func.func = func
+    factory_func.args = args
+    factory_func.kwargs = dict()
+    return factory_func
+
+
+def test_process_event():
+    kill_event = transport.CONTEXT.Event()
+    result_reporter = reporter.ResultReporter(transport.create_report_queue('process'))
+    factory = make_factory(events.report_pid_func, result_reporter, kill_event, 42)
+    event = plugin.Event('report_pid', factory, None, True, False, executor=dispatch.PROCESS)
+    shared = {'kill_switch': kill_event, 'result_reporter': result_reporter}
+    dispatcher = dispatch.Dispatcher(2, 2, shared)
+    dispatcher.prepare([event])
+    dispatcher.submit(event).result(30)
+    workers = list(dispatcher.process_pool._processes.values())
+    dispatcher.shutdown(5)
+    assert workers and not any(worker.is_alive() for worker in workers)
+    result = result_reporter.next_batch(5)[0]
+    assert result['pid'] != os.getpid()
+    assert result['value'] == 42
+    assert result['killed'] is False
+
+
+def test_unpicklable_fixture_is_rejected():
+    kill_event = transport.CONTEXT.Event()
+    result_reporter = reporter.ResultReporter(transport.create_report_queue('process'))
+    factory = make_factory(events.report_pid_func, result_reporter, kill_event, threading.Lock())
+    event = plugin.Event('report_pid', factory, None, True, False, executor=dispatch.PROCESS)
+    dispatcher = dispatch.Dispatcher(2, 2, {'kill_switch': kill_event, 'result_reporter': result_reporter})
+    with pytest.raises(Exception, match='fixture "value" can not cross a process boundary'):
+        dispatcher.prepare([event])
+    dispatcher.shutdown()
+
+
+def test_thread_transport_is_rejected():
+    kill_event = transport.CONTEXT.Event()
+    result_reporter = reporter.ResultReporter(transport.create_report_queue('thread'))
+    factory = make_factory(events.report_pid_func, result_reporter, kill_event, 1)
+    event = plugin.Event('report_pid', factory, None, True, False, executor=dispatch.PROCESS)
+    dispatcher = dispatch.Dispatcher(2, 2, {'kill_switch': kill_event, 'result_reporter': result_reporter})
+    with pytest.raises(Exception, match='"thread" report transport'):
+        dispatcher.prepare([event])
+    dispatcher.shutdown()
@@ -0,0 +1,139 @@
+import asyncio
+import multiprocessing
+import pstats
+import queue
+import threading
+import time
+
+import pytest
+
+from orchestration import dispatch
+from orchestration import plugin
+from orchestration import profiling
+from orchestration import reporter
+
+
+def busy_loop(sec):
+    end = time.monotonic() + sec
+    while time.monotonic() < end:
+        pass
+
+
+def hot_path():
+    busy_loop(0.05)
+
+
+def make_orchestrator(total_time_sec, events, **options):
+    return plugin.Orchestrator(total_time_sec, events, multiprocessing.Event(),
+                               reporter.ResultReporter(queue.Queue()), name='profiled', **options)
+
+
+def test_cprofile_adds_up_executions(tmp_path):
+    collector = profiling.CProfileCollector('hot')
+    func = collector.wrap(hot_path)
+    for i in range(3):
+        func()
+    assert collector.executions == 3
+    file_path = collector.write(str(tmp_path / 'hot'))
+    stats = pstats.Stats(file_path)
+    calls = {name[2]: stat[1] for name, stat in stats.stats.items()}
+    assert calls['hot_path'] == 3
+
+
+def test_cprofile_runs_unprofiled_when_another_profile_is_active(monkeypatch):
+
+    class ActiveProfile(profiling.cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError('Another profiling tool is already active')
+
+    calls = list()
+    collector = profiling.CProfileCollector('hot')
+    func = collector.wrap(lambda: calls.append('hot'))
+    monkeypatch.setattr(profiling.cProfile, 'Profile', ActiveProfile)
+    func()
+    func()
+    assert calls == ['hot', 'hot']
+    assert (collector.executions, collector.unprofiled) == (0, 2)
+
+
+def test_sampler_collapses_event_stacks():
+    sampler = profiling.StackSampler(sample_interval_sec=0.001)
+    func = sampler.wrap('hot', hot_path)
+    thread = threading.Thread(target=func)
+    thread.start()
+    sampler.start()
+    thread.join()
+    sampler.stop()
+    stacks = sampler.stacks['hot']
+    assert stacks
+    for stack in stacks:
+        assert stack.startswith('test_profiling.py:hot_path')
+    assert any('busy_loop' in stack for stack in stacks)
+
+
+def test_sampler_attributes_coroutines():
+    sampler = profiling.StackSampler(sample_interval_sec=0.001)
+
+    async def probe():
+        await asyncio.sleep(0)
+        busy_loop(0.05)
+
+    func = sampler.wrap('probe', probe)
+    sampler.start()
+    asyncio.run(func())
+    sampler.stop()
+    assert any(stack.startswith('test_profiling.py:probe;') for stack in sampler.stacks['probe'])
+
+
+def test_sampler_overhead_is_bounded():
+    sampler = profiling.StackSampler(sample_interval_sec=0.001)
+    func = sampler.wrap('hot', lambda: busy_loop(0.3))
+    thread = threading.Thread(target=func)
+    thread.start()
+    sampler.start()
+    thread.join()
+    sampler.stop()
+    assert sampler.samples > 0
+    assert sampler.sample_sec < 0.3 * profiling.MAX_OVERHEAD * 2 + 0.01
+
+
+def test_orchestrator_writes_profiles(tmp_path):
+    events = [plugin.Event('hot', hot_path, 0.1, False, False, profiler=profiling.CPROFILE),
+              plugin.Event('sampled', hot_path, 0.1, False, False)]
+    orchestrator = make_orchestrator(0.5, events, profiler=profiling.SAMPLING, profile_dir=str(tmp_path))
+    orchestrator.run()
+    assert sorted(orchestrator.run_report['profiles']) == [
+        str(tmp_path / 'profiled.hot.pstats'), str(tmp_path / 'profiled.sampled.collapsed')]
+    with open(tmp_path / 'profiled.sampled.collapsed') as f:
+        line = f.readline().split(' ')
+    assert line[0].startswith('test_profiling.py:hot_path')
+    assert int(line[1]) > 0
+
+
+def test_run_profiler_skips_unsupported_events(caplog):
+    async def probe():
+        pass
+
+    events = [plugin.Event('hot', hot_path, 0.1, False, False),
+              plugin.Event('probe', probe, 0.1, False, False)]
+    orchestrator = make_orchestrator(0.5, events, profiler=profiling.CPROFILE)
+    assert sorted(orchestrator.profiles.collectors) == ['hot']
+    assert events[1].func is probe
+    assert 'Not profiling with "cprofile": Coroutine event "probe"' in caplog.text
+    orchestrator.kill_all_events()
+
+    process_event = plugin.Event('pid', hot_path, 0.1, False, False, executor=dispatch.PROCESS)
+    assert 'runs in a process' in profiling.unsupported(profiling.SAMPLING, process_event)
+    assert profiling.unsupported(profiling.SAMPLING, events[1]) is None
+
+
+def test_invalid_profiler():
+    with pytest.raises(Exception, match='Unknown profiler: "perf"'):
+        plugin.create_event_from_json({'name': 'hot', 'profiler': 'perf'}, hot_path)
+    with pytest.raises(Exception, match='runs in a process'):
+        plugin.create_event_from_json({'name': 'hot', 'profiler': 'sampling', 'executor': dispatch.PROCESS}, hot_path)
+
+    async def probe():
+        pass
+    with pytest.raises(Exception, match='can only be profiled with "sampling"'):
+        plugin.create_event_from_json({'name': 'probe', 'profiler': 'cprofile'}, probe)
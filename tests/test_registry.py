@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from orchestration import plugin
+from orchestration import registry
+
+pytest_plugins = ['pytester']
+
+
+def test_unique_names():
+    fixture_registry = registry.FixtureRegistry()
+    fixtures = dict()
+    for i in range(5000):
+        fixtures[fixture_registry.unique_name('nightly', registry.EVENT, 'event', i)] = plugin.generate_value_fixture(i)
+    fixture_registry.register(fixtures)
+    assert len(fixture_registry) == 5000
+    assert fixture_registry.names()[:2] == ['orch__nightly__event__event__0', 'orch__nightly__event__event__1']
+    assert 'orch__nightly__event__event__4999' in fixture_registry
+    assert 'orch__nightly__event__event__5000' not in fixture_registry
+    assert fixture_registry.unique_name('nightly-a', registry.ISOLATED, 'kill_switch') == \
+        'orch__nightly_00002da__isolated__kill_switch'
+
+
+def test_unique_names_do_not_collide():
+    unique_name = registry.FixtureRegistry().unique_name
+    names = [
+        unique_name('nightly', registry.PARAM, 'timeout', 0),
+        unique_name('nightly', registry.EVENT, 'timeout', 0),
+        unique_name('a_b', registry.EVENT, 'c', 0),
+        unique_name('a', registry.EVENT, 'b_c', 0),
+        unique_name('x-y', registry.EVENT, 'c', 0),
+        unique_name('x_y', registry.EVENT, 'c', 0),
+        unique_name('x', registry.EVENT, 'y__event__c', 0),
+        unique_name('x_', registry.EVENT, '_c', 0),
+        unique_name('x', registry.EVENT, '_c', 0),
+        unique_name('x_', registry.EVENT, 'c', 0),
+        unique_name('value_1', registry.PARAM, 'a', 0),
+        unique_name('value_00005f1', registry.PARAM, 'a', 0),
+    ]
+    assert len(set(names)) == len(names)
+    assert all(name.isidentifier() for name in names)
+
+
+def test_register_rejects_duplicates():
+    fixture_registry = registry.FixtureRegistry()
+    fixture_registry.register({'orch__a__event__b__0': plugin.generate_value_fixture(1)})
+    with pytest.raises(Exception, match='"orch__a__event__b__0" is already registered'):
+        fixture_registry.register({'orch__a__event__b__0': plugin.generate_value_fixture(2)})
+    assert fixture_registry['orch__a__event__b__0'] is not None
+
+
+def test_names_do_not_depend_on_setup_order(monkeypatch):
+    def setup(test_names):
+        monkeypatch.setattr(registry, 'REGISTRY', registry.FixtureRegistry())
+        names = dict()
+        for test_name in test_names:
+            description = {'test_name': test_name, 'total_hours': 1,
+                           'events': [{'name': 'report_pid_func', 'params': {'value': 1}},
+                                      {'name': 'assert_func'}]}
+            plugin._setup_fixtures(['tests/events.py'], description)
+            names[test_name] = [(event['name'], list(event.get('params', dict()))) for event in description['events']]
+        return names
+
+    assert setup(['order_a', 'order_b']) == setup(['order_b', 'order_a'])
+    assert setup(['order_a'])['order_a'] == [
+        ('orch__order_a__event__report_pid_func__0', ['orch__order_a__param__value__0']),
+        ('orch__order_a__event__assert_func__1', [])]
+
+
+def test_fixtures_registered_before_session_start(testdir, monkeypatch):
+    monkeypatch.setenv('PYTHONPATH', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    testdir.makeconftest('''
+        from orchestration import plugin
+        from orchestration import registry
+
+
+        def pytest_configure(config):
+            fixtures = dict()
+            for i in range(1000):
+                fixtures['conftest_value_{}'.format(i)] = plugin.generate_value_fixture(i)
+            registry.REGISTRY.register(fixtures)
+    ''')
+    testdir.makepyfile('''
+        def test_early_fixture(conftest_value_999, request):
+            assert conftest_value_999 == 999
+            assert request.getfixturevalue('conftest_value_0') == 0
+    ''')
+    result = testdir.runpytest_subprocess('-p', 'orchestration.plugin')
+    result.assert_outcomes(passed=1)
@@ -0,0 +1,70 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+from orchestration import reporter
+
+
+class CollectingReporter(reporter.ResultReporter):
+
+    def __init__(self, results):
+        super().__init__(results)
+        self.batches = list()
+        self.received_at = list()
+
+    def on_result(self, results):
+        self.batches.append(results)
+        self.received_at.append(time.monotonic())
+
+
+def start_monitor(result_reporter, kill_switch):
+    monitor = threading.Thread(target=result_reporter.monitor, args=(kill_switch,))
+    monitor.start()
+    return monitor
+
+
+def test_monitor_drains_in_batches():
+    result_reporter = CollectingReporter(queue.Queue())
+    for i in range(2500):
+        result_reporter.add_result({'value': i})
+    kill_switch = threading.Event()
+    monitor = start_monitor(result_reporter, kill_switch)
+    kill_switch.set()
+    result_reporter.stop()
+    monitor.join(1)
+    assert not monitor.is_alive()
+    received = [result['value'] for batch in result_reporter.batches for result in batch]
+    assert received == list(range(2500))
+    assert max(len(batch) for batch in result_reporter.batches) == reporter.ResultReporter.MAX_BATCH
+
+
+def test_result_latency_with_manager_queue():
+    manager = multiprocessing.Manager()
+    result_reporter = CollectingReporter(manager.Queue())
+    kill_switch = manager.Event()
+    monitor = start_monitor(result_reporter, kill_switch)
+    time.sleep(0.1)
+    sent_at = time.monotonic()
+    result_reporter.add_result('result')
+    while not result_reporter.batches and time.monotonic() - sent_at < 1:
+        time.sleep(0.001)
+    kill_switch.set()
+    result_reporter.stop()
+    monitor.join(1)
+    manager.shutdown()
+    assert result_reporter.batches == [['result']]
+    assert result_reporter.received_at[0] - sent_at < 0.1
+
+
+def test_stop_wakes_monitor():
+    result_reporter = CollectingReporter(queue.Queue())
+    kill_switch = threading.Event()
+    monitor = start_monitor(result_reporter, kill_switch)
+    time.sleep(0.1)
+    stopped_at = time.monotonic()
+    kill_switch.set()
+    result_reporter.stop()
+    monitor.join(1)
+    assert time.monotonic() - stopped_at < 0.1
+    assert result_reporter.batches == list()
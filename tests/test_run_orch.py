@@ -0,0 +1,75 @@
+import json
+import os
+
+pytest_plugins = ['pytester']
+
+EVENTS = '''
+import time
+
+
+def record_call(label):
+    with open('calls.txt', 'a') as f:
+        f.write(label + '\\n')
+
+
+def boot_device():
+    time.sleep(0.2)
+    record_call('boot_device')
+
+
+def report(result_reporter, kill_switch):
+    result_reporter.add_result({'killed': kill_switch.is_set()})
+'''
+
+
+def make_project(testdir, monkeypatch, description):
+    monkeypatch.setenv('PYTHONPATH', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    testdir.makeini('''
+        [pytest]
+        orchestration_sources = events.py
+        orchestration_descriptions = configs/
+    ''')
+    testdir.makepyfile(events=EVENTS)
+    testdir.mkdir('configs').join('{}.json'.format(description['test_name'])).write(json.dumps(description))
+
+
+def run_orch(testdir, name):
+    return testdir.runpytest_subprocess('-p', 'orchestration.plugin', '--run-orch', name)
+
+
+def read_calls(testdir):
+    return testdir.tmpdir.join('calls.txt').read().split()
+
+
+def test_run_description(testdir, monkeypatch):
+    make_project(testdir, monkeypatch, {
+        'test_name': 'smoke',
+        'total_hours': 0.0003,
+        'events': [
+            {'name': 'record_call', 'at_startup': True, 'params': {'label': 'startup'}},
+            {'name': 'record_call', 'interval_sec': 0.2, 'params': {'label': 'interval'}},
+            {'name': 'report', 'interval_sec': 0.2},
+        ],
+    })
+    result = run_orch(testdir, 'smoke')
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(['*orchestration event timings: smoke*'])
+    assert result.stdout.str().count('orchestration event timings') == 1
+    calls = read_calls(testdir)
+    assert calls[0] == 'startup'
+    assert calls.count('interval') >= 3
+
+
+def test_run_description_with_dependency(testdir, monkeypatch):
+    make_project(testdir, monkeypatch, {
+        'test_name': 'dependencies',
+        'total_hours': 0.0001,
+        'events': [
+            {'name': 'record_call', 'phase': 'startup', 'params': {'label': 'start_streamer'},
+             'depends_on': 'boot_device'},
+            {'name': 'boot_device', 'phase': 'startup'},
+        ],
+    })
+    result = run_orch(testdir, 'dependencies')
+    result.assert_outcomes(passed=1)
+    assert read_calls(testdir) == ['boot_device', 'start_streamer']
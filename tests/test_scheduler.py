@@ -0,0 +1,84 @@
+from orchestration import plugin
+from orchestration import scheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_event(name, interval_sec):
+    return plugin.Event(name, lambda: None, interval_sec, False, False)
+
+
+def test_scheduler_orders_by_deadline():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    for name, interval in [('slow', 30), ('fast', 5), ('medium', 10)]:
+        sched.add(make_event(name, interval))
+    assert sched.peek().name == 'fast'
+    clock.now = 10
+    due = [event.name for event, _ in sched.pop_due()]
+    assert due == ['fast', 'medium']
+    assert sched.next_deadline() == 15
+
+
+def test_scheduler_does_not_drift():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    sched.add(make_event('event', 30))
+    deadlines = list()
+    for i in range(360):
+        # Fire every event a bit late, as a real sleep would
+        clock.now = sched.next_deadline() + 0.25
+        deadlines.extend(deadline for _, deadline in sched.pop_due())
+    assert deadlines == [30.0 * (i + 1) for i in range(360)]
+    assert sched.report()['event']['max_sec'] == 0.25
+
+
+def test_scheduler_skips_missed_slots():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    sched.add(make_event('event', 10))
+    clock.now = 35
+    assert len(sched.pop_due()) == 1
+    assert sched.next_deadline() == 40
+    assert sched.lateness['event'].missed == 2
+
+
+def test_scheduler_many_events():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    for i in range(500):
+        sched.add(make_event('event_{}'.format(i), 1 + i % 7))
+    clock.now = 7
+    fired = sched.pop_due()
+    assert len(fired) == 500
+    assert len(sched) == 500
+    assert sched.next_deadline() > clock.now
+
+
+def test_scheduler_phase_offset():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    for i in range(4):
+        sched.add(plugin.Event('event_{}'.format(i), lambda: None, 1, False, False, phase_offset_sec=i * 0.25))
+    assert [deadline for deadline, _ in sched.pending()] == [1.0, 1.25, 1.5, 1.75]
+
+
+def test_scheduler_jitter_does_not_accumulate():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock, seed=1)
+    sched.add(plugin.Event('event', lambda: None, 0.01, False, False, jitter_sec=0.002))
+    fired = list()
+    for i in range(1000):
+        clock.now = sched.next_deadline()
+        fired.extend(fire_at for _, fire_at in sched.pop_due())
+    offsets = [fire_at - 0.01 * (i + 1) for i, fire_at in enumerate(fired)]
+    assert all(0 <= offset < 0.002 + 1e-9 for offset in offsets)
+    assert len(set(round(offset, 6) for offset in offsets)) > 100
+    assert sched.lateness['event'].missed == 0
@@ -0,0 +1,80 @@
+import json
+import multiprocessing
+import queue
+import time
+
+import pytest
+
+from orchestration import load
+from orchestration import plugin
+from orchestration import reporter
+from orchestration import simulation
+
+
+def make_orchestrator(total_time_sec, events, **options):
+    return plugin.Orchestrator(
+        total_time_sec, events, multiprocessing.Event(), reporter.ResultReporter(queue.Queue()), **options)
+
+
+def test_create_clock():
+    assert isinstance(simulation.create_clock(simulation.INSTANT), simulation.VirtualClock)
+    assert simulation.create_clock('60').speedup == 60
+    with pytest.raises(Exception, match='speedup factor'):
+        simulation.create_clock('fast')
+    with pytest.raises(Exception, match='above 0'):
+        simulation.create_clock('0')
+
+
+def test_scaled_clock():
+    clock = simulation.ScaledClock(100)
+    kill_event = multiprocessing.Event()
+    start_time = time.monotonic()
+    assert not clock.wait(kill_event, 10)
+    assert time.monotonic() - start_time < 1
+    assert clock() >= 10
+
+
+def test_simulate_three_hours(tmp_path):
+    calls = list()
+    events = [plugin.Event('setup', lambda: calls.append('setup'), None, True, False),
+              plugin.Event('every_10_min', lambda: calls.append('tick'), 600, False, False),
+              plugin.Event('hourly', lambda: None, 3600, False, False),
+              plugin.Event('teardown', lambda: None, None, False, True)]
+    simulation.stub_events(events)
+    simulation_path = tmp_path / 'simulation.json'
+    orchestrator = make_orchestrator(3 * 3600, events, name='three_hours', clock=simulation.VirtualClock(),
+                                     simulation_path=str(simulation_path))
+    start_time = time.monotonic()
+    orchestrator.run()
+    assert time.monotonic() - start_time < 5
+    assert calls == []
+
+    report = orchestrator.run_report['simulation']
+    assert report['counts'] == {'setup': 1, 'every_10_min': 17, 'hourly': 2, 'teardown': 1}
+    assert report['timeline'][0] == (0, 'setup')
+    assert report['timeline'][-1] == (3 * 3600, 'teardown')
+    hourly = [elapsed for elapsed, name in report['timeline'] if name == 'hourly']
+    assert hourly == [3600, 7200]
+    with open(simulation_path) as f:
+        assert json.load(f)['counts'] == report['counts']
+    assert 'every_10_min' in '\n'.join(simulation.format_report(report))
+
+
+def test_simulate_executing_events():
+    calls = list()
+    events = [plugin.Event('tick', lambda: calls.append('tick'), 60, False, False)]
+    orchestrator = make_orchestrator(300, events, name='executed', clock=simulation.VirtualClock())
+    orchestrator.run()
+    assert calls == ['tick'] * 4
+
+
+def test_simulate_rate_event():
+    profile = load.RateProfile(load.CONSTANT, rate_per_sec=1)
+    events = [plugin.RateEvent('requests', lambda: None, profile, load.UNIFORM),
+              plugin.Event('tick', lambda: None, 100, False, False)]
+    simulation.stub_events(events)
+    orchestrator = make_orchestrator(1000, events, name='rate', clock=simulation.VirtualClock())
+    start_time = time.monotonic()
+    orchestrator.run()
+    assert time.monotonic() - start_time < 10
+    assert orchestrator.run_report['simulation']['counts']['requests'] == 999
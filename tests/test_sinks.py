@@ -0,0 +1,76 @@
+import pickle
+import queue
+import threading
+import time
+
+import pytest
+
+from orchestration import reporter
+from orchestration import sinks
+
+
+def run_monitor(sink, results):
+    kill_switch = threading.Event()
+    monitor = threading.Thread(target=sink.monitor, args=(kill_switch,))
+    monitor.start()
+    for result in results:
+        sink.add_result(result)
+    kill_switch.set()
+    sink.stop()
+    monitor.join(30)
+
+
+@pytest.mark.parametrize('sink_name', [sinks.NDJSON, sinks.BINARY])
+@pytest.mark.parametrize('compression', [None, 'gzip', 'lzma'])
+def test_results_round_trip(tmp_path, sink_name, compression):
+    results = [{'metric': 'fps', 'value': i} for i in range(5000)]
+    sink = sinks.create_sink(sink_name, queue.Queue(), str(tmp_path / 'results'), 20000, compression)
+    run_monitor(sink, results)
+    assert len(sink.files) > 1
+    assert sink.files[0].endswith({None: '', 'gzip': '.gz', 'lzma': '.xz'}[compression])
+    read_back = [result for file_path in sink.files for result in sinks.read_results(file_path)]
+    assert read_back == results
+
+
+def test_file_names(tmp_path):
+    sink = sinks.create_sink(sinks.NDJSON, queue.Queue(), str(tmp_path / 'run.ndjson'), compression='gzip')
+    assert sink.next_path() == str(tmp_path / 'run.0000.ndjson.gz')
+    assert sinks.create_sink(sinks.BINARY, queue.Queue()).next_path() == 'orchestration_results.0000.bin'
+
+
+def test_unserializable_results_are_written_as_repr(tmp_path):
+    sink = sinks.create_sink(sinks.NDJSON, queue.Queue(), str(tmp_path / 'results.ndjson'))
+    run_monitor(sink, [{'lock': threading.Lock}])
+    assert list(sinks.read_results(sink.files[0])) == [{'lock': repr(threading.Lock)}]
+
+
+def test_sink_selection():
+    assert type(sinks.create_sink(sinks.LOG, queue.Queue())) is reporter.ResultReporter
+    with pytest.raises(Exception, match='Unknown result sink: "csv"'):
+        sinks.create_sink('csv', queue.Queue())
+    with pytest.raises(Exception, match='Unknown result compression: "zstd"'):
+        sinks.create_sink(sinks.NDJSON, queue.Queue(), compression='zstd')
+
+
+def test_sink_without_encode_can_not_be_created():
+    class CsvSink(sinks.FileSink):
+        pass
+
+    with pytest.raises(TypeError, match='abstract method'):
+        CsvSink(queue.Queue(), 'results.csv')
+
+
+def test_sink_can_be_pickled(tmp_path):
+    sink = sinks.create_sink(sinks.NDJSON, queue.Queue(), str(tmp_path / 'results.ndjson'))
+    sink.on_result([{'value': 1}])
+    sink.results = None
+    assert pickle.loads(pickle.dumps(sink)).files == sink.files
+    sink.close()
+
+
+def test_throughput(tmp_path):
+    sink = sinks.create_sink(sinks.NDJSON, queue.Queue(), str(tmp_path / 'results.ndjson'))
+    start_time = time.monotonic()
+    run_monitor(sink, [{'metric': 'latency', 'value': 0.5, 'sample': i} for i in range(100000)])
+    assert time.monotonic() - start_time < 10
+    assert sum(1 for result in sinks.read_results(sink.files[0])) == 100000
@@ -0,0 +1,81 @@
+import csv
+import json
+import multiprocessing
+import queue
+import time
+
+import pytest
+
+from orchestration import dispatch
+from orchestration import plugin
+from orchestration import reporter
+from orchestration import stats
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert stats.percentile(values, 50) == 50
+    assert stats.percentile(values, 99) == 99
+    assert stats.percentile([7], 95) == 7
+    assert stats.percentile([], 50) is None
+
+
+def test_execution_timing_and_exceptions(caplog):
+    dispatcher = dispatch.Dispatcher(2)
+
+    def sleeper():
+        time.sleep(0.1)
+
+    def failing():
+        raise ValueError('broken event')
+
+    sleeper_event = plugin.Event('sleeper', sleeper, None, True, False)
+    failing_event = plugin.Event('failing', failing, None, True, False)
+    for i in range(2):
+        dispatcher.submit(sleeper_event, scheduled=time.monotonic() - 1)
+    dispatcher.submit(failing_event)
+    dispatcher.wait_idle(5)
+    dispatcher.shutdown(5)
+
+    summary = dispatcher.stats.summary()
+    assert summary['sleeper']['executions'] == 2
+    assert summary['sleeper']['duration_sec']['p50'] >= 0.1
+    assert summary['sleeper']['lateness_sec']['max'] >= 1
+    assert summary['sleeper']['queue_wait_sec']['max'] >= 0.1
+    assert summary['failing']['errors'] == 1
+    assert dispatcher.stats.events['failing'].last_exception == "ValueError('broken event')"
+    assert 'broken event' in caplog.text
+
+
+def test_run_writes_stats(tmp_path):
+    calls = list()
+    events = [plugin.Event('counter', lambda: calls.append(1), 1, True, False)]
+    for path in [tmp_path / 'stats.json', tmp_path / 'stats.csv']:
+        orchestrator = plugin.Orchestrator(
+            1.5, events, multiprocessing.Event(), reporter.ResultReporter(queue.Queue()), stats_path=str(path))
+        orchestrator.run()
+    assert json.loads((tmp_path / 'stats.json').read_text())['events']['counter']['executions'] == 2
+    with open(str(tmp_path / 'stats.csv')) as f:
+        rows = list(csv.DictReader(f))
+    assert rows[0]['event'] == 'counter'
+    assert rows[0]['executions'] == '2'
+    assert 'duration_sec_p99' in rows[0]
+
+
+def test_summary_does_not_read_the_log(monkeypatch):
+    event_stats = stats.EventStats('event')
+    durations = [0.001 * (i % 500 + 1) for i in range(5000)]
+    for i, duration in enumerate(durations):
+        record = stats.ExecutionRecord('event', float(i), i + 0.25)
+        record.started = i + 0.5
+        record.duration = duration
+        record.outcome = stats.OK
+        event_stats.add(record)
+    monkeypatch.setattr(event_stats.log, 'column', None)
+    summary = event_stats.summary()
+    exact = stats.distribution(durations)
+    for key in ('p50', 'p95', 'p99'):
+        assert summary['duration_sec'][key] == pytest.approx(exact[key], rel=0.011)
+    assert summary['duration_sec']['max'] == exact['max']
+    assert summary['queue_wait_sec']['max'] == 0.25
+    assert summary['executions'] == 5000
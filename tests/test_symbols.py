@@ -0,0 +1,47 @@
+import types
+
+import pytest
+
+from orchestration import plugin
+from orchestration import symbols
+from tests import events
+
+
+def make_module(name, **functions):
+    module = types.ModuleType(name)
+    for func_name, func in functions.items():
+        module.__dict__[func_name] = func
+    return module
+
+
+def first():
+    pass
+
+
+def second():
+    pass
+
+
+def test_symbol_table_from_sources():
+    symbol_table = plugin.get_symbol_table(['tests/events.py'])
+    assert symbol_table.resolve('increament_func') is events.increament_func
+    assert plugin.get_symbol_table(['tests/events.py']) is symbol_table
+
+
+def test_missing_event():
+    symbol_table = symbols.SymbolTable([make_module('source_a', first=first)])
+    with pytest.raises(Exception, match='Event "missing" was not found in orchestration_sources: source_a'):
+        symbol_table.resolve('missing')
+
+
+def test_duplicate_event():
+    symbol_table = symbols.SymbolTable([
+        make_module('source_a', event=first),
+        make_module('source_b', event=second),
+        make_module('source_c', shared=first),
+        make_module('source_d', shared=first),
+    ])
+    with pytest.raises(Exception, match='more than one orchestration_sources module: source_a, source_b'):
+        symbol_table.resolve('event')
+    # The same function imported into several modules is not a duplicate
+    assert symbol_table.resolve('shared') is first
@@ -0,0 +1,49 @@
+import multiprocessing
+import queue
+import threading
+import time
+
+import pytest
+
+from orchestration import plugin
+from orchestration import reporter
+from orchestration import timer
+
+
+def test_precision_timer_wakes_up_on_time():
+    precision_timer = timer.PrecisionTimer(threading.Event())
+    for i in range(20):
+        start = time.monotonic()
+        assert not precision_timer.wait(0.005)
+        assert time.monotonic() - start >= 0.005
+    report = timer.accuracy([precision_timer])
+    assert report['waits'] == 20
+    assert 0 <= report['p50_sec'] < 0.001
+
+
+def test_precision_timer_kill_switch():
+    kill_event = threading.Event()
+    precision_timer = timer.PrecisionTimer(kill_event)
+    threading.Timer(0.1, kill_event.set).start()
+    start = time.monotonic()
+    assert precision_timer.wait(10)
+    assert time.monotonic() - start < 0.5
+    assert timer.accuracy([precision_timer])['waits'] == 0
+
+
+def test_interval_ms_from_json():
+    event = plugin.create_event_from_json(
+        {'name': 'sample_cpu', 'interval_ms': 10, 'jitter_sec': 0.002, 'phase_offset_sec': 0.005}, lambda: None)
+    assert event.interval_sec == pytest.approx(0.01)
+    assert (event.jitter_sec, event.phase_offset_sec) == (0.002, 0.005)
+
+
+def test_100_hz_event():
+    event = plugin.Event('sample', lambda: None, 0.01, False, False)
+    orchestrator = plugin.Orchestrator(
+        1.0, [event], multiprocessing.Event(), reporter.ResultReporter(queue.Queue()), name='sampling')
+    orchestrator.run()
+    summary = orchestrator.run_report['summary']['sample']
+    assert summary['executions'] >= 95
+    assert summary['lateness_sec']['p50'] < 0.002
+    assert orchestrator.run_report['timers']['waits'] >= 95
@@ -0,0 +1,105 @@
+import multiprocessing
+import queue
+import struct
+import threading
+import time
+
+import pytest
+
+from orchestration import plugin
+from orchestration import reporter
+from orchestration import transport
+
+
+def produce(report_queue, count):
+    result_reporter = reporter.ResultReporter(report_queue)
+    for i in range(count):
+        result_reporter.add_result((float(i), 1.0))
+
+
+def collect(report_queue, count):
+    result_reporter = reporter.ResultReporter(report_queue)
+    received = list()
+    while len(received) < count:
+        received.extend(result_reporter.next_batch(5))
+    return received
+
+
+@pytest.mark.parametrize('transport_name', ['manager', 'process', 'pipe', 'shm_ring'])
+def test_transport_across_processes(transport_name):
+    options = {'record_format': 'dd'} if transport_name == 'shm_ring' else dict()
+    report_queue = transport.create_report_queue(transport_name, **options)
+    producer = multiprocessing.Process(target=produce, args=(report_queue, 500))
+    producer.start()
+    received = collect(report_queue, 500)
+    producer.join(5)
+    if hasattr(report_queue, 'close'):
+        report_queue.close()
+    assert [tuple(result) for result in received] == [(float(i), 1.0) for i in range(500)]
+
+
+def test_thread_transport():
+    report_queue = transport.create_report_queue('thread')
+    producer = threading.Thread(target=produce, args=(report_queue, 500))
+    producer.start()
+    received = collect(report_queue, 500)
+    producer.join()
+    assert len(received) == 500
+
+
+def test_shm_ring_full_and_empty():
+    ring = transport.ShmRingQueue('d', capacity=4)
+    try:
+        for i in range(4):
+            ring.put_nowait(i)
+        with pytest.raises(queue.Full):
+            ring.put_nowait(5)
+        assert [ring.get_nowait() for _ in range(4)] == [0.0, 1.0, 2.0, 3.0]
+        with pytest.raises(queue.Empty):
+            ring.get(timeout=0.01)
+        ring.put_nowait(6)
+        assert ring.get_nowait() == 6.0
+    finally:
+        ring.close()
+
+
+def test_shm_ring_bad_sample_keeps_its_slot():
+    ring = transport.ShmRingQueue('d', capacity=1)
+    try:
+        with pytest.raises(struct.error):
+            ring.put_nowait('not a number')
+        ring.put_nowait(1.0)
+        assert ring.get_nowait() == 1.0
+    finally:
+        ring.close()
+
+
+def test_shm_ring_wake():
+    ring = transport.ShmRingQueue('d', capacity=4)
+    try:
+        ring.wake()
+        with pytest.raises(queue.Empty):
+            ring.get()
+        ring.put_nowait(2.0)
+        assert ring.get(timeout=1) == 2.0
+    finally:
+        ring.close()
+
+
+def test_orchestration_on_shm_ring():
+    ring = transport.create_report_queue('shm_ring', record_format='dd')
+    try:
+        result_reporter = reporter.ResultReporter(ring)
+        received = list()
+        result_reporter.on_result = received.extend
+        event = plugin.Event('sample', lambda: result_reporter.add_result((time.monotonic(), 1.0)), 0.05, True, False)
+        plugin.Orchestrator(0.3, [event], multiprocessing.Event(), result_reporter, name='shm_ring').run()
+    finally:
+        ring.close()
+    assert len(received) >= 5
+    assert all(value == 1.0 for _, value in received)
+
+
+def test_unknown_transport():
+    with pytest.raises(Exception, match='Unknown report transport'):
+        transport.create_report_queue('carrier_pigeon')